@@ -49,15 +49,57 @@ print("🐘 Usando PostgreSQL como base de datos")
 
 JUDGE0_API_URL = os.environ.get('JUDGE0_API_URL', 'http://localhost:2358')
 JUDGE0_AUTH_TOKEN = os.environ.get('JUDGE0_AUTH_TOKEN', '')
+# Ejecuciones simultáneas en Judge0 por proceso; las que esperan se atienden
+# por prioridad y estudiante (ver evaluations/judge0_scheduler.py)
 JUDGE0_MAX_WORKERS = int(os.environ.get('JUDGE0_MAX_WORKERS', '5'))
 JUDGE0_TIMEOUT = int(os.environ.get('JUDGE0_TIMEOUT', '30'))
 
+# Pool de conexiones HTTP hacia Judge0 (por defecto, 2 conexiones por worker)
+JUDGE0_POOL_SIZE = int(os.environ.get('JUDGE0_POOL_SIZE', str(JUDGE0_MAX_WORKERS * 2)))
+JUDGE0_CONNECT_TIMEOUT = float(os.environ.get('JUDGE0_CONNECT_TIMEOUT', '3'))
+JUDGE0_RETRIES = int(os.environ.get('JUDGE0_RETRIES', '2'))
+JUDGE0_RETRY_BACKOFF = float(os.environ.get('JUDGE0_RETRY_BACKOFF', '0.3'))
+
+# Motor de ejecución: 'judge0', 'local' (sandbox de procesos, solo Python) o
+# 'pool' (workers de Python precalentados; el resto de lenguajes va a Judge0).
+# Ver evaluations/execution_engines.py
+EXECUTION_ENGINE = os.environ.get('EXECUTION_ENGINE', 'judge0')
+LOCAL_SANDBOX_WORKERS = int(os.environ.get('LOCAL_SANDBOX_WORKERS', str(os.cpu_count() or 2)))
+WARM_POOL_WORKERS = int(os.environ.get('WARM_POOL_WORKERS', str(LOCAL_SANDBOX_WORKERS)))
+# Ejecuciones tras las que se recicla cada worker precalentado
+WARM_POOL_MAX_RUNS = int(os.environ.get('WARM_POOL_MAX_RUNS', '200'))
+
+# Verificación de disponibilidad en cache y circuit breaker
+JUDGE0_HEALTH_TTL = int(os.environ.get('JUDGE0_HEALTH_TTL', '10'))
+JUDGE0_HEALTH_TIMEOUT = float(os.environ.get('JUDGE0_HEALTH_TIMEOUT', '3'))
+JUDGE0_BREAKER_THRESHOLD = int(os.environ.get('JUDGE0_BREAKER_THRESHOLD', '3'))
+JUDGE0_BREAKER_COOLDOWN = int(os.environ.get('JUDGE0_BREAKER_COOLDOWN', '30'))
+
 # Límites de ejecución para Judge0
 CPU_TIME_LIMIT = float(os.environ.get('CPU_TIME_LIMIT', '2.0'))
 CPU_EXTRA_TIME = float(os.environ.get('CPU_EXTRA_TIME', '0.5'))
 WALL_TIME_LIMIT = float(os.environ.get('WALL_TIME_LIMIT', '5.0'))
 MEMORY_LIMIT = int(os.environ.get('MEMORY_LIMIT', '128000'))
 
+# Polling adaptativo de resultados: espera inicial, multiplicador y tope en
+# segundos; el plazo total por defecto es 6 veces WALL_TIME_LIMIT
+JUDGE0_POLL_INITIAL_DELAY = float(os.environ.get('JUDGE0_POLL_INITIAL_DELAY', '0.05'))
+JUDGE0_POLL_MULTIPLIER = float(os.environ.get('JUDGE0_POLL_MULTIPLIER', '2.0'))
+JUDGE0_POLL_MAX_DELAY = float(os.environ.get('JUDGE0_POLL_MAX_DELAY', '1.0'))
+JUDGE0_POLL_DEADLINE = float(os.environ.get('JUDGE0_POLL_DEADLINE', str(WALL_TIME_LIMIT * 6)))
+# Código de hasta este tamaño (caracteres) se ejecuta con ?wait=true; 0 lo desactiva
+JUDGE0_WAIT_MAX_SOURCE = int(os.environ.get('JUDGE0_WAIT_MAX_SOURCE', '4096'))
+# Submissions por petición /submissions/batch: no más que MAX_SUBMISSION_BATCH_SIZE de Judge0
+JUDGE0_BATCH_SIZE = int(os.environ.get('JUDGE0_BATCH_SIZE', '20'))
+
+# Callbacks de Judge0: URL del endpoint /api/judge0/callback/ accesible desde
+# Judge0 (vacía = polling). Los resultados se guardan en la cache, que debe
+# ser compartida entre workers (Redis) para que lleguen a quien espera. Sin
+# JUDGE0_CALLBACK_SECRET los callbacks quedan desactivados y el endpoint responde 403
+JUDGE0_CALLBACK_URL = os.environ.get('JUDGE0_CALLBACK_URL', '')
+JUDGE0_CALLBACK_SECRET = os.environ.get('JUDGE0_CALLBACK_SECRET', '')
+JUDGE0_RESULT_TTL = int(os.environ.get('JUDGE0_RESULT_TTL', '600'))
+
 if DEBUG:
     print(f"🔧 Judge0 API URL: {JUDGE0_API_URL}")
     print(f"⏱️  Límites: CPU={CPU_TIME_LIMIT}s, Memoria={MEMORY_LIMIT}KB")
@@ -226,22 +268,137 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # =================================================================
-# CONFIGURACIÓN DE CACHE SIMPLE
+# REDIS Y COLA DE CALIFICACIÓN
 # =================================================================
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'curiosmaze-cache',
-        'TIMEOUT': 3600,
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000,
-            'CULL_FREQUENCY': 3,
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+# Con Redis, submit_codigo y submit_batch encolan la calificación y responden
+# 202; los resultados los guarda `python manage.py grading_worker`
+GRADING_ASYNC = os.environ.get('GRADING_ASYNC', str(bool(REDIS_URL))).lower() in ('true', '1', 'yes')
+GRADING_JOB_TTL = int(os.environ.get('GRADING_JOB_TTL', '3600'))
+# Lease de cada worker: si no lo renueva en estos segundos se da por caído y
+# otro worker reencola sus jobs en curso
+GRADING_WORKER_LEASE = int(os.environ.get('GRADING_WORKER_LEASE', '30'))
+
+# Caché de resultados de calificación: un reenvío idéntico (mismo código,
+# ejercicio, lenguaje y límites) no vuelve a pasar por Judge0
+GRADING_CACHE_ENABLED = os.environ.get('GRADING_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+GRADING_CACHE_TTL = int(os.environ.get('GRADING_CACHE_TTL', '3600'))
+GRADING_CACHE_MAX_ENTRIES = int(os.environ.get('GRADING_CACHE_MAX_ENTRIES', '10000'))
+
+# Ejecuciones idénticas simultáneas se envían una vez a Judge0 y comparten el
+# resultado (entre procesos si hay REDIS_URL); ver evaluations/single_flight.py
+SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'True').lower() in ('true', '1', 'yes')
+SINGLE_FLIGHT_LOCK_TTL = int(os.environ.get('SINGLE_FLIGHT_LOCK_TTL', '60'))
+SINGLE_FLIGHT_RESULT_TTL = int(os.environ.get('SINGLE_FLIGHT_RESULT_TTL', '5'))
+
+# Plan de calificación precompilado por ejercicio (ver evaluations/grading_plan.py)
+GRADING_PLAN_TTL = int(os.environ.get('GRADING_PLAN_TTL', '86400'))
+
+# Límites de JudgeRateLimitMiddleware por ruta y rol: (solicitudes, ventana en
+# segundos). 'default' cubre los roles sin entrada propia y None no limita.
+JUDGE_RATE_LIMIT_REQUESTS = int(os.environ.get('JUDGE_RATE_LIMIT_REQUESTS', '5'))
+JUDGE_RATE_LIMIT_WINDOW = int(os.environ.get('JUDGE_RATE_LIMIT_WINDOW', '120'))
+JUDGE_RATE_LIMITS = {
+    '/api/submit-codigo/': {
+        'default': (JUDGE_RATE_LIMIT_REQUESTS, JUDGE_RATE_LIMIT_WINDOW),
+        'docente': (30, 60),
+        'admin': None,
+    },
+    '/api/submit-batch/': {
+        'default': (JUDGE_RATE_LIMIT_REQUESTS, JUDGE_RATE_LIMIT_WINDOW),
+        'docente': (30, 60),
+        'admin': None,
+    },
+}
+# Rutas en las que superar el límite encola el envío (202) en vez de responder
+# 429: la entrega final de un examen nunca se rechaza
+JUDGE_RATE_LIMIT_QUEUE = ('/api/submit-batch/',)
+
+# Control de admisión de la calificación en el request (sin GRADING_ASYNC):
+# calificaciones simultáneas por evaluación y por proceso; lo que no cabe se
+# encola y se responde 202 con el job (ver evaluations/admission.py)
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'True').lower() in ('true', '1', 'yes')
+ADMISSION_MAX_GLOBAL = int(os.environ.get('ADMISSION_MAX_GLOBAL', '16'))
+ADMISSION_MAX_PER_EVALUACION = int(os.environ.get('ADMISSION_MAX_PER_EVALUACION', '8'))
+# Segundos que un job admitido sigue siendo de su proceso sin renovarlo; al
+# vencer, otro proceso web lo recupera
+ADMISSION_JOB_LEASE = int(os.environ.get('ADMISSION_JOB_LEASE', '60'))
+
+# Historiales por página en /api/historial-evaluaciones/ (?limite= hasta el máximo)
+HISTORIAL_PAGINA = 50
+HISTORIAL_PAGINA_MAX = 200
+
+# Respuestas y resultados del historial (ver evaluations/compresion.py): las
+# salidas se recortan a SALIDA_MAX_GUARDADA caracteres y el JSON de más de
+# COMPRESION_UMBRAL bytes se guarda comprimido con zlib
+COMPRESION_UMBRAL = int(os.environ.get('COMPRESION_UMBRAL', '1024'))
+SALIDA_MAX_GUARDADA = int(os.environ.get('SALIDA_MAX_GUARDADA', str(16 * 1024)))
+
+# Monitor en vivo de participantes (SSE, ver evaluations/monitor.py): cada
+# conexión se cierra a los MONITOR_SSE_DURACION segundos y el navegador
+# reconecta; sin cambios se envía un ping cada MONITOR_SSE_PING segundos
+MONITOR_SSE_DURACION = int(os.environ.get('MONITOR_SSE_DURACION', '300'))
+MONITOR_SSE_PING = int(os.environ.get('MONITOR_SSE_PING', '15'))
+
+# =================================================================
+# CONFIGURACIÓN DE CACHE
+# =================================================================
+# Una caché por uso, para que cada una tenga su TTL, su serializador y su
+# límite y que vaciar una no afecte a las demás:
+# - default: estado de Judge0 (circuit breaker) y resultados de callbacks
+# - grading: planes y resultados de calificación (JSON comprimido, pueden
+#   ocupar decenas de KB)
+# - ratelimit: contadores de JudgeRateLimitMiddleware
+# - sessions: sesiones (cached_db) y vistas de lectura frecuente
+# Con REDIS_URL todas viven en Redis y se comparten entre los workers de
+# gunicorn; sin Redis cada proceso tiene la suya en memoria.
+
+CACHE_ALIASES = {
+    'default': {'TIMEOUT': 3600, 'MAX_ENTRIES': 1000},
+    'grading': {'TIMEOUT': 3600, 'MAX_ENTRIES': 5000},
+    'ratelimit': {'TIMEOUT': 300, 'MAX_ENTRIES': 10000},
+    'sessions': {'TIMEOUT': 86400, 'MAX_ENTRIES': 2000},
+}
+
+if REDIS_URL:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': f'curiosmaze:{alias}',
+            'TIMEOUT': opciones['TIMEOUT'],
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'SOCKET_CONNECT_TIMEOUT': 2,
+                'SOCKET_TIMEOUT': 2,
+            },
         }
+        for alias, opciones in CACHE_ALIASES.items()
     }
-}
+    CACHES['grading']['OPTIONS'].update({
+        'SERIALIZER': 'django_redis.serializers.json.JSONSerializer',
+        'COMPRESSOR': 'django_redis.compressors.zlib.ZlibCompressor',
+    })
+    print("🧠 Usando Redis como cache")
+else:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'curiosmaze-{alias}',
+            'TIMEOUT': opciones['TIMEOUT'],
+            'OPTIONS': {
+                'MAX_ENTRIES': opciones['MAX_ENTRIES'],
+                'CULL_FREQUENCY': 3,
+            }
+        }
+        for alias, opciones in CACHE_ALIASES.items()
+    }
+    print("💾 Usando cache en memoria local")
 
-print("💾 Usando cache en memoria local")
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
 
 # =================================================================
 # PASSWORD VALIDATION
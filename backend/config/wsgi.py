@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Renovar el lease de los jobs de calificación admitidos en este proceso y
+# recuperar en segundo plano los de procesos caídos (ver evaluations/admission.py)
+from evaluations.admission import iniciar_recuperacion  # noqa: E402
+
+iniciar_recuperacion()
@@ -0,0 +1,346 @@
+# backend/evaluations/admission.py
+"""
+Control de admisión de la calificación en el request.
+
+Sin la cola de Redis (GRADING_ASYNC), submit_codigo y submit_batch califican
+dentro del request, y al cierre de un examen eso son decenas de requests
+esperando a Judge0 a la vez hasta que vence el timeout del proxy. Aquí se
+acota cuántas calificaciones corren a la vez por evaluación
+(ADMISSION_MAX_PER_EVALUACION) y en el proceso (ADMISSION_MAX_GLOBAL). Lo que
+no cabe se convierte en un job de calificación: se responde 202 con el job,
+su posición y la espera estimada, y un hilo del proceso lo califica cuando
+queda una plaza. Las evaluaciones con jobs en cola se turnan.
+
+Cada job admitido se guarda además en la base de datos (JobCalificacion)
+hasta que termina, con el proceso que lo califica y un lease que ese proceso
+renueva cada ADMISSION_JOB_LEASE/3 segundos (iniciar_recuperacion, lanzado
+desde config/wsgi.py). Si el proceso muere o se reinicia, su lease vence y
+otro proceso web toma el job con select_for_update(skip_locked=True): un
+reinicio no pierde la entrega de un examen, ni la califican dos procesos.
+
+Un envío nuevo de la misma participación y ejercicio (o un nuevo batch de la
+misma participación) sustituye al que aún esperaba: se califica solo el
+último y los dos requests comparten el job.
+
+Con GRADING_ASYNC la cola es la de Redis y la concurrencia la fijan los
+grading_worker; `estado_evaluacion` informa de la de cualquiera de los dos.
+"""
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import grading_jobs
+
+logger = logging.getLogger('judge')
+
+ADMISSION_CONTROL_ENABLED = getattr(settings, 'ADMISSION_CONTROL_ENABLED', True)
+ADMISSION_MAX_GLOBAL = getattr(settings, 'ADMISSION_MAX_GLOBAL', 16)
+ADMISSION_MAX_PER_EVALUACION = getattr(settings, 'ADMISSION_MAX_PER_EVALUACION', 8)
+ADMISSION_JOB_LEASE = getattr(settings, 'ADMISSION_JOB_LEASE', 60)
+
+# Único por arranque: un contenedor reiniciado repite hostname y pid
+PROCESO = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+ESTADOS_PENDIENTES = ('en_cola', 'procesando')
+
+
+def _vencimiento(lease=ADMISSION_JOB_LEASE):
+    return timezone.now() + datetime.timedelta(seconds=lease)
+
+
+def guardar_job(job):
+    """Guarda el job en la caché y en la base de datos, a nombre de este proceso"""
+    from .models import JobCalificacion
+
+    grading_jobs.guardar_job_local(job)
+    JobCalificacion.objects.update_or_create(id=job['id'], defaults={
+        'participacion_id': job['estudiante_evaluacion_id'],
+        'tipo': job['tipo'],
+        'estado': job['estado'],
+        'proceso': PROCESO,
+        'lease_hasta': _vencimiento(),
+        'datos': job,
+    })
+
+
+def _clave(job):
+    """Clave de la cola: un envío nuevo sustituye al que esperaba con la misma"""
+    ejercicio_id = job['ejercicios'][0].get('ejercicio_id') if job['tipo'] == 'codigo' else None
+    return (job['estudiante_evaluacion_id'], job['tipo'], ejercicio_id)
+
+
+class ControlAdmision:
+    """
+    Plazas de calificación por evaluación y globales, con una cola de jobs
+    por evaluación (OrderedDict clave -> job) para lo que no cabe.
+
+    Al liberarse una plaza se lanza el siguiente job de la primera evaluación
+    con sitio, que pasa al final del turno. La duración media (EWMA) de las
+    calificaciones alimenta la espera estimada.
+    """
+
+    def __init__(self, max_global=ADMISSION_MAX_GLOBAL, max_por_evaluacion=ADMISSION_MAX_PER_EVALUACION,
+                 ejecutar=None, guardar=None):
+        self.max_global = max_global
+        self.max_por_evaluacion = max_por_evaluacion
+        self.guardar = guardar or guardar_job
+        self.ejecutar = ejecutar or (lambda job: grading_jobs.ejecutar_job(job, al_actualizar=self.guardar))
+        self._lock = threading.Lock()
+        self._en_curso = collections.Counter()
+        self._total = 0
+        self._colas = collections.OrderedDict()
+        self._duracion_media = grading_jobs.DURACION_INICIAL
+        self._executor = None
+
+    def _cabe(self, evaluacion_id):
+        return self._total < self.max_global and self._en_curso[evaluacion_id] < self.max_por_evaluacion
+
+    def _ocupar(self, evaluacion_id):
+        self._total += 1
+        self._en_curso[evaluacion_id] += 1
+
+    def reservar(self, evaluacion_id):
+        """Ocupa una plaza si hay sitio y nadie de la evaluación espera en la cola"""
+        with self._lock:
+            if evaluacion_id in self._colas or not self._cabe(evaluacion_id):
+                return False
+            self._ocupar(evaluacion_id)
+            return True
+
+    def liberar(self, evaluacion_id, duracion=None):
+        with self._lock:
+            self._total -= 1
+            self._en_curso[evaluacion_id] -= 1
+            if self._en_curso[evaluacion_id] <= 0:
+                del self._en_curso[evaluacion_id]
+            if duracion is not None:
+                self._duracion_media = 0.8 * self._duracion_media + 0.2 * duracion
+            listos = self._siguientes()
+        self._lanzar(listos)
+
+    def encolar(self, job, clave):
+        """
+        Encola el job (o actualiza el que esperaba con la misma clave) y
+        devuelve el job encolado con su posición y espera estimada
+        """
+        evaluacion_id = job['evaluacion_id']
+        with self._lock:
+            cola = self._colas.setdefault(evaluacion_id, collections.OrderedDict())
+            pendiente = cola.get(clave)
+            if pendiente is not None:
+                pendiente.update({k: v for k, v in job.items() if k not in ('id', 'creado')})
+                job = pendiente
+            else:
+                cola[clave] = job
+            posicion = list(cola).index(clave) + 1
+            listos = self._siguientes()
+            # Si había plaza el job ya sale de la cola
+            job['posicion'] = 0 if any(j is job for j in listos) else posicion
+            job['espera_estimada_s'] = self._espera(job['posicion'])
+            self.guardar(job)
+        self._lanzar(listos)
+        return job
+
+    def _espera(self, posicion):
+        paralelismo = min(self.max_global, self.max_por_evaluacion)
+        return grading_jobs.espera_estimada(posicion, paralelismo, self._duracion_media)
+
+    def _siguientes(self):
+        """Saca de las colas los jobs que caben ahora y les ocupa plaza"""
+        listos = []
+        while self._total < self.max_global:
+            evaluacion_id = next((e for e in self._colas if self._cabe(e)), None)
+            if evaluacion_id is None:
+                break
+            cola = self._colas[evaluacion_id]
+            _, job = cola.popitem(last=False)
+            if cola:
+                self._colas.move_to_end(evaluacion_id)
+            else:
+                del self._colas[evaluacion_id]
+            self._ocupar(evaluacion_id)
+            listos.append(job)
+        return listos
+
+    def _lanzar(self, jobs):
+        if not jobs:
+            return
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=max(1, self.max_global), thread_name_prefix='admision'
+                    )
+        for job in jobs:
+            self._executor.submit(self._calificar, job)
+
+    def _calificar(self, job):
+        close_old_connections()
+        inicio = time.monotonic()
+        try:
+            logger.info(f"[Job:{job['id']}] Calificando {job['tipo']} admitido desde la cola")
+            self.ejecutar(job)
+        except Exception as e:
+            logger.error(f"[Job:{job['id']}] Error al calificar desde la cola: {str(e)}")
+        finally:
+            close_old_connections()
+            self.liberar(job['evaluacion_id'], time.monotonic() - inicio)
+
+    @contextlib.contextmanager
+    def admitir(self, tipo, estudiante_evaluacion, ejercicios, encolar=False, **datos):
+        """
+        Entra con None si la calificación cabe ahora (la plaza se ocupa hasta
+        salir del bloque) o con el job encolado en su lugar
+        """
+        evaluacion_id = estudiante_evaluacion.evaluacion_id
+        if not encolar and self.reservar(evaluacion_id):
+            inicio = time.monotonic()
+            try:
+                yield None
+            finally:
+                self.liberar(evaluacion_id, time.monotonic() - inicio)
+            return
+
+        job = grading_jobs.crear_job(tipo, estudiante_evaluacion, ejercicios, **datos)
+        job = self.encolar(job, _clave(job))
+        logger.info(f"[Job:{job['id']}] Calificación de la evaluación {evaluacion_id} en cola "
+                    f"(posición {job['posicion']}, ~{job['espera_estimada_s']}s)")
+        yield job
+
+    def renovar_leases(self, lease=ADMISSION_JOB_LEASE):
+        """Extiende el lease de los jobs pendientes de este proceso"""
+        from .models import JobCalificacion
+
+        return JobCalificacion.objects.filter(proceso=PROCESO, estado__in=ESTADOS_PENDIENTES).update(
+            lease_hasta=_vencimiento(lease)
+        )
+
+    def recuperar(self, lease=ADMISSION_JOB_LEASE, maximo=50):
+        """
+        Toma los jobs pendientes cuyo lease venció (su proceso dejó de
+        renovarlo) y los encola aquí. Las filas se bloquean con
+        select_for_update(skip_locked=True) y se reclaman con un update
+        condicionado al lease leído, así dos procesos nunca toman el mismo
+        job. Borra de paso los jobs terminados hace más de GRADING_JOB_TTL.
+
+        Returns:
+            int: Jobs recuperados
+        """
+        from .models import JobCalificacion
+
+        ahora = timezone.now()
+        limite = ahora - datetime.timedelta(seconds=grading_jobs.GRADING_JOB_TTL)
+        JobCalificacion.objects.exclude(estado__in=ESTADOS_PENDIENTES).filter(actualizado__lt=limite).delete()
+
+        tomados = []
+        with transaction.atomic():
+            vencidos = JobCalificacion.objects.select_for_update(skip_locked=True).filter(
+                Q(lease_hasta__lt=ahora) | Q(lease_hasta__isnull=True), estado__in=ESTADOS_PENDIENTES
+            ).order_by('creado')[:maximo]
+            for fila in vencidos:
+                if JobCalificacion.objects.filter(id=fila.id, lease_hasta=fila.lease_hasta).update(
+                        proceso=PROCESO, lease_hasta=_vencimiento(lease)):
+                    tomados.append(fila)
+
+        for fila in tomados:
+            job = fila.datos
+            job['estado'] = 'en_cola'
+            logger.warning(f"[Job:{job['id']}] Recuperado el job de {fila.proceso or 'un proceso anterior'}")
+            self.encolar(job, _clave(job))
+        return len(tomados)
+
+    def estado(self, evaluacion_id=None):
+        """Plazas ocupadas y jobs en cola, en total o de una evaluación"""
+        with self._lock:
+            if evaluacion_id is not None:
+                en_cola = len(self._colas.get(evaluacion_id, ()))
+                return {
+                    'en_cola': en_cola,
+                    'en_curso': self._en_curso[evaluacion_id],
+                    'espera_estimada_s': self._espera(en_cola),
+                }
+            return {
+                'en_curso': self._total,
+                'en_cola': sum(len(cola) for cola in self._colas.values()),
+                'evaluaciones_en_cola': len(self._colas),
+                'max_global': self.max_global,
+                'max_por_evaluacion': self.max_por_evaluacion,
+                'duracion_media_s': round(self._duracion_media, 2),
+            }
+
+
+_control = None
+_control_lock = threading.Lock()
+
+
+def get_control_admision():
+    """Control de admisión compartido por el proceso"""
+    global _control
+    if _control is None:
+        with _control_lock:
+            if _control is None:
+                _control = ControlAdmision()
+    return _control
+
+
+_recuperacion = None
+
+
+def iniciar_recuperacion(lease=ADMISSION_JOB_LEASE):
+    """
+    Lanza (una vez por proceso) el hilo que cada lease/3 segundos renueva el
+    lease de los jobs de este proceso y recupera los que dejaron de renovarse.
+    Lo llama config/wsgi.py, así que corre en los procesos web y no en los
+    tests ni en los comandos de manage.py. Devuelve el Event que lo detiene.
+    """
+    global _recuperacion
+    with _control_lock:
+        if _recuperacion is not None:
+            return _recuperacion
+        _recuperacion = detener = threading.Event()
+    control = get_control_admision()
+
+    def ciclo():
+        while True:
+            try:
+                control.renovar_leases(lease)
+                recuperados = control.recuperar(lease)
+                if recuperados:
+                    logger.info(f"Jobs de calificación recuperados de procesos caídos: {recuperados}")
+            except Exception as e:
+                logger.warning(f"No se pudieron recuperar los jobs de calificación: {str(e)}")
+            finally:
+                close_old_connections()
+            if detener.wait(lease / 3):
+                return
+
+    threading.Thread(target=ciclo, name='admision-recuperacion', daemon=True).start()
+    return detener
+
+
+def admitir(tipo, estudiante_evaluacion, ejercicios, encolar=False, **datos):
+    """ControlAdmision.admitir del proceso; sin control de admisión siempre admite"""
+    if not ADMISSION_CONTROL_ENABLED:
+        return contextlib.nullcontext()
+    return get_control_admision().admitir(tipo, estudiante_evaluacion, ejercicios, encolar=encolar, **datos)
+
+
+def estado_evaluacion(evaluacion_id):
+    """Backlog de calificación de una evaluación (en la cola de Redis o en este proceso)"""
+    if grading_jobs.GRADING_ASYNC:
+        try:
+            return grading_jobs.get_grading_queue().estado_evaluacion(evaluacion_id)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la cola de calificación: {str(e)}")
+    return get_control_admision().estado(evaluacion_id)
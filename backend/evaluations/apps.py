@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class EvaluationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'evaluations'
+
+    def ready(self):
+        # Resúmenes de resultados mantenidos por señales (ver resumenes.py)
+        from . import signals  # noqa: F401
+        # Verificación de las cachés en `manage.py check` (ver checks.py)
+        from . import checks  # noqa: F401
@@ -0,0 +1,32 @@
+# backend/evaluations/checks.py
+"""
+Verificaciones de arranque (`manage.py check`, que ejecuta entrypoint.sh).
+
+Con REDIS_URL todas las cachés viven en Redis: si la URL no lleva la
+contraseña o Redis no responde, cada sesión y cada envío de código fallaría
+en el primer acceso a la caché. Mejor no arrancar.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+CLAVE_VERIFICACION = 'curiosmaze:check'
+
+
+@register(Tags.caches)
+def verificar_caches(app_configs, **kwargs):
+    """Cada alias de CACHES acepta una escritura y una lectura"""
+    from django.core.cache import caches
+
+    errores = []
+    for alias in settings.CACHES:
+        try:
+            cache = caches[alias]
+            cache.set(CLAVE_VERIFICACION, 1, 5)
+            cache.get(CLAVE_VERIFICACION)
+        except Exception as e:
+            errores.append(Error(
+                f"La caché '{alias}' no responde: {str(e)}",
+                hint="Revise REDIS_URL; si Redis usa requirepass la URL debe ser redis://:<REDIS_PASSWORD>@host:puerto/db",
+                id='evaluations.E001',
+            ))
+    return errores
@@ -0,0 +1,115 @@
+# backend/evaluations/compresion.py
+"""
+Compresión de los blobs de código y salida que se guardan en JSON.
+
+RespuestaEjercicio.respuesta y HistorialRespuesta.resultados guardan el
+código del estudiante y la salida de cada prueba (stdout, stderr, salida de
+las funciones auxiliares), a veces de cientos de KB. Postgres solo comprime
+(TOAST) los valores de más de ~2 KB y cada lectura manda todos los bytes por
+la red. JSONComprimidoField:
+
+- recorta las salidas (CAMPOS_SALIDA) a SALIDA_MAX_GUARDADA caracteres y
+  marca el dict con 'truncado': True;
+- si el JSON resultante pasa de COMPRESION_UMBRAL bytes lo guarda
+  comprimido con zlib dentro de un sobre {"__comprimido__": algoritmo,
+  "datos": base64};
+- al leer, abre el sobre. Las filas anteriores (JSON sin sobre) se leen tal
+  cual, y se comprimen la próxima vez que se guarden.
+
+Siempre se escribe zlib (de la biblioteca estándar) para que cualquier
+proceso pueda leer lo que escribe otro. Los sobres zstd que se hayan
+guardado antes se leen si está instalado `zstandard`, y se reescriben en
+zlib con `manage.py comprimir_respuestas`.
+
+El campo sigue siendo un JSONField: el serializer de DRF y las migraciones
+no cambian, pero no se puede filtrar por claves dentro de un valor
+comprimido.
+"""
+import base64
+import json
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESION_UMBRAL = getattr(settings, 'COMPRESION_UMBRAL', 1024)
+SALIDA_MAX_GUARDADA = getattr(settings, 'SALIDA_MAX_GUARDADA', 16 * 1024)
+
+MARCA = '__comprimido__'
+# Campos de texto con salida de la ejecución que se recortan al guardar
+CAMPOS_SALIDA = ('stdout', 'stderr', 'compile_output', 'output', 'salida_obtenida', 'error')
+
+
+def recortar_salidas(valor, maximo=SALIDA_MAX_GUARDADA):
+    """
+    Copia de `valor` con las salidas de más de `maximo` caracteres
+    recortadas; los dicts recortados llevan 'truncado': True
+    """
+    if isinstance(valor, list):
+        return [recortar_salidas(v, maximo) for v in valor]
+    if not isinstance(valor, dict):
+        return valor
+    recortado = {}
+    for clave, v in valor.items():
+        if clave in CAMPOS_SALIDA and isinstance(v, str) and len(v) > maximo:
+            recortado[clave] = v[:maximo]
+            recortado['truncado'] = True
+        else:
+            recortado[clave] = recortar_salidas(v, maximo)
+    return recortado
+
+
+def comprimir(datos):
+    """(algoritmo, bytes comprimidos)"""
+    return 'zlib', zlib.compress(datos, 6)
+
+
+def descomprimir(algoritmo, datos):
+    if algoritmo == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Hay datos comprimidos con zstd y el paquete zstandard no está instalado")
+        return zstandard.ZstdDecompressor().decompress(datos)
+    if algoritmo == 'zlib':
+        return zlib.decompress(datos)
+    raise ValueError(f"Algoritmo de compresión desconocido: {algoritmo}")
+
+
+def empaquetar(valor, umbral=COMPRESION_UMBRAL):
+    """`valor` tal cual o, si su JSON pasa del umbral, el sobre comprimido"""
+    if valor is None:
+        return None
+    texto = json.dumps(valor, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if len(texto) < umbral:
+        return valor
+    algoritmo, comprimido = comprimir(texto)
+    sobre = {MARCA: algoritmo, 'datos': base64.b64encode(comprimido).decode('ascii')}
+    # El base64 ocupa un tercio más: solo compensa si se comprime bien
+    if len(sobre['datos']) >= len(texto):
+        return valor
+    return sobre
+
+
+def desempaquetar(valor):
+    """Abre el sobre comprimido; cualquier otro valor se devuelve igual"""
+    if isinstance(valor, dict) and MARCA in valor:
+        return json.loads(descomprimir(valor[MARCA], base64.b64decode(valor['datos'])))
+    return valor
+
+
+def esta_comprimido(valor):
+    return isinstance(valor, dict) and MARCA in valor
+
+
+class JSONComprimidoField(models.JSONField):
+    """JSONField que recorta las salidas y comprime los valores grandes"""
+
+    def get_prep_value(self, value):
+        return super().get_prep_value(empaquetar(recortar_salidas(value)))
+
+    def from_db_value(self, value, expression, connection):
+        return desempaquetar(super().from_db_value(value, expression, connection))
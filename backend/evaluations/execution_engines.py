@@ -0,0 +1,514 @@
+# backend/evaluations/execution_engines.py
+"""
+Motores de ejecución de código.
+
+judge_utils.ejecutar_codigo y ejecutar_batch delegan en el motor elegido con
+EXECUTION_ENGINE; todos devuelven el mismo formato de resultado que Judge0
+(success, stdout, stderr, time, memory, status) para que verificar_ejemplos,
+los tests avanzados y la calificación no distingan uno de otro.
+
+- 'judge0' (por defecto): el servicio Judge0.
+- 'local': un sandbox de procesos en esta máquina, solo para Python, pensado
+  para despliegues pequeños y CI sin cluster de Judge0. Cada ejecución es un
+  intérprete aislado (-I) que aplica los límites de DEFAULT_EXECUTION_OPTIONS
+  con rlimits (CPU, memoria, procesos, tamaño de ficheros) antes de ejecutar
+  el código; el código y la entrada van por pipe y un semáforo acota las
+  ejecuciones simultáneas a LOCAL_SANDBOX_WORKERS.
+- 'pool': como 'local', pero con WARM_POOL_WORKERS intérpretes ya arrancados
+  (y con los módulos habituales importados) que hacen fork por cada
+  ejecución, así que no se paga el arranque de Python en cada ejemplo. Los
+  lenguajes distintos de Python pasan a Judge0.
+"""
+import concurrent.futures
+import json
+import logging
+import math
+import os
+import select
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('judge')
+
+EXECUTION_ENGINE = getattr(settings, 'EXECUTION_ENGINE', 'judge0')
+LOCAL_SANDBOX_WORKERS = getattr(settings, 'LOCAL_SANDBOX_WORKERS', os.cpu_count() or 2)
+WARM_POOL_WORKERS = getattr(settings, 'WARM_POOL_WORKERS', LOCAL_SANDBOX_WORKERS)
+WARM_POOL_MAX_RUNS = getattr(settings, 'WARM_POOL_MAX_RUNS', 200)
+
+# Estados de Judge0 que puede producir un motor local
+ESTADOS = {
+    3: 'Accepted',
+    4: 'Wrong Answer',
+    5: 'Time Limit Exceeded',
+    11: 'Runtime Error (NZEC)',
+    13: 'Internal Error',
+}
+
+# Se ejecuta en el proceso hijo: aplica los límites (argv) y ejecuta el código
+# del estudiante como __main__. El código llega en la primera línea de stdin
+# ({"codigo": ...} en JSON, como en WORKER_PYTHON) y el resto de stdin es la
+# entrada del programa: por argv no cabría (128 KB por argumento en Linux).
+LANZADOR_PYTHON = """
+import json, resource, sys
+
+def _limitar(limites):
+    for recurso, valor in limites.items():
+        try:
+            resource.setrlimit(getattr(resource, recurso), (valor, valor))
+        except (ValueError, OSError):
+            pass
+
+_limitar(json.loads(sys.argv[1]))
+_codigo = json.loads(sys.stdin.readline())['codigo']
+sys.argv = ['main.py']
+exec(compile(_codigo, 'main.py', 'exec'), {'__name__': '__main__'})
+"""
+
+# Worker precalentado del motor 'pool'. Lee peticiones JSON por línea en stdin
+# y, por cada una, hace fork: el hijo redirige stdin/stdout/stderr a pipes
+# propios, aplica los límites y ejecuta el código; el worker le pasa la
+# entrada, recoge la salida (hasta MAX_SALIDA bytes), lo mata si supera el
+# tiempo y responde con el uso de CPU y memoria de os.wait4. El hijo nunca ve
+# el canal de peticiones y el estado del worker no cambia entre ejecuciones.
+# Termina al cerrarse su stdin (p. ej. si muere el proceso de Django).
+WORKER_PYTHON = """
+import json, os, resource, select, signal, sys, time, traceback
+import bisect, collections, functools, heapq, itertools, math, random, re, string
+
+LIMITES = json.loads(sys.argv[1])
+MAX_SALIDA = 1024 * 1024
+
+
+def _hijo(codigo, r_in, w_out, w_err):
+    os.dup2(r_in, 0)
+    os.dup2(w_out, 1)
+    os.dup2(w_err, 2)
+    for fd in (r_in, w_out, w_err):
+        os.close(fd)
+    for recurso, valor in LIMITES.items():
+        try:
+            resource.setrlimit(getattr(resource, recurso), (valor, valor))
+        except (ValueError, OSError):
+            pass
+    sys.stdin = open(0, 'r', encoding='utf-8', closefd=False)
+    sys.stdout = open(1, 'w', encoding='utf-8', closefd=False)
+    sys.stderr = open(2, 'w', encoding='utf-8', closefd=False)
+    sys.argv = ['main.py']
+    estado = 0
+    try:
+        exec(compile(codigo, 'main.py', 'exec'), {'__name__': '__main__'})
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            estado = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            estado = 1
+    except BaseException:
+        traceback.print_exc()
+        estado = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        estado = estado or 1
+    os._exit(estado)
+
+
+def _esperar(pid, limite):
+    while time.perf_counter() < limite:
+        terminado, estado, uso = os.wait4(pid, os.WNOHANG)
+        if terminado:
+            return estado, uso, False
+        time.sleep(0.001)
+    os.kill(pid, signal.SIGKILL)
+    _, estado, uso = os.wait4(pid, 0)
+    return estado, uso, True
+
+
+def _ejecutar(peticion):
+    r_in, w_in = os.pipe()
+    r_out, w_out = os.pipe()
+    r_err, w_err = os.pipe()
+    inicio = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            for fd in (w_in, r_out, r_err):
+                os.close(fd)
+            _hijo(peticion['codigo'], r_in, w_out, w_err)
+        finally:
+            os._exit(70)
+    for fd in (r_in, w_out, w_err):
+        os.close(fd)
+
+    limite = inicio + peticion['timeout']
+    entrada = peticion['entrada'].encode('utf-8')
+    if not entrada:
+        os.close(w_in)
+        w_in = None
+    salidas = {r_out: bytearray(), r_err: bytearray()}
+    abiertos = [r_out, r_err]
+    while abiertos and time.perf_counter() < limite:
+        escritura = [w_in] if w_in is not None else []
+        listos, escribibles, _ = select.select(abiertos, escritura, [], max(limite - time.perf_counter(), 0))
+        if escribibles:
+            try:
+                entrada = entrada[os.write(w_in, entrada[:65536]):]
+            except OSError:
+                entrada = b''
+            if not entrada:
+                os.close(w_in)
+                w_in = None
+        for fd in listos:
+            datos = os.read(fd, 65536)
+            if not datos:
+                abiertos.remove(fd)
+            elif len(salidas[fd]) < MAX_SALIDA:
+                salidas[fd] += datos
+    for fd in [r_out, r_err] + ([w_in] if w_in is not None else []):
+        os.close(fd)
+
+    estado, uso, excedido = _esperar(pid, limite)
+    return {
+        'stdout': bytes(salidas[r_out][:MAX_SALIDA]).decode('utf-8', 'replace'),
+        'stderr': bytes(salidas[r_err][:MAX_SALIDA]).decode('utf-8', 'replace'),
+        'returncode': os.waitstatus_to_exitcode(estado),
+        'excedido': excedido,
+        'cpu': uso.ru_utime + uso.ru_stime,
+        'rss': uso.ru_maxrss,
+        'wall': time.perf_counter() - inicio,
+    }
+
+
+for linea in sys.stdin.buffer:
+    respuesta = _ejecutar(json.loads(linea))
+    sys.stdout.write(json.dumps(respuesta) + '\\n')
+    sys.stdout.flush()
+"""
+
+
+def resultado_ejecucion(estado, stdout='', stderr='', tiempo=0.0, memoria=0, **extra):
+    """Resultado con el formato de Judge0 (ver judge_utils.ejecutar_codigo)"""
+    return {
+        'success': estado == 3,
+        'stdout': stdout,
+        'stderr': stderr,
+        'compile_output': '',
+        'time': f"{tiempo:.3f}",
+        'memory': memoria,
+        'status': {'id': estado, 'description': ESTADOS.get(estado, '')},
+        **extra
+    }
+
+
+def estado_por_salida(stdout, expected_output):
+    """Accepted o Wrong Answer comparando como Judge0 (sin espacios finales)"""
+    if expected_output is None or stdout.rstrip() == expected_output.rstrip():
+        return 3
+    return 4
+
+
+def estado_por_proceso(returncode, stdout, expected_output):
+    """Estado de Judge0 según cómo terminó el proceso del estudiante"""
+    if returncode == 0:
+        return estado_por_salida(stdout, expected_output)
+    if returncode in (-9, -24):  # SIGKILL / SIGXCPU por RLIMIT_CPU
+        return 5
+    return 11
+
+
+class ExecutionEngine:
+    """Interfaz de un motor de ejecución"""
+
+    nombre = None
+
+    def disponible(self):
+        """
+        Returns:
+            tuple: (disponible, mensaje)
+        """
+        return True, f"Motor {self.nombre} disponible"
+
+    def ejecutar(self, code, input_data='', expected_output=None, language='python'):
+        """Ejecuta `code` una vez; mismo contrato que judge_utils.ejecutar_codigo"""
+        raise NotImplementedError
+
+    def ejecutar_lote(self, code, casos, language='python'):
+        """
+        Ejecuta `code` con varios casos (entrada, salida_esperada)
+
+        Returns:
+            list: Un resultado por caso, en el mismo orden
+        """
+        return [self.ejecutar(code, entrada, salida or None, language) for entrada, salida in casos]
+
+
+class Judge0Engine(ExecutionEngine):
+    nombre = 'judge0'
+
+    def disponible(self):
+        from .judge_utils import check_judge0_availability
+        return check_judge0_availability()
+
+    # Las ejecuciones idénticas simultáneas se envían una sola vez
+    # (single_flight) y solo esa espera turno en el planificador
+
+    def ejecutar(self, code, input_data='', expected_output=None, language='python'):
+        from .judge0_scheduler import get_judge0_scheduler
+        from .judge_utils import _ejecutar_codigo_judge0
+        from .single_flight import ejecutar_una_vez
+
+        def enviar():
+            with get_judge0_scheduler().turno():
+                return _ejecutar_codigo_judge0(code, input_data, expected_output, language)
+
+        return ejecutar_una_vez('ejecucion', code, input_data, expected_output, language, enviar)
+
+    def ejecutar_lote(self, code, casos, language='python'):
+        from .judge0_scheduler import get_judge0_scheduler
+        from .judge_utils import _ejecutar_batch_judge0
+        from .single_flight import ejecutar_una_vez
+
+        def enviar():
+            with get_judge0_scheduler().turno():
+                return _ejecutar_batch_judge0(code, casos, language)
+
+        return ejecutar_una_vez('lote', code, [list(caso) for caso in casos], None, language, enviar)
+
+
+class LocalSandboxEngine(ExecutionEngine):
+    """
+    Ejecuta Python en procesos locales con límites de recursos.
+
+    No es un aislamiento equivalente al de Judge0 (no hay namespaces ni
+    cgroups): es para entornos de confianza como CI o un aula pequeña.
+    """
+
+    nombre = 'local'
+    LENGUAJES = ('python', 'python3')
+
+    def __init__(self, max_concurrentes=LOCAL_SANDBOX_WORKERS, opciones=None):
+        from .judge_utils import DEFAULT_EXECUTION_OPTIONS
+
+        opciones = opciones or DEFAULT_EXECUTION_OPTIONS
+        self.max_concurrentes = max_concurrentes
+        self.wall_time_limit = float(opciones['wall_time_limit'])
+        cpu = math.ceil(float(opciones['cpu_time_limit']) + float(opciones.get('cpu_extra_time', 0)))
+        self.rlimits = {
+            'RLIMIT_CPU': cpu,
+            'RLIMIT_AS': int(opciones['memory_limit']) * 1024,
+            'RLIMIT_NPROC': int(opciones.get('max_processes_and_or_threads', 60)),
+            'RLIMIT_FSIZE': 1024 * 1024,
+            'RLIMIT_CORE': 0,
+        }
+        self._semaforo = threading.BoundedSemaphore(max_concurrentes)
+        self._env = {'PATH': os.environ.get('PATH', ''), 'PYTHONIOENCODING': 'utf-8', 'LANG': 'C.UTF-8'}
+
+    def ejecutar(self, code, input_data='', expected_output=None, language='python'):
+        if language not in self.LENGUAJES:
+            return resultado_ejecucion(13, stderr=f"El motor local no ejecuta {language}",
+                                       error=f"Lenguaje no soportado: {language}")
+
+        entrada = json.dumps({'codigo': code}) + '\n' + (input_data or '')
+        with self._semaforo:
+            inicio = time.perf_counter()
+            try:
+                proceso = subprocess.Popen(
+                    [sys.executable, '-I', '-c', LANZADOR_PYTHON, json.dumps(self.rlimits)],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    cwd=tempfile.gettempdir(),
+                    env=self._env,
+                )
+            except OSError as e:
+                logger.error(f"No se pudo lanzar el proceso del sandbox local: {str(e)}")
+                return resultado_ejecucion(13, stderr='No se pudo lanzar la ejecución', error=str(e))
+            try:
+                stdout, stderr = proceso.communicate(entrada, timeout=self.wall_time_limit)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+                stdout, stderr = proceso.communicate()
+                return resultado_ejecucion(5, stdout, stderr, time.perf_counter() - inicio)
+            tiempo = time.perf_counter() - inicio
+
+        estado = estado_por_proceso(proceso.returncode, stdout, expected_output)
+        return resultado_ejecucion(estado, stdout, stderr, tiempo)
+
+    def ejecutar_lote(self, code, casos, language='python'):
+        if not casos:
+            return []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_concurrentes, len(casos))) as executor:
+            return list(executor.map(
+                lambda caso: self.ejecutar(code, caso[0], caso[1] or None, language), casos
+            ))
+
+
+class _WorkerPython:
+    """Un proceso WORKER_PYTHON y su canal de peticiones"""
+
+    def __init__(self, rlimits, env):
+        self.proceso = subprocess.Popen(
+            [sys.executable, '-I', '-c', WORKER_PYTHON, json.dumps(rlimits)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=tempfile.gettempdir(),
+            env=env,
+        )
+        self.ejecuciones = 0
+
+    def ejecutar(self, code, input_data, timeout):
+        peticion = {'codigo': code, 'entrada': input_data, 'timeout': timeout}
+        self.proceso.stdin.write((json.dumps(peticion) + '\n').encode('utf-8'))
+        self.proceso.stdin.flush()
+
+        # El worker responde siempre antes de `timeout`; el margen cubre un
+        # worker bloqueado o muerto
+        listos, _, _ = select.select([self.proceso.stdout], [], [], timeout + 5)
+        linea = self.proceso.stdout.readline() if listos else b''
+        if not linea:
+            raise OSError(f"El worker {self.proceso.pid} no respondió")
+        self.ejecuciones += 1
+        return json.loads(linea)
+
+    def cerrar(self):
+        if self.proceso.poll() is None:
+            self.proceso.kill()
+        self.proceso.wait()
+        for canal in (self.proceso.stdin, self.proceso.stdout):
+            try:
+                canal.close()
+            except OSError:
+                pass
+
+
+class WarmPoolEngine(LocalSandboxEngine):
+    """
+    Sandbox local con workers de Python precalentados.
+
+    Cada worker se recicla tras `max_ejecuciones` ejecuciones, si deja de
+    responder o si el proceso del estudiante muere por una señal distinta de
+    la de los límites. Los resultados incluyen el tiempo de CPU (`time`) y la
+    memoria residente máxima en KB (`memory`) como en Judge0.
+    """
+
+    nombre = 'pool'
+
+    def __init__(self, max_concurrentes=WARM_POOL_WORKERS, opciones=None,
+                 max_ejecuciones=WARM_POOL_MAX_RUNS, respaldo=None):
+        super().__init__(max_concurrentes, opciones)
+        self.max_ejecuciones = max_ejecuciones
+        self.respaldo = respaldo
+        self._libres = []
+        self._lock = threading.Lock()
+        self._estadisticas = {'arrancados': 0, 'reciclados': 0, 'ejecuciones': 0}
+
+    def _arrancar(self):
+        with self._lock:
+            self._estadisticas['arrancados'] += 1
+        return _WorkerPython(self.rlimits, self._env)
+
+    def _reciclar(self, worker):
+        worker.cerrar()
+        with self._lock:
+            self._estadisticas['reciclados'] += 1
+
+    def calentar(self):
+        """Arranca los workers que falten hasta `max_concurrentes`"""
+        with self._lock:
+            faltan = self.max_concurrentes - len(self._libres)
+        nuevos = [self._arrancar() for _ in range(faltan)]
+        with self._lock:
+            self._libres.extend(nuevos)
+
+    def estadisticas(self):
+        with self._lock:
+            return {**self._estadisticas, 'libres': len(self._libres)}
+
+    def cerrar(self):
+        with self._lock:
+            workers, self._libres = self._libres, []
+        for worker in workers:
+            worker.cerrar()
+
+    def ejecutar(self, code, input_data='', expected_output=None, language='python'):
+        if language not in self.LENGUAJES and self.respaldo is not None:
+            return self.respaldo.ejecutar(code, input_data, expected_output, language)
+        if language not in self.LENGUAJES:
+            return super().ejecutar(code, input_data, expected_output, language)
+
+        with self._semaforo:
+            with self._lock:
+                worker = self._libres.pop() if self._libres else None
+            if worker is None:
+                try:
+                    worker = self._arrancar()
+                except OSError as e:
+                    logger.error(f"No se pudo arrancar un worker de Python: {str(e)}")
+                    return resultado_ejecucion(13, stderr='No se pudo lanzar la ejecución', error=str(e))
+
+            try:
+                respuesta = worker.ejecutar(code, input_data or '', self.wall_time_limit)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Worker de Python reciclado tras un fallo: {str(e)}")
+                self._reciclar(worker)
+                return resultado_ejecucion(13, stderr='El worker de ejecución falló', error=str(e))
+
+            returncode = respuesta['returncode']
+            if respuesta['excedido']:
+                estado = 5
+            else:
+                estado = estado_por_proceso(returncode, respuesta['stdout'], expected_output)
+
+            with self._lock:
+                self._estadisticas['ejecuciones'] += 1
+            if worker.ejecuciones >= self.max_ejecuciones or (returncode < 0 and estado != 5):
+                self._reciclar(worker)
+            else:
+                with self._lock:
+                    self._libres.append(worker)
+
+        return resultado_ejecucion(
+            estado, respuesta['stdout'], respuesta['stderr'], respuesta['cpu'], respuesta['rss'],
+            wall_time=f"{respuesta['wall']:.3f}"
+        )
+
+
+_motor = None
+_sandbox_local = None
+_motor_lock = threading.Lock()
+_sandbox_lock = threading.Lock()
+
+
+def get_local_sandbox():
+    """Sandbox local compartido por el proceso (un único semáforo de concurrencia)"""
+    global _sandbox_local
+    if _sandbox_local is None:
+        with _sandbox_lock:
+            if _sandbox_local is None:
+                _sandbox_local = LocalSandboxEngine()
+    return _sandbox_local
+
+
+def get_execution_engine():
+    """Motor configurado en EXECUTION_ENGINE (uno por proceso, con un solo pool de workers)"""
+    global _motor
+    if _motor is None:
+        with _motor_lock:
+            if _motor is None:
+                if EXECUTION_ENGINE == LocalSandboxEngine.nombre:
+                    _motor = get_local_sandbox()
+                elif EXECUTION_ENGINE == WarmPoolEngine.nombre:
+                    _motor = WarmPoolEngine(respaldo=Judge0Engine())
+                else:
+                    if EXECUTION_ENGINE != Judge0Engine.nombre:
+                        logger.error(f"EXECUTION_ENGINE desconocido: {EXECUTION_ENGINE}, se usa judge0")
+                    _motor = Judge0Engine()
+    return _motor
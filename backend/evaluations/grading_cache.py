@@ -0,0 +1,181 @@
+# backend/evaluations/grading_cache.py
+"""
+Caché de resultados de calificación direccionada por contenido.
+
+La clave es un digest del código normalizado, el ejercicio (id y versión de su
+contenido), el lenguaje y los límites de ejecución, así que un reenvío
+idéntico devuelve la calificación anterior sin pasar por Judge0 y cualquier
+cambio en el ejercicio o en los límites invalida la entrada.
+
+Con REDIS_URL las entradas viven en Redis con TTL y un índice ordenado por
+último uso que limita el total a GRADING_CACHE_MAX_ENTRIES (se desalojan las
+menos usadas). Sin Redis se usa la caché 'grading' de Django, que ya está
+acotada por MAX_ENTRIES.
+"""
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+from . import grading_jobs
+
+logger = logging.getLogger('judge')
+
+# Alias 'grading' de CACHES (JSON comprimido en Redis)
+cache_calificacion = ConnectionProxy(caches, 'grading')
+
+GRADING_CACHE_ENABLED = getattr(settings, 'GRADING_CACHE_ENABLED', True)
+GRADING_CACHE_TTL = getattr(settings, 'GRADING_CACHE_TTL', 3600)
+GRADING_CACHE_MAX_ENTRIES = getattr(settings, 'GRADING_CACHE_MAX_ENTRIES', 10000)
+
+
+def normalizar_codigo(codigo):
+    """Ignora finales de línea, espacios al final de cada línea y líneas vacías en los extremos"""
+    lineas = (codigo or '').replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(linea.rstrip() for linea in lineas).strip('\n')
+
+
+def version_ejercicio(ejercicio):
+    """Digest de todo lo que influye en la calificación de un ejercicio"""
+    datos = json.dumps(
+        [ejercicio.contenido, ejercicio.tests_avanzados, ejercicio.puntaje],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(datos.encode('utf-8')).hexdigest()[:16]
+
+
+def clave_calificacion(codigo, ejercicio, language_id=71):
+    """Clave de caché para calificar `codigo` en `ejercicio`"""
+    from .judge_utils import DEFAULT_EXECUTION_OPTIONS
+
+    datos = json.dumps({
+        'codigo': normalizar_codigo(codigo),
+        'ejercicio': ejercicio.id,
+        'version': version_ejercicio(ejercicio),
+        'language_id': int(language_id),
+        'limites': DEFAULT_EXECUTION_OPTIONS,
+    }, sort_keys=True)
+    return hashlib.sha256(datos.encode('utf-8')).hexdigest()
+
+
+class GradingResultCache:
+    """
+    Resultados de calificación por clave de contenido.
+
+    Con `conexion` (Redis) cada resultado es un JSON en `<prefijo>:r:<clave>`
+    con TTL, `<prefijo>:lru` guarda la clave con la hora de último uso y
+    `<prefijo>:stats` cuenta aciertos y fallos. Sin conexión se delega en la
+    caché 'grading' de Django.
+    """
+
+    def __init__(self, conexion=None, prefijo='grading_cache', ttl=GRADING_CACHE_TTL,
+                 max_entradas=GRADING_CACHE_MAX_ENTRIES):
+        self.redis = conexion
+        self.prefijo = prefijo
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.lru = f"{prefijo}:lru"
+        self.stats = f"{prefijo}:stats"
+
+    def _clave(self, clave):
+        return f"{self.prefijo}:r:{clave}"
+
+    def _contar(self, campo):
+        if self.redis is not None:
+            self.redis.hincrby(self.stats, campo, 1)
+            return
+        clave = f"{self.stats}:{campo}"
+        cache_calificacion.add(clave, 0, timeout=None)
+        try:
+            cache_calificacion.incr(clave)
+        except ValueError:
+            # La caché local desalojó el contador entre add e incr
+            cache_calificacion.set(clave, 1, timeout=None)
+
+    def obtener(self, clave):
+        """Resultado guardado para la clave, o None"""
+        if self.redis is not None:
+            datos = self.redis.get(self._clave(clave))
+            if datos is not None:
+                self.redis.zadd(self.lru, {clave: time.time()})
+            resultado = json.loads(datos) if datos else None
+        else:
+            resultado = cache_calificacion.get(self._clave(clave))
+
+        self._contar('hits' if resultado is not None else 'misses')
+        return resultado
+
+    def guardar(self, clave, resultado):
+        if self.redis is None:
+            cache_calificacion.set(self._clave(clave), resultado, timeout=self.ttl)
+            return
+
+        ahora = time.time()
+        with self.redis.pipeline() as pipe:
+            pipe.set(self._clave(clave), json.dumps(resultado, default=str), ex=self.ttl)
+            pipe.zadd(self.lru, {clave: ahora})
+            # Entradas cuyo TTL ya venció
+            pipe.zremrangebyscore(self.lru, '-inf', ahora - self.ttl)
+            pipe.zcard(self.lru)
+            total = pipe.execute()[-1]
+
+        if total > self.max_entradas:
+            desalojadas = [c for c, _ in self.redis.zpopmin(self.lru, total - self.max_entradas)]
+            if desalojadas:
+                self.redis.delete(*(self._clave(c) for c in desalojadas))
+                self.redis.hincrby(self.stats, 'evictions', len(desalojadas))
+
+    def estadisticas(self):
+        if self.redis is not None:
+            stats = self.redis.hgetall(self.stats)
+            datos = {campo: int(stats.get(campo, 0)) for campo in ('hits', 'misses', 'evictions')}
+            datos['entradas'] = self.redis.zcard(self.lru)
+            return datos
+        return {campo: cache_calificacion.get(f"{self.stats}:{campo}", 0) for campo in ('hits', 'misses')}
+
+
+_grading_cache = None
+
+
+def get_grading_cache():
+    """Caché compartida por el proceso (en Redis si hay REDIS_URL)"""
+    global _grading_cache
+    if _grading_cache is None:
+        _grading_cache = GradingResultCache(grading_jobs.get_redis() if grading_jobs.REDIS_URL else None)
+    return _grading_cache
+
+
+def calificar_con_cache(calificar, codigo, ejercicio, language_id=71):
+    """
+    Devuelve la calificación en caché o llama a `calificar(codigo, ejercicio,
+    language_id)` y guarda el resultado si la calificación se completó
+
+    Un fallo de la caché nunca impide calificar: se registra y se sigue sin ella.
+    """
+    if not GRADING_CACHE_ENABLED:
+        return calificar(codigo, ejercicio, language_id)
+
+    clave = clave_calificacion(codigo, ejercicio, language_id)
+    try:
+        resultado = get_grading_cache().obtener(clave)
+    except Exception as e:
+        logger.warning(f"Caché de calificación no disponible: {str(e)}")
+        resultado = None
+
+    if resultado is not None:
+        logger.info(f"Calificación en caché para ejercicio {ejercicio.id}")
+        return {**resultado, 'desde_cache': True}
+
+    resultado = calificar(codigo, ejercicio, language_id)
+
+    # Solo se guardan calificaciones completas (no errores ni Judge0 caído)
+    if resultado.get('success') and not resultado.get('incompleto'):
+        try:
+            get_grading_cache().guardar(clave, resultado)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la calificación en caché: {str(e)}")
+    return resultado
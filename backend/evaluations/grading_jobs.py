@@ -0,0 +1,428 @@
+# backend/evaluations/grading_jobs.py
+"""
+Cola de calificación asíncrona respaldada por Redis.
+
+submit_codigo y el procesamiento local de submit_batch encolan un job y
+responden 202 con su id; el comando `grading_worker` lo toma, califica con
+Judge0, actualiza RespuestaEjercicio y EstudianteEvaluacion y deja el progreso
+por ejercicio en el propio job, que se consulta en /api/grading-jobs/<id>/.
+Sin REDIS_URL (o con GRADING_ASYNC=False) se sigue calificando en el request.
+"""
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import reverse
+from django.utils import timezone
+
+logger = logging.getLogger('judge')
+
+REDIS_URL = getattr(settings, 'REDIS_URL', '')
+GRADING_ASYNC = getattr(settings, 'GRADING_ASYNC', bool(REDIS_URL))
+GRADING_JOB_TTL = getattr(settings, 'GRADING_JOB_TTL', 3600)
+# Segundos sin latido tras los que un worker se da por caído y sus jobs se reencolan
+GRADING_WORKER_LEASE = getattr(settings, 'GRADING_WORKER_LEASE', 30)
+
+# Duración supuesta de una calificación mientras no hay medidas (segundos)
+DURACION_INICIAL = 5.0
+
+
+def espera_estimada(posicion, paralelismo, duracion_media):
+    """Segundos hasta que empiece el job en `posicion` de la cola"""
+    if posicion <= 0:
+        return 0
+    return round(math.ceil(posicion / max(1, paralelismo)) * duracion_media, 1)
+
+
+class GradingJobQueue:
+    """
+    Jobs de calificación en Redis.
+
+    Cada job es un JSON en `<prefijo>:job:<id>` (con TTL). Su id se encola en
+    `<prefijo>:cola` y pasa atómicamente (BLMOVE) a la lista del worker que
+    lo toma, `<prefijo>:procesando:<worker>`, mientras lo califica.
+
+    Cada worker se registra en el set `<prefijo>:workers` y renueva su lease
+    `<prefijo>:worker:<worker>` (clave con TTL) desde un hilo de latido. Solo
+    se reencolan los jobs de workers cuyo lease expiró: un worker caído no
+    pierde jobs y arrancar otro no vuelve a calificar los que siguen en curso.
+
+    Los hashes `<prefijo>:en_cola_por_evaluacion` y
+    `<prefijo>:en_curso_por_evaluacion` cuentan los jobs de cada evaluación
+    y `<prefijo>:stats` la duración acumulada, para estimar la espera.
+    """
+
+    def __init__(self, conexion, prefijo='grading', ttl=GRADING_JOB_TTL, worker_id=None):
+        self.redis = conexion
+        self.prefijo = prefijo
+        self.ttl = ttl
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.cola = f"{prefijo}:cola"
+        self.procesando = self._procesando(self.worker_id)
+        self.workers = f"{prefijo}:workers"
+        self.en_cola_por_evaluacion = f"{prefijo}:en_cola_por_evaluacion"
+        self.en_curso_por_evaluacion = f"{prefijo}:en_curso_por_evaluacion"
+        self.stats = f"{prefijo}:stats"
+
+    def _clave(self, job_id):
+        return f"{self.prefijo}:job:{job_id}"
+
+    def _procesando(self, worker_id):
+        return f"{self.prefijo}:procesando:{worker_id}"
+
+    def _lease(self, worker_id):
+        return f"{self.prefijo}:worker:{worker_id}"
+
+    def guardar(self, job):
+        job['actualizado'] = timezone.now().isoformat()
+        self.redis.set(self._clave(job['id']), json.dumps(job), ex=self.ttl)
+
+    def obtener(self, job_id):
+        datos = self.redis.get(self._clave(job_id))
+        return json.loads(datos) if datos else None
+
+    def encolar(self, job):
+        """Encola el job y anota en él su posición y espera estimada"""
+        self.guardar(job)
+        with self.redis.pipeline() as pipe:
+            pipe.rpush(self.cola, job['id'])
+            pipe.hincrby(self.en_cola_por_evaluacion, job['evaluacion_id'], 1)
+            pipe.scard(self.workers)
+            posicion, _, workers = pipe.execute()
+        job['posicion'] = posicion
+        job['espera_estimada_s'] = espera_estimada(posicion, workers, self.duracion_media())
+
+    def tomar(self, timeout=5):
+        """Bloquea hasta `timeout` segundos esperando un job; None si no hay"""
+        job_id = self.redis.blmove(self.cola, self.procesando, timeout, 'LEFT', 'RIGHT')
+        if job_id is None:
+            return None
+        job = self.obtener(job_id)
+        if job is None:
+            # El job expiró antes de que un worker lo tomara
+            self.confirmar(job_id)
+            return None
+        self._mover_contador(job['evaluacion_id'], self.en_cola_por_evaluacion, self.en_curso_por_evaluacion)
+        return job
+
+    def confirmar(self, job_id, evaluacion_id=None, duracion=None):
+        with self.redis.pipeline() as pipe:
+            pipe.lrem(self.procesando, 1, job_id)
+            if evaluacion_id is not None:
+                pipe.hincrby(self.en_curso_por_evaluacion, evaluacion_id, -1)
+            if duracion is not None:
+                pipe.hincrby(self.stats, 'jobs', 1)
+                pipe.hincrby(self.stats, 'ms', int(duracion * 1000))
+            pipe.execute()
+
+    def _mover_contador(self, evaluacion_id, origen, destino):
+        with self.redis.pipeline() as pipe:
+            pipe.hincrby(origen, evaluacion_id, -1)
+            pipe.hincrby(destino, evaluacion_id, 1)
+            pipe.execute()
+
+    def renovar_lease(self, lease=GRADING_WORKER_LEASE):
+        """Registra el worker y renueva su lease (lo llama el hilo de latido)"""
+        with self.redis.pipeline() as pipe:
+            pipe.sadd(self.workers, self.worker_id)
+            pipe.set(self._lease(self.worker_id), timezone.now().isoformat(), ex=lease)
+            pipe.execute()
+
+    def _reencolar(self, procesando):
+        """Devuelve a la cabeza de la cola los jobs de una lista de procesando"""
+        recuperados = 0
+        while True:
+            job_id = self.redis.lmove(procesando, self.cola, 'RIGHT', 'LEFT')
+            if not job_id:
+                break
+            job = self.obtener(job_id)
+            if job is not None:
+                self._mover_contador(job['evaluacion_id'], self.en_curso_por_evaluacion,
+                                     self.en_cola_por_evaluacion)
+            recuperados += 1
+        return recuperados
+
+    def recuperar_pendientes(self):
+        """
+        Devuelve a la cola los jobs que quedaron a medias en workers caídos
+        (sin lease); los de workers vivos no se tocan
+        """
+        # Lista única de versiones anteriores, sin dueño
+        recuperados = self._reencolar(f"{self.prefijo}:procesando")
+        for worker_id in self.redis.smembers(self.workers):
+            if worker_id == self.worker_id or self.redis.exists(self._lease(worker_id)):
+                continue
+            recuperados += self._reencolar(self._procesando(worker_id))
+            self.redis.srem(self.workers, worker_id)
+        return recuperados
+
+    def retirar(self):
+        """Baja ordenada del worker: reencola lo que tenía en curso y borra su lease"""
+        recuperados = self._reencolar(self.procesando)
+        with self.redis.pipeline() as pipe:
+            pipe.srem(self.workers, self.worker_id)
+            pipe.delete(self._lease(self.worker_id))
+            pipe.execute()
+        return recuperados
+
+    def longitud(self):
+        return self.redis.llen(self.cola)
+
+    def duracion_media(self):
+        stats = self.redis.hgetall(self.stats)
+        jobs = int(stats.get('jobs', 0))
+        return int(stats.get('ms', 0)) / jobs / 1000 if jobs else DURACION_INICIAL
+
+    def estado_evaluacion(self, evaluacion_id):
+        """Jobs en cola y en curso de una evaluación y espera estimada del último"""
+        with self.redis.pipeline() as pipe:
+            pipe.hget(self.en_cola_por_evaluacion, evaluacion_id)
+            pipe.hget(self.en_curso_por_evaluacion, evaluacion_id)
+            pipe.llen(self.cola)
+            pipe.scard(self.workers)
+            en_cola, en_curso, longitud, workers = pipe.execute()
+        # Con la cola vacía, lo que quede en el contador son jobs que expiraron
+        en_cola = max(0, int(en_cola or 0)) if longitud else 0
+        return {
+            'en_cola': en_cola,
+            'en_curso': max(0, int(en_curso or 0)),
+            'espera_estimada_s': espera_estimada(longitud if en_cola else 0, workers, self.duracion_media()),
+        }
+
+
+_redis = None
+_grading_queue = None
+_grading_queue_lock = threading.Lock()
+
+
+def get_redis():
+    """Conexión a REDIS_URL compartida por el proceso (se crea en el primer uso)"""
+    global _redis
+    if _redis is None:
+        with _grading_queue_lock:
+            if _redis is None:
+                import redis
+                _redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    return _redis
+
+
+def get_grading_queue():
+    """Cola compartida por el proceso (se conecta a Redis en el primer uso)"""
+    global _grading_queue
+    if _grading_queue is None:
+        conexion = get_redis()
+        with _grading_queue_lock:
+            if _grading_queue is None:
+                _grading_queue = GradingJobQueue(conexion)
+    return _grading_queue
+
+
+def crear_job(tipo, estudiante_evaluacion, ejercicios, **datos):
+    """
+    Crea (sin encolar) un job de calificación
+
+    Args:
+        tipo (str): 'codigo' (submit_codigo) o 'batch' (submit_batch)
+        estudiante_evaluacion (EstudianteEvaluacion): Participación del estudiante
+        ejercicios (list): Ejercicios con ejercicio_id, codigo y language_id
+        **datos: Datos extra del envío (batch_id, tiempo_total_ms)
+    """
+    return {
+        'id': uuid.uuid4().hex,
+        'tipo': tipo,
+        'estado': 'en_cola',
+        'usuario_id': estudiante_evaluacion.estudiante_id,
+        'evaluacion_id': estudiante_evaluacion.evaluacion_id,
+        'estudiante_evaluacion_id': estudiante_evaluacion.id,
+        'ejercicios': ejercicios,
+        'progreso': [
+            {'ejercicio_id': ej.get('ejercicio_id'), 'estado': 'pendiente'}
+            for ej in ejercicios
+        ],
+        'resultado': None,
+        'error': None,
+        'creado': timezone.now().isoformat(),
+        **datos
+    }
+
+
+def encolar_calificacion(tipo, estudiante_evaluacion, ejercicios, **datos):
+    """
+    Encola la calificación si la cola está activa
+
+    Returns:
+        dict: El job encolado, o None si hay que calificar en el request
+            (cola desactivada o Redis sin respuesta)
+    """
+    if not GRADING_ASYNC:
+        return None
+
+    job = crear_job(tipo, estudiante_evaluacion, ejercicios, **datos)
+    try:
+        get_grading_queue().encolar(job)
+    except Exception as e:
+        logger.error(f"No se pudo encolar la calificación, se califica en el request: {str(e)}")
+        return None
+    return job
+
+
+def guardar_job_local(job):
+    """Guarda un job que se califica en este proceso (ver admission.py)"""
+    from .grading_cache import cache_calificacion
+
+    job['actualizado'] = timezone.now().isoformat()
+    cache_calificacion.set(f"grading_job:{job['id']}", job, GRADING_JOB_TTL)
+
+
+def obtener_job(job_id):
+    from .grading_cache import cache_calificacion
+
+    from .models import JobCalificacion
+
+    job = cache_calificacion.get(f"grading_job:{job_id}")
+    if job is None and GRADING_ASYNC:
+        job = get_grading_queue().obtener(job_id)
+    if job is None:
+        # Admitido en otro proceso o antes de un reinicio (ver admission.py)
+        job = JobCalificacion.objects.filter(id=job_id).values_list('datos', flat=True).first()
+    return job
+
+
+def resumen_job(job):
+    """Estado público del job (sin el código enviado)"""
+    progreso = job.get('progreso', [])
+    return {
+        'success': job['estado'] != 'error',
+        'job_id': job['id'],
+        'tipo': job['tipo'],
+        'estado': job['estado'],
+        'completados': sum(1 for p in progreso if p['estado'] != 'pendiente'),
+        'total': len(progreso),
+        'ejercicios': progreso,
+        'resultado': job.get('resultado'),
+        'error': job.get('error'),
+        'status_url': reverse('grading_job_status', args=[job['id']]),
+        'posicion': job.get('posicion'),
+        'espera_estimada_s': job.get('espera_estimada_s'),
+    }
+
+
+def ejecutar_job(job, al_actualizar=None):
+    """
+    Califica un job y persiste sus resultados
+
+    Args:
+        job (dict): Job creado con crear_job
+        al_actualizar (callable, optional): Se llama con el job cada vez que
+            cambia su estado o el progreso de un ejercicio
+
+    Returns:
+        dict: El job con estado 'completado' (y resultado) o 'error'
+    """
+    from .judge0_scheduler import prioridad_judge0
+    from .models import Ejercicio, EstudianteEvaluacion
+    from .views import (
+        calificar_batch_local,
+        calificar_codigo,
+        guardar_respuesta_codigo,
+        guardar_resultados_batch,
+    )
+
+    def actualizar():
+        if al_actualizar:
+            al_actualizar(job)
+
+    progreso = {p['ejercicio_id']: p for p in job['progreso']}
+
+    def al_calificar(resultado):
+        p = progreso.get(resultado.get('ejercicio_id'))
+        if p:
+            p['estado'] = 'completado' if resultado.get('success') else 'error'
+            p['puntaje_obtenido'] = resultado.get('puntaje_obtenido', 0)
+            actualizar()
+
+    job['estado'] = 'procesando'
+    actualizar()
+
+    try:
+        estudiante_evaluacion = EstudianteEvaluacion.objects.select_related('evaluacion').get(
+            id=job['estudiante_evaluacion_id']
+        )
+
+        if job['tipo'] == 'codigo':
+            ej = job['ejercicios'][0]
+            language_id = ej.get('language_id', 71)
+            ejercicio = Ejercicio.objects.get(id=ej['ejercicio_id'])
+            with prioridad_judge0('submit', job['usuario_id']):
+                resultado = calificar_codigo(ej['codigo'], ejercicio, language_id)
+            guardar_respuesta_codigo(estudiante_evaluacion, ejercicio, ej['codigo'], resultado, language_id)
+            al_calificar(resultado)
+        else:
+            batch_id = job.get('batch_id', 'unknown')
+            with prioridad_judge0('final', job['usuario_id']):
+                resultados = calificar_batch_local(
+                    job['ejercicios'], job['evaluacion_id'], estudiante_evaluacion,
+                    batch_id, al_calificar=al_calificar
+                )
+            resultado = guardar_resultados_batch(
+                estudiante_evaluacion.evaluacion, estudiante_evaluacion, job['ejercicios'],
+                resultados, batch_id, tiempo_total_ms=job.get('tiempo_total_ms')
+            )
+
+        job['resultado'] = resultado
+        job['estado'] = 'completado'
+    except Exception as e:
+        logger.error(f"[Job:{job['id']}] Error al calificar: {str(e)}")
+        job['estado'] = 'error'
+        job['error'] = str(e)
+
+    actualizar()
+    return job
+
+
+def iniciar_latido(queue, lease=GRADING_WORKER_LEASE):
+    """
+    Renueva el lease del worker cada lease/3 segundos en un hilo aparte, para
+    que siga vivo mientras califica un job largo. Devuelve el Event que lo detiene.
+    """
+    detener = threading.Event()
+    queue.renovar_lease(lease)
+
+    def latir():
+        while not detener.wait(lease / 3):
+            try:
+                queue.renovar_lease(lease)
+            except Exception as e:
+                logger.warning(f"[Worker:{queue.worker_id}] No se pudo renovar el lease: {str(e)}")
+
+    threading.Thread(target=latir, name='grading-worker-latido', daemon=True).start()
+    return detener
+
+
+def procesar_siguiente(queue, timeout=5):
+    """
+    Toma un job de la cola y lo califica (una iteración del worker)
+
+    Returns:
+        dict: El job procesado, o None si no había jobs
+    """
+    job = queue.tomar(timeout)
+    if job is None:
+        return None
+
+    close_old_connections()
+    logger.info(f"[Job:{job['id']}] Calificando {job['tipo']} con {len(job['ejercicios'])} ejercicios")
+    inicio = time.monotonic()
+    try:
+        ejecutar_job(job, al_actualizar=queue.guardar)
+    finally:
+        queue.confirmar(job['id'], job['evaluacion_id'], time.monotonic() - inicio)
+        close_old_connections()
+    return job
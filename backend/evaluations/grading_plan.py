@@ -0,0 +1,133 @@
+# backend/evaluations/grading_plan.py
+"""
+Plan de calificación precompilado por ejercicio.
+
+Todo lo que no depende del código del estudiante se prepara una sola vez: el
+contenido normalizado, los ejemplos con su salida esperada, los tests de cada
+lenguaje con las funciones auxiliares ya añadidas (compilar_tests) y los
+límites de ejecución. Al calificar solo se concatena el código enviado.
+
+El plan se construye al guardar el Ejercicio (y bajo demanda para los que ya
+existían), se guarda en la caché 'grading' de Django (compartida entre
+procesos con Redis) y en memoria. Cada plan lleva PLAN_VERSION y el digest del contenido
+del ejercicio, así que un cambio en el formato o en el ejercicio lo invalida.
+"""
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+logger = logging.getLogger('judge')
+
+# Alias 'grading' de CACHES (JSON comprimido en Redis)
+cache_calificacion = ConnectionProxy(caches, 'grading')
+
+# Subir al cambiar lo que se guarda en el plan (p. ej. HARNESS_PYTHON de judge_utils)
+PLAN_VERSION = 3
+GRADING_PLAN_TTL = getattr(settings, 'GRADING_PLAN_TTL', 86400)
+
+_planes = {}
+_planes_lock = threading.Lock()
+
+
+def _clave(ejercicio_id):
+    return f"grading_plan:v{PLAN_VERSION}:{ejercicio_id}"
+
+
+def contenido_normalizado(ejercicio):
+    """`ejercicio.contenido` como diccionario (a veces se guardó como string JSON)"""
+    contenido = ejercicio.contenido or {}
+    if isinstance(contenido, str):
+        try:
+            contenido = json.loads(contenido)
+        except ValueError:
+            contenido = {}
+    return contenido if isinstance(contenido, dict) else {}
+
+
+def construir_plan(ejercicio):
+    """
+    Construye el plan de calificación de un ejercicio
+
+    Returns:
+        dict: version, digest, modo ('tests', 'ejemplos' o 'ejecucion'),
+            puntaje_maximo, ejemplos [{entrada, salida}], tests por
+            language_id (compilar_tests) y limites
+    """
+    from .grading_cache import version_ejercicio
+    from .judge_utils import (
+        DEFAULT_EXECUTION_OPTIONS,
+        LANGUAGE_IDS,
+        compilar_tests,
+        resolver_tests_lenguaje,
+    )
+
+    contenido = contenido_normalizado(ejercicio)
+    tests_avanzados = ejercicio.tests_avanzados or contenido.get('tests_avanzados')
+    ejemplos = contenido.get('ejemplos') or []
+
+    tests = {}
+    if tests_avanzados:
+        for language_id in sorted(set(LANGUAGE_IDS.values())):
+            tests_codigo = resolver_tests_lenguaje(tests_avanzados, language_id)
+            if tests_codigo:
+                tests[str(language_id)] = compilar_tests(tests_codigo, language_id)
+
+    if tests_avanzados:
+        modo = 'tests'
+    elif ejemplos:
+        modo = 'ejemplos'
+    else:
+        modo = 'ejecucion'
+
+    return {
+        'version': PLAN_VERSION,
+        'ejercicio_id': ejercicio.id,
+        'digest': version_ejercicio(ejercicio),
+        'modo': modo,
+        'puntaje_maximo': ejercicio.puntaje or 10,
+        'ejemplos': [
+            {'entrada': ejemplo.get('entrada', ''), 'salida': (ejemplo.get('salida') or '').strip()}
+            for ejemplo in ejemplos if isinstance(ejemplo, dict)
+        ],
+        'tests': tests,
+        'limites': dict(DEFAULT_EXECUTION_OPTIONS),
+    }
+
+
+def guardar_plan(ejercicio):
+    """Reconstruye y guarda el plan (se llama al guardar el Ejercicio)"""
+    plan = construir_plan(ejercicio)
+    if ejercicio.id is not None:
+        cache_calificacion.set(_clave(ejercicio.id), plan, timeout=GRADING_PLAN_TTL)
+        with _planes_lock:
+            _planes[ejercicio.id] = plan
+    return plan
+
+
+def obtener_plan(ejercicio):
+    """
+    Plan vigente del ejercicio: de memoria, de la caché compartida o, si no
+    existe o el ejercicio cambió desde entonces, construido de nuevo
+    """
+    if ejercicio.id is None:
+        return construir_plan(ejercicio)
+
+    from .grading_cache import version_ejercicio
+    digest = version_ejercicio(ejercicio)
+
+    plan = _planes.get(ejercicio.id)
+    if plan is not None and plan['digest'] == digest:
+        return plan
+
+    plan = cache_calificacion.get(_clave(ejercicio.id))
+    if plan is None or plan['digest'] != digest:
+        return guardar_plan(ejercicio)
+
+    with _planes_lock:
+        _planes[ejercicio.id] = plan
+    return plan
+
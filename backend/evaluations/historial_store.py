@@ -0,0 +1,298 @@
+# backend/evaluations/historial_store.py
+"""
+Almacenamiento normalizado del historial de evaluaciones.
+
+Antes cada HistorialEvaluacion guardaba en `detalles` el código del
+estudiante dos veces, su salida y una copia completa del contenido de cada
+ejercicio (ejemplos, tests avanzados, plantillas), repetida en cada
+estudiante de cada examen. Ahora:
+
+- SnapshotEjercicio guarda el ejercicio tal como se evaluó, una vez por
+  contenido (hash SHA-256), compartido por todos los estudiantes;
+- CodigoHistorial guarda cada código una vez por contenido;
+- HistorialRespuesta enlaza historial, snapshot y código con los puntajes y
+  la salida de la ejecución;
+- `detalles` se queda con las estadísticas y los datos de la evaluación.
+
+`detalles_completos` reconstruye el formato anterior ('respuestas' y
+'ejercicios') para las vistas y el frontend. `pagina_historial` sirve el
+listado del historial por páginas, solo con los campos del resumen: el
+código y los resultados se piden después entrada por entrada.
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import F, Prefetch, Q
+from django.db.models.fields.json import KeyTextTransform
+from django.utils.dateparse import parse_datetime
+
+HISTORIAL_PAGINA = getattr(settings, 'HISTORIAL_PAGINA', 50)
+HISTORIAL_PAGINA_MAX = getattr(settings, 'HISTORIAL_PAGINA_MAX', 200)
+
+# Columnas de HistorialEvaluacion que necesita el listado (sin datos del
+# estudiante ni del docente, que la vista no devuelve)
+CAMPOS_RESUMEN = (
+    'id', 'evaluacion_id', 'evaluacion_titulo', 'evaluacion_puntaje_total',
+    'fecha_inicio', 'fecha_fin', 'fecha_almacenamiento', 'puntaje_total',
+    'tiempo_total', 'tiempo_total_ms', 'detalles', 'evaluacion_activa',
+)
+
+# Campos del contenido que el modo historial espera al nivel del ejercicio
+CAMPOS_CONTENIDO = {
+    'restricciones': '',
+    'formato_salida': '',
+    'ejemplos': [],
+    'pista': '',
+    'etiquetas': [],
+    'credito': '',
+    'tests_avanzados': None,
+    'templates_por_lenguaje': {},
+}
+
+
+def hash_contenido(valor):
+    """SHA-256 de un texto o de un JSON en forma canónica"""
+    if not isinstance(valor, str):
+        valor = json.dumps(valor, sort_keys=True, default=str)
+    return hashlib.sha256(valor.encode('utf-8')).hexdigest()
+
+
+def datos_snapshot(ejercicio, contenido):
+    """Datos del ejercicio que se congelan en el historial"""
+    return {
+        'id': ejercicio.id,
+        'titulo': ejercicio.titulo,
+        'descripcion': ejercicio.descripcion,
+        'puntaje': float(ejercicio.puntaje),
+        'dificultad': ejercicio.dificultad,
+        'contenido': contenido,
+    }
+
+
+def separar_detalles(detalles):
+    """
+    Convierte unos `detalles` del formato anterior en (detalles compactos,
+    respuestas normalizadas). No toca la base de datos: la usan también la
+    migración que rellena las tablas nuevas y el informe de tamaño.
+    """
+    detalles = dict(detalles or {})
+    respuestas = detalles.pop('respuestas', None) or []
+    ejercicios = detalles.pop('ejercicios', None) or []
+    respuestas = [r for r in respuestas if isinstance(r, dict)]
+    ejercicios = [e for e in ejercicios if isinstance(e, dict)]
+    por_id = {e.get('id'): e for e in ejercicios}
+    # Historiales antiguos pueden tener ejercicios sin su respuesta (o al revés)
+    con_respuesta = {r.get('ejercicio_id') for r in respuestas}
+    sin_respuesta = [e for e in ejercicios if e.get('id') not in con_respuesta]
+
+    entradas = []
+    for respuesta in respuestas + sin_respuesta:
+        ejercicio_id = respuesta.get('ejercicio_id', respuesta.get('id'))
+        ejercicio = por_id.get(ejercicio_id, {})
+        contenido = ejercicio.get('contenido') if isinstance(ejercicio.get('contenido'), dict) else {}
+        puntaje_maximo = respuesta.get('puntaje_maximo', ejercicio.get('puntaje', 0))
+        entradas.append({
+            'snapshot': {
+                'id': ejercicio_id,
+                'titulo': ejercicio.get('titulo', respuesta.get('ejercicio_titulo', respuesta.get('titulo', ''))),
+                'descripcion': ejercicio.get('descripcion', respuesta.get('ejercicio_descripcion', respuesta.get('descripcion', ''))),
+                'puntaje': float(ejercicio.get('puntaje', puntaje_maximo) or 0),
+                'dificultad': ejercicio.get('dificultad'),
+                'contenido': contenido,
+            },
+            'codigo': respuesta.get('codigo') or '',
+            'language_id': respuesta.get('language_id') or 71,
+            'es_correcta': bool(respuesta.get('es_correcta', False)),
+            'puntaje_obtenido': float(respuesta.get('puntaje_obtenido') or 0),
+            'puntaje_maximo': float(puntaje_maximo or 0),
+            'resultados': [] if respuesta.get('resultados') is None else respuesta['resultados'],
+            'stderr': respuesta.get('stderr') or '',
+            'fecha_respuesta': respuesta.get('fecha_respuesta'),
+        })
+    return detalles, entradas
+
+
+def guardar_por_hash(modelo, valores):
+    """
+    Inserta las filas de `valores` (hash -> campos) que aún no existen y
+    devuelve todas como hash -> instancia. Las filas son inmutables, así que
+    una carrera entre dos inserciones solo deja una (ignore_conflicts).
+    """
+    filas = modelo.objects.in_bulk(list(valores), field_name='hash')
+    nuevas = [modelo(hash=h, **campos) for h, campos in valores.items() if h not in filas]
+    if nuevas:
+        modelo.objects.bulk_create(nuevas, ignore_conflicts=True)
+        filas.update(modelo.objects.in_bulk([n.hash for n in nuevas], field_name='hash'))
+    return filas
+
+
+def guardar_respuestas(respuestas_por_historial, modelos=None):
+    """
+    Guarda las respuestas normalizadas (ver separar_detalles) de varios
+    historiales: lista de (historial_id, entradas). Con `modelos`
+    (SnapshotEjercicio, CodigoHistorial, HistorialRespuesta) la usa también
+    la migración con sus modelos históricos.
+    """
+    if modelos is None:
+        from .models import CodigoHistorial, HistorialRespuesta, SnapshotEjercicio
+        modelos = (SnapshotEjercicio, CodigoHistorial, HistorialRespuesta)
+    SnapshotEjercicio, CodigoHistorial, HistorialRespuesta = modelos
+
+    todas = [e for _, entradas in respuestas_por_historial for e in entradas]
+    for entrada in todas:
+        entrada['hash_snapshot'] = hash_contenido(entrada['snapshot'])
+        entrada['hash_codigo'] = hash_contenido(entrada['codigo'])
+
+    snapshots = guardar_por_hash(SnapshotEjercicio, {
+        e['hash_snapshot']: {'ejercicio_id': e['snapshot']['id'] or 0, 'datos': e['snapshot']} for e in todas
+    })
+    codigos = guardar_por_hash(CodigoHistorial, {e['hash_codigo']: {'codigo': e['codigo']} for e in todas})
+
+    HistorialRespuesta.objects.bulk_create([
+        HistorialRespuesta(
+            historial_id=historial_id,
+            orden=orden,
+            snapshot=snapshots[e['hash_snapshot']],
+            codigo=codigos[e['hash_codigo']],
+            language_id=e['language_id'],
+            es_correcta=e['es_correcta'],
+            puntaje_obtenido=e['puntaje_obtenido'],
+            puntaje_maximo=e['puntaje_maximo'],
+            resultados=e['resultados'],
+            stderr=e['stderr'],
+            fecha_respuesta=parse_datetime(e['fecha_respuesta']) if isinstance(e['fecha_respuesta'], str) else e['fecha_respuesta'],
+        )
+        for historial_id, entradas in respuestas_por_historial
+        for orden, e in enumerate(entradas)
+    ])
+
+
+def con_respuestas(queryset):
+    """Precarga las respuestas de cada historial con su snapshot y su código"""
+    from .models import HistorialRespuesta
+
+    return queryset.prefetch_related(Prefetch(
+        'respuestas_guardadas',
+        queryset=HistorialRespuesta.objects.select_related('snapshot', 'codigo').order_by('orden'),
+    ))
+
+
+def detalles_completos(historial, incluir_ejercicios=True):
+    """
+    `detalles` con 'respuestas' y (opcionalmente) 'ejercicios' en el formato
+    anterior a la normalización. Usar con con_respuestas() para no hacer
+    una consulta por historial.
+    """
+    respuestas = []
+    ejercicios = []
+    for fila in historial.respuestas_guardadas.all():
+        snapshot = fila.snapshot.datos
+        codigo = fila.codigo.codigo
+        fecha = fila.fecha_respuesta.isoformat() if fila.fecha_respuesta else None
+        respuestas.append({
+            'ejercicio_id': snapshot.get('id'),
+            'ejercicio_titulo': snapshot.get('titulo', ''),
+            'ejercicio_descripcion': snapshot.get('descripcion', ''),
+            'es_correcta': fila.es_correcta,
+            'puntaje_obtenido': fila.puntaje_obtenido,
+            'puntaje_maximo': fila.puntaje_maximo,
+            'codigo': codigo,
+            'resultados': fila.resultados,
+            'stderr': fila.stderr,
+            'language_id': fila.language_id,
+            'fecha_respuesta': fecha,
+        })
+        if incluir_ejercicios:
+            contenido = snapshot.get('contenido') or {}
+            ejercicios.append({
+                'id': snapshot.get('id'),
+                'titulo': snapshot.get('titulo', ''),
+                'descripcion': snapshot.get('descripcion', ''),
+                'puntaje': snapshot.get('puntaje', fila.puntaje_maximo),
+                'dificultad': snapshot.get('dificultad'),
+                'codigo': codigo,
+                'template': codigo,
+                'language_id': fila.language_id,
+                'es_correcta': fila.es_correcta,
+                'puntaje_obtenido': fila.puntaje_obtenido,
+                'puntaje_maximo': fila.puntaje_maximo,
+                'resultados': fila.resultados,
+                'stderr': fila.stderr,
+                'contenido': contenido,
+                **{campo: contenido.get(campo, defecto) for campo, defecto in CAMPOS_CONTENIDO.items()},
+            })
+
+    detalles = {**(historial.detalles or {}), 'respuestas': respuestas}
+    if incluir_ejercicios:
+        detalles['ejercicios'] = ejercicios
+    return detalles
+
+
+def purgar_huerfanos():
+    """Borra snapshots y códigos que ya no usa ningún historial"""
+    from .models import CodigoHistorial, SnapshotEjercicio
+
+    snapshots, _ = SnapshotEjercicio.objects.filter(respuestas__isnull=True).delete()
+    codigos, _ = CodigoHistorial.objects.filter(respuestas__isnull=True).delete()
+    return snapshots, codigos
+
+
+def codificar_cursor(fecha_almacenamiento, historial_id):
+    """Cursor opaco con la posición (fecha_almacenamiento, id) de la última fila"""
+    posicion = f"{fecha_almacenamiento.isoformat()}|{historial_id}"
+    return base64.urlsafe_b64encode(posicion.encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    """(fecha_almacenamiento, id) de un cursor; ValueError si no es válido"""
+    try:
+        fecha, historial_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        fecha = parse_datetime(fecha)
+        historial_id = int(historial_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if fecha is None:
+        raise ValueError('Cursor inválido')
+    return fecha, historial_id
+
+
+def pagina_historial(estudiante_id, cursor=None, limite=HISTORIAL_PAGINA):
+    """
+    Una página del historial de un estudiante, del más reciente al más
+    antiguo: (filas, siguiente_cursor). Cada fila es un dict con
+    CAMPOS_RESUMEN y 'respuestas' (ejercicio, puntajes y fecha, sin código
+    ni resultados). Paginación por clave (fecha_almacenamiento, id), que
+    recorre el índice (estudiante_id, -fecha_almacenamiento) sin OFFSET.
+    Son dos consultas por página.
+    """
+    from .models import HistorialEvaluacion, HistorialRespuesta
+
+    limite = max(1, min(int(limite), HISTORIAL_PAGINA_MAX))
+    historiales = HistorialEvaluacion.objects.filter(estudiante_id=estudiante_id)
+    if cursor:
+        fecha, historial_id = decodificar_cursor(cursor)
+        historiales = historiales.filter(
+            Q(fecha_almacenamiento__lt=fecha) | Q(fecha_almacenamiento=fecha, id__lt=historial_id)
+        )
+    filas = list(historiales.order_by('-fecha_almacenamiento', '-id').values(*CAMPOS_RESUMEN)[:limite + 1])
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1]['fecha_almacenamiento'], filas[-1]['id'])
+
+    por_historial = {fila['id']: [] for fila in filas}
+    respuestas = HistorialRespuesta.objects.filter(historial_id__in=list(por_historial)).order_by(
+        'historial_id', 'orden'
+    ).values(
+        'historial_id', 'es_correcta', 'puntaje_obtenido', 'puntaje_maximo', 'fecha_respuesta',
+        ejercicio_id=F('snapshot__ejercicio_id'),
+        ejercicio_titulo=KeyTextTransform('titulo', 'snapshot__datos'),
+    )
+    for respuesta in respuestas:
+        por_historial[respuesta.pop('historial_id')].append(respuesta)
+    for fila in filas:
+        fila['respuestas'] = por_historial[fila['id']]
+    return filas, siguiente
@@ -0,0 +1,155 @@
+# backend/evaluations/judge0_scheduler.py
+"""
+Planificador de ejecuciones en Judge0 por prioridad y por estudiante.
+
+Cada ejecución con Judge0 (Judge0Engine) pide un turno antes de enviar y lo
+libera al tener el resultado, así que en cada proceso nunca hay más de
+JUDGE0_MAX_WORKERS ejecuciones en curso. Al liberarse un turno se atiende:
+
+1. la clase de mayor prioridad con peticiones en espera: 'final' (submit_batch
+   y sus jobs), después 'submit' (submit_codigo) y por último 'test'
+   (test_codigo);
+2. dentro de la clase, al siguiente estudiante en rotación, para que quien
+   envía muchos ejercicios no deje esperando a los demás;
+3. dentro del estudiante, por orden de llegada.
+
+La clase y el estudiante se fijan con `prioridad_judge0(...)` en la vista o en
+el worker y viajan en un ContextVar; los hilos que se lanzan para calificar en
+paralelo deben ejecutarse con una copia del contexto (contextvars.copy_context).
+"""
+import collections
+import contextlib
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+
+JUDGE0_MAX_WORKERS = getattr(settings, 'JUDGE0_MAX_WORKERS', 5)
+
+# De mayor a menor prioridad
+PRIORIDADES = ('final', 'submit', 'test')
+PRIORIDAD_POR_DEFECTO = 'submit'
+
+_solicitud = contextvars.ContextVar('judge0_solicitud', default=(PRIORIDAD_POR_DEFECTO, None))
+
+
+@contextlib.contextmanager
+def prioridad_judge0(clase, estudiante=None):
+    """Las ejecuciones en Judge0 dentro del bloque usan esta clase y estudiante"""
+    if clase not in PRIORIDADES:
+        raise ValueError(f"Prioridad desconocida: {clase}")
+    token = _solicitud.set((clase, estudiante))
+    try:
+        yield
+    finally:
+        _solicitud.reset(token)
+
+
+class Judge0Scheduler:
+    """
+    Semáforo de `max_concurrentes` turnos con colas por prioridad.
+
+    Cada clase tiene un OrderedDict estudiante -> cola de esperas; el
+    estudiante atendido pasa al final, lo que da el reparto round-robin.
+    Quien libera un turno se lo entrega directamente al siguiente, así que
+    nadie que llegue después puede colarse.
+    """
+
+    def __init__(self, max_concurrentes=JUDGE0_MAX_WORKERS):
+        self.max_concurrentes = max_concurrentes
+        self._lock = threading.Lock()
+        self._en_curso = 0
+        self._colas = {clase: collections.OrderedDict() for clase in PRIORIDADES}
+        self._metricas = {
+            clase: {'atendidas': 0, 'espera_total': 0.0, 'espera_max': 0.0}
+            for clase in PRIORIDADES
+        }
+
+    @contextlib.contextmanager
+    def turno(self):
+        """Espera un turno para la clase y estudiante del contexto actual"""
+        clase, estudiante = _solicitud.get()
+        llegada = time.perf_counter()
+        evento = None
+        with self._lock:
+            if self._en_curso < self.max_concurrentes and not self._en_espera():
+                self._en_curso += 1
+            else:
+                evento = threading.Event()
+                self._colas[clase].setdefault(estudiante, collections.deque()).append(evento)
+
+        if evento is not None:
+            evento.wait()
+
+        espera = time.perf_counter() - llegada
+        with self._lock:
+            metricas = self._metricas[clase]
+            metricas['atendidas'] += 1
+            metricas['espera_total'] += espera
+            metricas['espera_max'] = max(metricas['espera_max'], espera)
+
+        try:
+            yield espera
+        finally:
+            self._liberar()
+
+    def _en_espera(self):
+        return any(self._colas[clase] for clase in PRIORIDADES)
+
+    def _siguiente(self):
+        for clase in PRIORIDADES:
+            cola = self._colas[clase]
+            if cola:
+                estudiante, esperas = next(iter(cola.items()))
+                evento = esperas.popleft()
+                if esperas:
+                    cola.move_to_end(estudiante)
+                else:
+                    del cola[estudiante]
+                return evento
+        return None
+
+    def _liberar(self):
+        with self._lock:
+            evento = self._siguiente()
+            if evento is None:
+                self._en_curso -= 1
+        # El turno pasa al siguiente sin volver a quedar libre
+        if evento is not None:
+            evento.set()
+
+    def estadisticas(self):
+        """Turnos en curso y, por clase, profundidad de la cola y esperas"""
+        with self._lock:
+            clases = {}
+            for clase in PRIORIDADES:
+                cola = self._colas[clase]
+                metricas = self._metricas[clase]
+                atendidas = metricas['atendidas']
+                clases[clase] = {
+                    'en_cola': sum(len(esperas) for esperas in cola.values()),
+                    'estudiantes_en_cola': len(cola),
+                    'atendidas': atendidas,
+                    'espera_media_ms': round(metricas['espera_total'] * 1000 / atendidas, 1) if atendidas else 0,
+                    'espera_max_ms': round(metricas['espera_max'] * 1000, 1),
+                }
+            return {
+                'en_curso': self._en_curso,
+                'max_concurrentes': self.max_concurrentes,
+                'clases': clases,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_judge0_scheduler():
+    """Planificador compartido por el proceso"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = Judge0Scheduler()
+    return _scheduler
@@ -0,0 +1,219 @@
+# backend/evaluations/management/commands/_judge0_stub.py
+"""
+Servidor Judge0 simulado para los benchmarks.
+
+Implementa el subconjunto de la API que usa judge_utils (/statuses,
+/submissions y /submissions/batch) sin ejecutar código: cada submission queda
+"En proceso" durante `tiempo_ejecucion` segundos y luego se marca Accepted con
+stdout igual a expected_output (o vacío). POST /submissions?wait=true espera
+ese tiempo y responde con el resultado completo, y las submissions con
+callback_url reciben el resultado por PUT (en base64, como Judge0). Como
+Judge0, rechaza (422) los batch de más de `max_batch` submissions. Mantiene conexiones HTTP/1.1
+keep-alive y cuenta las conexiones TCP abiertas para comparar clientes.
+"""
+import base64
+import json
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _Judge0StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Cabeceras y cuerpo se escriben por separado: sin TCP_NODELAY el
+        # algoritmo de Nagle añade ~40ms a cada respuesta keep-alive
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.conexiones += 1
+
+    def _responder(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _leer_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _crear(self, data):
+        token = uuid.uuid4().hex
+        with self.server.lock:
+            self.server.submissions[token] = {
+                'creada': time.monotonic(),
+                'data': data,
+            }
+        if data.get('callback_url'):
+            timer = threading.Timer(self.server.tiempo_ejecucion, self._callback, args=(token,))
+            timer.daemon = True
+            timer.start()
+        return token
+
+    def _callback(self, token):
+        resultado = self._estado(token)
+        for campo in ('stdout', 'stderr', 'compile_output'):
+            if resultado[campo]:
+                resultado[campo] = base64.b64encode(resultado[campo].encode('utf-8')).decode('ascii')
+        peticion = urllib.request.Request(
+            self.server.submissions[token]['data']['callback_url'],
+            data=json.dumps(resultado).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='PUT'
+        )
+        try:
+            urllib.request.urlopen(peticion, timeout=5).close()
+        except OSError:
+            pass
+
+    def _estado(self, token):
+        with self.server.lock:
+            sub = self.server.submissions.get(token)
+        if sub is None:
+            return None
+        data = sub['data']
+        if time.monotonic() - sub['creada'] < self.server.tiempo_ejecucion:
+            return {'token': token, 'status': {'id': 2, 'description': 'Processing'},
+                    'stdout': None, 'stderr': None, 'compile_output': None,
+                    'time': None, 'memory': None}
+        return {
+            'token': token,
+            'status': {'id': 3, 'description': 'Accepted'},
+            'stdout': data.get('expected_output') or '',
+            'stderr': None,
+            'compile_output': None,
+            'time': '0.01',
+            'memory': 3000,
+        }
+
+    def _batch_excedido(self, cantidad):
+        """Responde 422 (como Judge0) si el batch supera max_batch"""
+        if cantidad <= self.server.max_batch:
+            return False
+        self._responder(422, {'error': 'number of submissions in a batch should be less than '
+                                       f'or equal to {self.server.max_batch}'})
+        return True
+
+    def _contar(self, url):
+        with self.server.lock:
+            clave = (self.command, url.path)
+            self.server.peticiones[clave] = self.server.peticiones.get(clave, 0) + 1
+
+    def do_GET(self):
+        time.sleep(self.server.latencia)
+        url = urlparse(self.path)
+        self._contar(url)
+        query = parse_qs(url.query)
+
+        if url.path == '/statuses':
+            self._responder(200, [{'id': 1, 'description': 'In Queue'},
+                                  {'id': 3, 'description': 'Accepted'}])
+        elif url.path == '/submissions/batch':
+            tokens = (query.get('tokens') or [''])[0].split(',')
+            if self._batch_excedido(len(tokens)):
+                return
+            self._responder(200, {'submissions': [self._estado(t) for t in tokens if t]})
+        elif url.path.startswith('/submissions/'):
+            resultado = self._estado(url.path.rsplit('/', 1)[-1])
+            if resultado is None:
+                self._responder(404, {'error': 'Not found'})
+            else:
+                self._responder(200, resultado)
+        else:
+            self._responder(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        time.sleep(self.server.latencia)
+        url = urlparse(self.path)
+        self._contar(url)
+        data = self._leer_json()
+
+        if url.path == '/submissions/batch':
+            if self._batch_excedido(len(data.get('submissions', []))):
+                return
+            tokens = [{'token': self._crear(sub)} for sub in data.get('submissions', [])]
+            self._responder(201, tokens)
+        elif url.path == '/submissions':
+            token = self._crear(data)
+            if parse_qs(url.query).get('wait') == ['true']:
+                # Modo síncrono: responder cuando termina la ejecución
+                time.sleep(self.server.tiempo_ejecucion)
+                self._responder(201, self._estado(token))
+            else:
+                self._responder(201, {'token': token})
+        else:
+            self._responder(404, {'error': 'Not found'})
+
+
+class Judge0Stub:
+    """
+    Judge0 local en un hilo de fondo.
+
+    Args:
+        latencia (float): Segundos de espera añadidos a cada petición
+        tiempo_ejecucion (float): Segundos que una submission permanece en proceso
+        max_batch (int): Submissions por batch admitidas (MAX_SUBMISSION_BATCH_SIZE de Judge0)
+    """
+
+    def __init__(self, latencia=0.0, tiempo_ejecucion=0.0, max_batch=20):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Judge0StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.submissions = {}
+        self.server.conexiones = 0
+        self.server.peticiones = {}
+        self.server.latencia = latencia
+        self.server.tiempo_ejecucion = tiempo_ejecucion
+        self.server.max_batch = max_batch
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def conexiones(self):
+        return self.server.conexiones
+
+    def peticiones(self, metodo, ruta=None):
+        """
+        Número de peticiones recibidas, p. ej. peticiones('POST', '/submissions/batch');
+        sin ruta cuenta todas las del método
+        """
+        if ruta is None:
+            return sum(n for (m, _), n in self.server.peticiones.items() if m == metodo)
+        return self.server.peticiones.get((metodo, ruta), 0)
+
+    def reset_conexiones(self):
+        with self.server.lock:
+            self.server.conexiones = 0
+            self.server.peticiones = {}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,82 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Código que se ejecuta en un proceso nuevo: registra cualquier intento de
+# conexión de red mientras se importa judge_utils
+SCRIPT_IMPORT = """
+import json, os, sys, time
+conexiones = []
+def _auditar(evento, args):
+    if evento in ('socket.connect', 'socket.getaddrinfo'):
+        conexiones.append(evento)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+sys.addaudithook(_auditar)
+inicio = time.perf_counter()
+import evaluations.judge_utils
+import evaluations.views
+print(json.dumps({'conexiones': len(conexiones), 'import_ms': (time.perf_counter() - inicio) * 1000}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque con Judge0 inalcanzable: conexiones de red al importar "
+        "judge_utils (python -X importtime) y tiempo total de 'manage.py check'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--judge0-url', default='http://10.255.255.1:2358',
+                            help='URL de Judge0 a usar (por defecto una IP sin ruta)')
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, JUDGE0_API_URL=options['judge0_url'])
+        cwd = str(settings.BASE_DIR)
+
+        self.stdout.write(f"Judge0 configurado en {options['judge0_url']}")
+
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', SCRIPT_IMPORT],
+            cwd=cwd, env=env, capture_output=True, text=True, timeout=120
+        )
+        if proceso.returncode != 0:
+            self.stderr.write(proceso.stderr[-2000:])
+            return
+
+        datos = json.loads(proceso.stdout.strip().splitlines()[-1])
+        acumulado_us = None
+        for linea in proceso.stderr.splitlines():
+            match = re.match(r"import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*evaluations\.judge_utils$", linea.strip())
+            if match:
+                acumulado_us = int(match.group(1))
+
+        estilo = self.style.SUCCESS if datos['conexiones'] == 0 else self.style.ERROR
+        self.stdout.write(estilo(
+            f"Conexiones de red al importar judge_utils/views: {datos['conexiones']}"
+        ))
+        if acumulado_us is not None:
+            self.stdout.write(f"importtime evaluations.judge_utils (acumulado): {acumulado_us / 1000:.1f}ms")
+        self.stdout.write(f"Import de judge_utils + views: {datos['import_ms']:.1f}ms")
+
+        tiempos = []
+        for _ in range(options['repeticiones']):
+            inicio = time.perf_counter()
+            subprocess.run(
+                [sys.executable, 'manage.py', 'check'],
+                cwd=cwd, env=env, capture_output=True, timeout=120
+            )
+            tiempos.append(time.perf_counter() - inicio)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"manage.py check: media={statistics.mean(tiempos):.2f}s min={min(tiempos):.2f}s"
+        ))
@@ -0,0 +1,59 @@
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from evaluations import judge_utils
+from evaluations.judge_utils import Judge0Client
+from evaluations.models import Ejercicio
+from evaluations.views import calificar_ejercicios
+
+from ._judge0_stub import Judge0Stub
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuánto tarda la calificación local de submit_batch contra un "
+        "Judge0 simulado: ejercicios en secuencia frente al pool acotado por "
+        "JUDGE0_MAX_WORKERS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ejercicios', type=int, default=8,
+                            help='Ejercicios del batch')
+        parser.add_argument('--ejemplos', type=int, default=3,
+                            help='Ejemplos por ejercicio')
+        parser.add_argument('--tiempo-ejecucion', type=float, default=0.5,
+                            help='Segundos que Judge0 tarda en cada submission')
+        parser.add_argument('--workers', type=int, default=settings.JUDGE0_MAX_WORKERS,
+                            help='Tamaño del pool (por defecto JUDGE0_MAX_WORKERS)')
+
+    def handle(self, *args, **options):
+        ejemplos = [{'entrada': str(i), 'salida': str(i * 2)} for i in range(options['ejemplos'])]
+        # Ejercicios sin guardar: la calificación no toca la base de datos
+        tareas = [
+            (Ejercicio(id=i, puntaje=10, contenido={'ejemplos': ejemplos}), 'print(int(input()) * 2)', 71)
+            for i in range(1, options['ejercicios'] + 1)
+        ]
+
+        with Judge0Stub(tiempo_ejecucion=options['tiempo_ejecucion']) as stub:
+            client = Judge0Client(stub.url, pool_size=options['workers'] * 2)
+            self.stdout.write(
+                f"Judge0 simulado en {stub.url} - {len(tareas)} ejercicios, "
+                f"{options['tiempo_ejecucion']}s por ejecución"
+            )
+
+            with patch.object(judge_utils, '_judge0_client', client):
+                judge_utils.check_judge0_availability(forzar=True)
+                for nombre, workers in (('secuencial', 1), (f"pool de {options['workers']}", options['workers'])):
+                    inicio = time.perf_counter()
+                    resultados = calificar_ejercicios(tareas, max_workers=workers)
+                    total = time.perf_counter() - inicio
+                    correctos = sum(1 for r in resultados if r.get('es_correcto'))
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{nombre:>14}: total={total:.2f}s "
+                        f"por_ejercicio={total / len(tareas):.2f}s correctos={correctos}/{len(tareas)}"
+                    ))
+
+            client.close()
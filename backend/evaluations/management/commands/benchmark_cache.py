@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de set/get de cada alias de CACHES con una entrada "
+        "pequeña y con una calificación grande en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operaciones', type=int, default=500,
+                            help='Operaciones set/get por alias y tamaño')
+        parser.add_argument('--ejemplos', type=int, default=200,
+                            help='Ejemplos de la calificación grande')
+
+    def handle(self, *args, **options):
+        operaciones = options['operaciones']
+        pequena = {'ejercicio_id': 1, 'puntaje_obtenido': 10, 'es_correcto': True}
+        grande = {
+            'success': True,
+            'puntaje_obtenido': 10,
+            'resultados': [
+                {'ejemplo': i + 1, 'entrada': str(i), 'salida_esperada': str(i * 2),
+                 'salida_obtenida': str(i * 2), 'es_correcto': True, 'tiempo': '0.01',
+                 'error': '', 'stderr': ''}
+                for i in range(options['ejemplos'])
+            ],
+        }
+
+        for alias in settings.CACHES:
+            backend = settings.CACHES[alias]['BACKEND'].rsplit('.', 1)[-1]
+            cache = caches[alias]
+            for nombre, valor in (('pequeña', pequena), ('grande', grande)):
+                claves = [f"benchmark_cache:{nombre}:{i}" for i in range(operaciones)]
+                escrituras = self._medir(lambda clave: cache.set(clave, valor, 60), claves)
+                lecturas = self._medir(cache.get, claves)
+                cache.delete_many(claves)
+                self.stdout.write(self.style.SUCCESS(
+                    f"{alias:>10} ({backend}) {nombre:>7}: "
+                    f"set p50={statistics.median(escrituras):.3f}ms p95={self._p95(escrituras):.3f}ms "
+                    f"get p50={statistics.median(lecturas):.3f}ms p95={self._p95(lecturas):.3f}ms"
+                ))
+
+    def _medir(self, operacion, claves):
+        tiempos = []
+        for clave in claves:
+            inicio = time.perf_counter()
+            operacion(clave)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
+
+    def _p95(self, tiempos):
+        return sorted(tiempos)[int(len(tiempos) * 0.95) - 1]
@@ -0,0 +1,116 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from evaluations.historial_store import (con_respuestas, detalles_completos, guardar_respuestas,
+                                         pagina_historial)
+from evaluations.models import HistorialEvaluacion
+
+# Estudiante ficticio: las filas se crean dentro de una transacción que se deshace
+ESTUDIANTE_ID = 999_999_999
+
+
+def listado_completo(estudiante_id):
+    """El listado anterior: todas las filas y columnas, con código y resultados"""
+    resultados = []
+    for historial in con_respuestas(HistorialEvaluacion.objects.filter(estudiante_id=estudiante_id)):
+        detalles = detalles_completos(historial, incluir_ejercicios=False)
+        resultados.append({
+            'id': historial.id,
+            'titulo': historial.evaluacion_titulo,
+            'puntaje': historial.puntaje_total,
+            'respuestas': detalles['respuestas'],
+            'detalles_adicionales': detalles,
+        })
+    return resultados
+
+
+def listado_paginado(estudiante_id, limite):
+    """Todas las páginas de pagina_historial siguiendo el cursor"""
+    filas, cursor = pagina_historial(estudiante_id, limite=limite)
+    while cursor:
+        pagina, cursor = pagina_historial(estudiante_id, cursor=cursor, limite=limite)
+        filas.extend(pagina)
+    return filas
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el listado del historial completo (como antes) con el "
+        "paginado por cursor sobre N historiales de un estudiante creados "
+        "en una transacción que se deshace al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--historiales', type=int, default=500)
+        parser.add_argument('--ejercicios', type=int, default=5,
+                            help='Respuestas por historial')
+        parser.add_argument('--limite', type=int, default=50, help='Historiales por página')
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._crear(options['historiales'], options['ejercicios'])
+            limite = options['limite']
+            for nombre, listado in (
+                ('completo (antes)', lambda: listado_completo(ESTUDIANTE_ID)),
+                ('primera página', lambda: pagina_historial(ESTUDIANTE_ID, limite=limite)[0]),
+                ('todas las páginas', lambda: listado_paginado(ESTUDIANTE_ID, limite)),
+            ):
+                self._medir(nombre, listado, options['repeticiones'])
+
+            if connection.vendor == 'postgresql':
+                consulta = HistorialEvaluacion.objects.filter(estudiante_id=ESTUDIANTE_ID).order_by(
+                    '-fecha_almacenamiento', '-id').values('id')[:limite + 1]
+                self.stdout.write("Plan de la primera página:")
+                self.stdout.write(consulta.explain())
+            transaction.set_rollback(True)
+
+    def _medir(self, nombre, listado, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                filas = listado()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        tamano = len(json.dumps(filas, default=str).encode('utf-8'))
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre:>18}: {len(filas)} filas, p50={statistics.median(tiempos):.1f}ms "
+            f"max={max(tiempos):.1f}ms, {len(consultas)} consultas, {tamano:,} bytes"
+        ))
+
+    def _crear(self, n_historiales, n_ejercicios):
+        contenido = {
+            'ejemplos': [{'entrada': str(k), 'salida': str(k * 2)} for k in range(5)],
+            'tests_avanzados': ''.join(f'assert doble({k}) == {k * 2}\n' for k in range(20)),
+            'templates_por_lenguaje': {str(l): '# Escribe tu solución aquí\n' * 4 for l in (71, 62, 54, 63)},
+        }
+        ahora = timezone.now()
+        respuestas = []
+        for i in range(n_historiales):
+            historial = HistorialEvaluacion.objects.create(
+                estudiante_id=ESTUDIANTE_ID, evaluacion_id=i + 1, evaluacion_titulo=f'Evaluación {i + 1}',
+                evaluacion_puntaje_total=10 * n_ejercicios, puntaje_total=7.0 * n_ejercicios,
+                fecha_inicio=ahora, fecha_fin=ahora,
+                detalles={'estadisticas': {'total_ejercicios': n_ejercicios}},
+            )
+            respuestas.append((historial.id, [{
+                'snapshot': {'id': i * n_ejercicios + j, 'titulo': f'Ejercicio {j + 1}',
+                             'descripcion': 'Lee un número e imprime su doble. ' * 8,
+                             'puntaje': 10.0, 'dificultad': 'media', 'contenido': contenido},
+                'codigo': f"# historial {i}\nn = int(input())\nprint(n * 2)\n" + "print()\n" * j,
+                'language_id': 71,
+                'es_correcta': j % 3 != 0,
+                'puntaje_obtenido': 10.0 if j % 3 else 0.0,
+                'puntaje_maximo': 10.0,
+                'resultados': [{'entrada': str(k), 'salida_obtenida': str(k * 2), 'es_correcto': True,
+                                'tiempo': '0.020'} for k in range(5)],
+                'stderr': '',
+                'fecha_respuesta': ahora,
+            } for j in range(n_ejercicios)]))
+        guardar_respuestas(respuestas)
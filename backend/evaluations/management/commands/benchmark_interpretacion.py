@@ -0,0 +1,37 @@
+import statistics
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from evaluations.judge_utils import interpretar_resultado_judge0
+
+SUBMISSIONS = {
+    'accepted': {'status': {'id': 3}, 'stdout': '42\n', 'stderr': None},
+    'wrong_answer': {'status': {'id': 4}, 'stdout': '41\n', 'stderr': None},
+    'compilation_error': {'status': {'id': 6}, 'compile_output': 'SyntaxError: invalid syntax'},
+    'runtime_error': {'status': {'id': 11}, 'stderr': 'Traceback...\nZeroDivisionError: division by zero'},
+    'eof_sin_entrada': {'status': {'id': 11}, 'stderr': 'Traceback...\nEOFError: EOF when reading a line'},
+}
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark de interpretar_resultado_judge0 por estado de Judge0."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=100000,
+                            help='Llamadas por medición')
+        parser.add_argument('--repeticiones', type=int, default=5,
+                            help='Mediciones por estado (se informa la mediana)')
+
+    def handle(self, *args, **options):
+        iteraciones = options['iteraciones']
+        for nombre, submission in SUBMISSIONS.items():
+            tiempos = timeit.repeat(
+                lambda: interpretar_resultado_judge0(submission, 10),
+                number=iteraciones, repeat=options['repeticiones']
+            )
+            por_llamada_ns = statistics.median(tiempos) / iteraciones * 1e9
+            self.stdout.write(self.style.SUCCESS(
+                f"{nombre:>18}: {por_llamada_ns:.0f}ns/llamada "
+                f"({1e9 / por_llamada_ns:,.0f} llamadas/s)"
+            ))
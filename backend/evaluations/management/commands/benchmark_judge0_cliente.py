@@ -0,0 +1,77 @@
+import concurrent.futures
+import statistics
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from evaluations.judge_utils import Judge0Client
+
+from ._judge0_stub import Judge0Stub
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la latencia de ejecuciones (POST + GET) contra un Judge0 "
+        "simulado usando peticiones sueltas frente al cliente con pool keep-alive."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ejecuciones', type=int, default=500,
+                            help='Número de ejecuciones por modo')
+        parser.add_argument('--workers', type=int, default=settings.JUDGE0_MAX_WORKERS,
+                            help='Hilos concurrentes (por defecto JUDGE0_MAX_WORKERS)')
+        parser.add_argument('--latencia', type=float, default=0.0,
+                            help='Latencia artificial por petición en segundos')
+
+    def handle(self, *args, **options):
+        ejecuciones = options['ejecuciones']
+        workers = options['workers']
+
+        with Judge0Stub(latencia=options['latencia']) as stub:
+            self.stdout.write(
+                f"Judge0 simulado en {stub.url} - {ejecuciones} ejecuciones, {workers} workers"
+            )
+
+            def ejecucion_sin_pool():
+                inicio = time.perf_counter()
+                token = requests.post(
+                    f"{stub.url}/submissions",
+                    json={'source_code': 'print(1)', 'language_id': 71},
+                    headers={'Content-Type': 'application/json'},
+                    timeout=10
+                ).json()['token']
+                requests.get(f"{stub.url}/submissions/{token}", timeout=10).json()
+                return time.perf_counter() - inicio
+
+            client = Judge0Client(stub.url, pool_size=workers * 2)
+
+            def ejecucion_con_pool():
+                inicio = time.perf_counter()
+                token = client.post(
+                    '/submissions',
+                    json={'source_code': 'print(1)', 'language_id': 71}
+                ).json()['token']
+                client.get(f"/submissions/{token}").json()
+                return time.perf_counter() - inicio
+
+            for nombre, funcion in (('requests sin pool', ejecucion_sin_pool),
+                                    ('Judge0Client', ejecucion_con_pool)):
+                stub.reset_conexiones()
+                inicio = time.perf_counter()
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    tiempos = list(executor.map(lambda _: funcion(), range(ejecuciones)))
+                total = time.perf_counter() - inicio
+                self._reportar(nombre, tiempos, total, stub.conexiones)
+
+            client.close()
+
+    def _reportar(self, nombre, tiempos, total, conexiones):
+        tiempos_ms = sorted(t * 1000 for t in tiempos)
+        p95 = tiempos_ms[int(len(tiempos_ms) * 0.95) - 1]
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre:>20}: media={statistics.mean(tiempos_ms):.2f}ms "
+            f"p50={statistics.median(tiempos_ms):.2f}ms p95={p95:.2f}ms "
+            f"total={total:.2f}s conexiones_tcp={conexiones}"
+        ))
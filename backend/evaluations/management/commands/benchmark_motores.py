@@ -0,0 +1,75 @@
+import concurrent.futures
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from evaluations import judge_utils
+from evaluations.execution_engines import Judge0Engine, LocalSandboxEngine
+from evaluations.judge_utils import Judge0Client
+
+from ._judge0_stub import Judge0Stub
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la latencia de ejecución del motor Judge0 (simulado o real con "
+        "--judge0-url) frente al sandbox local de procesos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ejecuciones', type=int, default=100,
+                            help='Número de ejecuciones por motor')
+        parser.add_argument('--workers', type=int, default=settings.JUDGE0_MAX_WORKERS,
+                            help='Hilos concurrentes (por defecto JUDGE0_MAX_WORKERS)')
+        parser.add_argument('--judge0-url', default=None,
+                            help='Judge0 real; por defecto se usa uno simulado')
+        parser.add_argument('--latencia', type=float, default=0.0,
+                            help='Latencia artificial por petición del Judge0 simulado')
+
+    def handle(self, *args, **options):
+        ejecuciones = options['ejecuciones']
+        workers = options['workers']
+        codigo = "print(sum(int(x) for x in input().split()))"
+
+        stub = None
+        url = options['judge0_url']
+        if url is None:
+            stub = Judge0Stub(latencia=options['latencia']).start()
+            url = stub.url
+
+        client = Judge0Client(url, pool_size=workers * 2)
+        cliente_original = judge_utils._judge0_client
+        judge_utils._judge0_client = client
+        try:
+            self.stdout.write(f"Judge0 en {url} - {ejecuciones} ejecuciones, {workers} workers")
+            motores = (('judge0', Judge0Engine()),
+                       ('local', LocalSandboxEngine(max_concurrentes=workers)))
+            for nombre, motor in motores:
+                def ejecucion(i):
+                    inicio = time.perf_counter()
+                    resultado = motor.ejecutar(codigo, f"{i} {i}", str(2 * i))
+                    return time.perf_counter() - inicio, resultado['success']
+
+                inicio = time.perf_counter()
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    medidas = list(executor.map(ejecucion, range(ejecuciones)))
+                total = time.perf_counter() - inicio
+                self._reportar(nombre, medidas, total)
+        finally:
+            judge_utils._judge0_client = cliente_original
+            client.close()
+            if stub is not None:
+                stub.stop()
+
+    def _reportar(self, nombre, medidas, total):
+        tiempos_ms = sorted(t * 1000 for t, _ in medidas)
+        correctas = sum(1 for _, ok in medidas if ok)
+        p95 = tiempos_ms[int(len(tiempos_ms) * 0.95) - 1]
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre:>8}: media={statistics.mean(tiempos_ms):.2f}ms "
+            f"p50={statistics.median(tiempos_ms):.2f}ms p95={p95:.2f}ms "
+            f"total={total:.2f}s ejecuciones/s={len(medidas) / total:.1f} "
+            f"correctas={correctas}/{len(medidas)}"
+        ))
@@ -0,0 +1,71 @@
+import concurrent.futures
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from evaluations.execution_engines import LocalSandboxEngine, WarmPoolEngine
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara ejemplos por segundo al verificar código Python con "
+        "subprocess.run en frío, el sandbox local y los workers precalentados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ejemplos', type=int, default=200,
+                            help='Número de ejemplos por modo')
+        parser.add_argument('--workers', type=int, default=settings.WARM_POOL_WORKERS,
+                            help='Ejecuciones simultáneas (por defecto WARM_POOL_WORKERS)')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        codigo = "import collections\nprint(sum(int(x) for x in input().split()))"
+        casos = [(f"{i} {i}", str(2 * i)) for i in range(options['ejemplos'])]
+
+        def subprocess_en_frio(casos):
+            # Lo que hacía procesar_ejercicio sin Judge0: un fichero y un intérprete por ejemplo
+            def ejecutar(caso):
+                with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+                    f.write(codigo)
+                try:
+                    proceso = subprocess.run([sys.executable, f.name], input=caso[0],
+                                             capture_output=True, text=True, timeout=5)
+                finally:
+                    os.unlink(f.name)
+                return {'success': proceso.stdout.strip() == caso[1]}
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(ejecutar, casos))
+
+        pool = WarmPoolEngine(max_concurrentes=workers)
+        inicio = time.perf_counter()
+        pool.calentar()
+        self.stdout.write(
+            f"{len(casos)} ejemplos, {workers} workers "
+            f"(arranque del pool: {(time.perf_counter() - inicio) * 1000:.0f}ms)"
+        )
+
+        try:
+            modos = (
+                ('subprocess.run', subprocess_en_frio),
+                ('local', lambda casos: LocalSandboxEngine(max_concurrentes=workers).ejecutar_lote(codigo, casos)),
+                ('pool', lambda casos: pool.ejecutar_lote(codigo, casos)),
+            )
+            for nombre, verificar in modos:
+                inicio = time.perf_counter()
+                resultados = verificar(casos)
+                total = time.perf_counter() - inicio
+                correctos = sum(1 for r in resultados if r['success'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"{nombre:>15}: total={total:.2f}s ejemplos/s={len(casos) / total:.1f} "
+                    f"correctos={correctos}/{len(casos)}"
+                ))
+            self.stdout.write(f"Pool: {pool.estadisticas()}")
+        finally:
+            pool.cerrar()
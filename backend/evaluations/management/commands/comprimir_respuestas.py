@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models.functions import Cast, Length
+
+from evaluations.models import HistorialRespuesta, RespuestaEjercicio
+
+# Modelo y campo JSONComprimidoField de cada tabla
+CAMPOS = (
+    (RespuestaEjercicio, 'respuesta'),
+    (HistorialRespuesta, 'resultados'),
+)
+
+
+def bytes_guardados(modelo, campo):
+    """Bytes del JSON tal como está en la base de datos (comprimido o no)"""
+    total = modelo.objects.aggregate(total=models.Sum(Length(Cast(campo, models.TextField()))))['total']
+    return total or 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelve a guardar las respuestas y los resultados del historial para "
+        "recortar y comprimir las filas anteriores a JSONComprimidoField, e "
+        "informa de los bytes antes y después."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500)
+        parser.add_argument('--solo-informe', action='store_true',
+                            help='Mostrar los bytes actuales sin reescribir nada')
+
+    def handle(self, *args, **options):
+        for modelo, campo in CAMPOS:
+            antes = bytes_guardados(modelo, campo)
+            if options['solo_informe']:
+                self.stdout.write(f"{modelo.__name__}.{campo}: {antes:,} bytes")
+                continue
+
+            filas = 0
+            ultimo_id = 0
+            while True:
+                lote = list(modelo.objects.filter(id__gt=ultimo_id).order_by('id').only('id', campo)[:options['lote']])
+                if not lote:
+                    break
+                # Al guardar, el campo recorta y comprime (get_prep_value)
+                with transaction.atomic():
+                    modelo.objects.bulk_update(lote, [campo])
+                filas += len(lote)
+                ultimo_id = lote[-1].id
+
+            despues = bytes_guardados(modelo, campo)
+            ahorro = 100 * (1 - despues / antes) if antes else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"{modelo.__name__}.{campo}: {filas} filas, {antes:,} -> {despues:,} bytes ({ahorro:.1f}% menos)"
+            ))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from evaluations import grading_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de calificación: toma los jobs encolados por "
+        "submit_codigo y submit_batch, los califica con Judge0 y guarda los resultados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=int, default=5,
+                            help='Segundos de espera bloqueante por job')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Terminar tras N jobs (0 = sin límite)')
+        parser.add_argument('--recuperar', action='store_true',
+                            help='Reencolar al arrancar los jobs de workers caídos (luego se revisa cada lease)')
+
+    def handle(self, *args, **options):
+        if not grading_jobs.GRADING_ASYNC:
+            raise CommandError("La cola de calificación está desactivada (configura REDIS_URL o GRADING_ASYNC)")
+
+        queue = grading_jobs.get_grading_queue()
+        lease = grading_jobs.GRADING_WORKER_LEASE
+        detener_latido = grading_jobs.iniciar_latido(queue, lease)
+        ultima_recuperacion = 0 if options['recuperar'] else time.monotonic()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker de calificación {queue.worker_id} escuchando en {queue.cola}"
+        ))
+        procesados = 0
+        try:
+            while not options['max_jobs'] or procesados < options['max_jobs']:
+                # Solo se reencolan jobs de workers sin lease, así que varios
+                # workers pueden revisar a la vez sin calificar dos veces
+                if time.monotonic() - ultima_recuperacion >= lease:
+                    recuperados = queue.recuperar_pendientes()
+                    if recuperados:
+                        self.stdout.write(f"Jobs reencolados de workers caídos: {recuperados}")
+                    ultima_recuperacion = time.monotonic()
+
+                job = grading_jobs.procesar_siguiente(queue, timeout=options['timeout'])
+                if job is None:
+                    continue
+                procesados += 1
+                self.stdout.write(f"[Job:{job['id']}] {job['tipo']} -> {job['estado']}")
+        except KeyboardInterrupt:
+            self.stdout.write("Worker detenido")
+        finally:
+            detener_latido.set()
+            reencolados = queue.retirar()
+            if reencolados:
+                self.stdout.write(f"Jobs en curso devueltos a la cola: {reencolados}")
@@ -0,0 +1,180 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from evaluations.historial_store import con_respuestas, detalles_completos, hash_contenido, purgar_huerfanos, separar_detalles
+from evaluations.models import HistorialEvaluacion
+
+# Columnas de tamaño fijo de una HistorialRespuesta (ids, puntajes, fecha...)
+BYTES_FIJOS_FILA = 64
+# Hash SHA-256 en hexadecimal de cada snapshot y código
+BYTES_HASH = 64
+
+SOLUCIONES = [
+    "n = int(input())\nprint(n * 2)\n",
+    "def doble(x):\n    return x * 2\n\nprint(doble(int(input())))\n",
+    "x = input()\nprint(int(x) + int(x))\n",
+]
+
+
+def _bytes(valor):
+    return len(json.dumps(valor, default=str).encode('utf-8'))
+
+
+def tamano_normalizado(lista_detalles):
+    """
+    Bytes de unos `detalles` en el formato anterior una vez normalizados:
+    detalles compactos, filas de HistorialRespuesta y snapshots y códigos
+    distintos
+    """
+    total = {'detalles': 0, 'respuestas': 0, 'snapshots': 0, 'codigos': 0}
+    snapshots, codigos = {}, {}
+    for detalles in lista_detalles:
+        compactos, entradas = separar_detalles(detalles)
+        total['detalles'] += _bytes(compactos)
+        for e in entradas:
+            total['respuestas'] += BYTES_FIJOS_FILA + _bytes(e['resultados']) + len(e['stderr'].encode('utf-8'))
+            snapshots[hash_contenido(e['snapshot'])] = BYTES_HASH + _bytes(e['snapshot'])
+            codigos[hash_contenido(e['codigo'])] = BYTES_HASH + len(e['codigo'].encode('utf-8'))
+    total['snapshots'] = sum(snapshots.values())
+    total['codigos'] = sum(codigos.values())
+    return total, len(snapshots), len(codigos)
+
+
+class Command(BaseCommand):
+    help = (
+        "Informe del tamaño del historial antes y después de normalizarlo "
+        "(snapshots de ejercicios y códigos compartidos por contenido). Sin "
+        "--sintetico mide los historiales de la base de datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sintetico', action='store_true',
+                            help='Medir un conjunto de datos generado en vez de la base de datos')
+        parser.add_argument('--evaluaciones', type=int, default=20)
+        parser.add_argument('--estudiantes', type=int, default=40,
+                            help='Estudiantes por evaluación')
+        parser.add_argument('--ejercicios', type=int, default=5,
+                            help='Ejercicios por evaluación')
+        parser.add_argument('--purgar', action='store_true',
+                            help='Borrar antes snapshots y códigos que ya no usa ningún historial')
+
+    def handle(self, *args, **options):
+        if options['purgar']:
+            snapshots, codigos = purgar_huerfanos()
+            self.stdout.write(f"Purgados {snapshots} snapshots y {codigos} códigos huérfanos")
+
+        if options['sintetico']:
+            lista_detalles = self._generar(options['evaluaciones'], options['estudiantes'], options['ejercicios'])
+        else:
+            lista_detalles = [detalles_completos(h) for h in con_respuestas(HistorialEvaluacion.objects.all())]
+
+        if not lista_detalles:
+            self.stdout.write("No hay historiales que medir")
+            return
+
+        antes = sum(_bytes(d) for d in lista_detalles)
+        despues, n_snapshots, n_codigos = tamano_normalizado(lista_detalles)
+        total_despues = sum(despues.values())
+        respuestas = sum(len(d.get('respuestas', [])) for d in lista_detalles)
+
+        self.stdout.write(f"Historiales: {len(lista_detalles)}, respuestas: {respuestas}, "
+                          f"snapshots distintos: {n_snapshots}, códigos distintos: {n_codigos}")
+        self.stdout.write(f"Antes (detalles completos): {antes:,} bytes ({antes // len(lista_detalles):,} por historial)")
+        for parte, valor in despues.items():
+            self.stdout.write(f"  {parte:>10}: {valor:,} bytes")
+        self.stdout.write(self.style.SUCCESS(
+            f"Después (normalizado): {total_despues:,} bytes "
+            f"({total_despues // len(lista_detalles):,} por historial, "
+            f"{100 * (1 - total_despues / antes):.1f}% menos)"
+        ))
+
+        if not options['sintetico'] and connection.vendor == 'postgresql':
+            self._tamano_tablas()
+
+    def _tamano_tablas(self):
+        from evaluations.models import CodigoHistorial, HistorialRespuesta, SnapshotEjercicio
+
+        with connection.cursor() as cursor:
+            for modelo in (HistorialEvaluacion, HistorialRespuesta, SnapshotEjercicio, CodigoHistorial):
+                tabla = modelo._meta.db_table
+                cursor.execute("SELECT pg_total_relation_size(%s)", [tabla])
+                self.stdout.write(f"  {tabla}: {cursor.fetchone()[0]:,} bytes en disco")
+
+    def _generar(self, evaluaciones, estudiantes, ejercicios):
+        """Historiales con el formato anterior y contenido parecido al real"""
+        rng = random.Random(42)
+        lista_detalles = []
+        for e in range(evaluaciones):
+            contenidos = []
+            for j in range(ejercicios):
+                ejemplos = [{'entrada': str(k), 'salida': str(k * 2)} for k in range(5)]
+                contenidos.append({
+                    'id': e * ejercicios + j + 1,
+                    'titulo': f'Ejercicio {j + 1} de la evaluación {e + 1}',
+                    'descripcion': 'Lee un número entero e imprime su doble. ' * 8,
+                    'puntaje': 10.0,
+                    'dificultad': 'media',
+                    'contenido': {
+                        'ejemplos': ejemplos,
+                        'restricciones': '1 <= n <= 10^6. ' * 4,
+                        'formato_salida': 'Un entero por línea.',
+                        'pista': 'Multiplica por dos.',
+                        'etiquetas': ['aritmética', 'entrada/salida'],
+                        'tests_avanzados': ''.join(f'assert doble({k}) == {k * 2}\n' for k in range(20)),
+                        'templates_por_lenguaje': {
+                            str(lenguaje): '# Escribe tu solución aquí\n' + 'def resolver():\n    pass\n' * 3
+                            for lenguaje in (71, 62, 54, 63)
+                        },
+                    },
+                })
+
+            for s in range(estudiantes):
+                respuestas, ejercicios_json = [], []
+                for contenido in contenidos:
+                    # Una parte de los estudiantes entrega una solución común
+                    if rng.random() < 0.4:
+                        codigo = rng.choice(SOLUCIONES)
+                    else:
+                        codigo = rng.choice(SOLUCIONES) + f"# estudiante {s}\n" + "print()\n" * rng.randint(0, 20)
+                    es_correcta = rng.random() < 0.7
+                    resultados = [
+                        {'entrada': ej['entrada'], 'salida_esperada': ej['salida'],
+                         'salida_obtenida': ej['salida'] if es_correcta else '0',
+                         'es_correcto': es_correcta, 'tiempo': f'{rng.uniform(0.01, 0.09):.3f}'}
+                        for ej in contenido['contenido']['ejemplos']
+                    ]
+                    comun = {
+                        'es_correcta': es_correcta,
+                        'puntaje_obtenido': 10.0 if es_correcta else 0.0,
+                        'puntaje_maximo': 10.0,
+                        'codigo': codigo,
+                        'resultados': resultados,
+                        'stderr': '' if es_correcta else 'Traceback (most recent call last):\n  ValueError',
+                        'language_id': 71,
+                    }
+                    respuestas.append({
+                        'ejercicio_id': contenido['id'],
+                        'ejercicio_titulo': contenido['titulo'],
+                        'ejercicio_descripcion': contenido['descripcion'],
+                        'fecha_respuesta': '2025-06-01T10:00:00+00:00',
+                        **comun,
+                    })
+                    ejercicios_json.append({
+                        **{k: contenido[k] for k in ('id', 'titulo', 'descripcion', 'puntaje', 'dificultad', 'contenido')},
+                        'template': codigo,
+                        **comun,
+                        **{k: contenido['contenido'].get(k) for k in (
+                            'restricciones', 'formato_salida', 'ejemplos', 'pista', 'etiquetas',
+                            'tests_avanzados', 'templates_por_lenguaje')},
+                        'credito': '',
+                    })
+                lista_detalles.append({
+                    'respuestas': respuestas,
+                    'ejercicios': ejercicios_json,
+                    'estadisticas': {'total_ejercicios': ejercicios, 'puntaje_maximo': 10.0 * ejercicios},
+                    'evaluacion': {'titulo': f'Evaluación {e + 1}', 'duracion_minutos': 60},
+                })
+        return lista_detalles
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from evaluations.models import Evaluacion
+from evaluations.resumenes import recalcular_evaluacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye desde cero los resúmenes de resultados (ResumenEvaluacion "
+        "y ResumenParticipacion) de todas las evaluaciones o de una."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evaluacion', type=int, help='ID de la evaluación a recalcular')
+
+    def handle(self, *args, **options):
+        evaluaciones = Evaluacion.objects.order_by('id').values_list('id', flat=True)
+        if options['evaluacion']:
+            evaluaciones = evaluaciones.filter(id=options['evaluacion'])
+
+        total = 0
+        for evaluacion_id in evaluaciones:
+            resumen = recalcular_evaluacion(evaluacion_id)
+            total += 1
+            self.stdout.write(
+                f"Evaluación {evaluacion_id}: {resumen.participantes} participantes, "
+                f"{resumen.finalizados} finalizados, promedio {resumen.promedio:.2f}/{resumen.puntaje_maximo:g}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{total} evaluaciones recalculadas"))
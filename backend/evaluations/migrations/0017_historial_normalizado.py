@@ -0,0 +1,104 @@
+# Generated by Django 5.2 on 2026-10-18 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from evaluations.historial_store import detalles_completos, guardar_respuestas, separar_detalles
+
+LOTE = 200
+
+
+def normalizar_historial(apps, schema_editor):
+    """Pasa las respuestas y ejercicios de `detalles` a las tablas normalizadas"""
+    HistorialEvaluacion = apps.get_model('evaluations', 'HistorialEvaluacion')
+    modelos = tuple(apps.get_model('evaluations', nombre)
+                    for nombre in ('SnapshotEjercicio', 'CodigoHistorial', 'HistorialRespuesta'))
+
+    ids = list(HistorialEvaluacion.objects.order_by('id').values_list('id', flat=True))
+    for inicio in range(0, len(ids), LOTE):
+        historiales = list(HistorialEvaluacion.objects.filter(id__in=ids[inicio:inicio + LOTE]))
+        respuestas = []
+        for historial in historiales:
+            historial.detalles, entradas = separar_detalles(historial.detalles)
+            respuestas.append((historial.id, entradas))
+        guardar_respuestas(respuestas, modelos)
+        HistorialEvaluacion.objects.bulk_update(historiales, ['detalles'])
+
+
+def desnormalizar_historial(apps, schema_editor):
+    """Vuelve a escribir las respuestas y ejercicios completos en `detalles`"""
+    HistorialEvaluacion = apps.get_model('evaluations', 'HistorialEvaluacion')
+    HistorialRespuesta = apps.get_model('evaluations', 'HistorialRespuesta')
+
+    ids = list(HistorialEvaluacion.objects.order_by('id').values_list('id', flat=True))
+    for inicio in range(0, len(ids), LOTE):
+        historiales = list(HistorialEvaluacion.objects.filter(id__in=ids[inicio:inicio + LOTE]).prefetch_related(
+            models.Prefetch('respuestas_guardadas',
+                            queryset=HistorialRespuesta.objects.select_related('snapshot', 'codigo').order_by('orden'))
+        ))
+        for historial in historiales:
+            historial.detalles = detalles_completos(historial)
+        HistorialEvaluacion.objects.bulk_update(historiales, ['detalles'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0016_respuestaejercicio_language_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodigoHistorial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True)),
+                ('codigo', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Código de Historial',
+                'verbose_name_plural': 'Códigos de Historial',
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotEjercicio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True)),
+                ('ejercicio_id', models.IntegerField(default=0)),
+                ('datos', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Ejercicio',
+                'verbose_name_plural': 'Snapshots de Ejercicios',
+            },
+        ),
+        migrations.AlterField(
+            model_name='historialevaluacion',
+            name='detalles',
+            field=models.JSONField(default=dict, help_text='Estadísticas y datos de la evaluación'),
+        ),
+        migrations.CreateModel(
+            name='HistorialRespuesta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField(default=0)),
+                ('language_id', models.IntegerField(default=71)),
+                ('es_correcta', models.BooleanField(default=False)),
+                ('puntaje_obtenido', models.FloatField(default=0)),
+                ('puntaje_maximo', models.FloatField(default=0)),
+                ('resultados', models.JSONField(blank=True, default=list)),
+                ('stderr', models.TextField(blank=True, default='')),
+                ('fecha_respuesta', models.DateTimeField(blank=True, null=True)),
+                ('codigo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='respuestas', to='evaluations.codigohistorial')),
+                ('historial', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='respuestas_guardadas', to='evaluations.historialevaluacion')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='respuestas', to='evaluations.snapshotejercicio')),
+            ],
+            options={
+                'verbose_name': 'Respuesta de Historial',
+                'verbose_name_plural': 'Respuestas de Historial',
+                'ordering': ['historial', 'orden'],
+            },
+        ),
+        migrations.RunPython(normalizar_historial, desnormalizar_historial),
+    ]
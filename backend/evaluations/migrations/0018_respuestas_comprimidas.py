@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 11:48
+
+import evaluations.compresion
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0017_historial_normalizado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historialrespuesta',
+            name='resultados',
+            field=evaluations.compresion.JSONComprimidoField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='respuestaejercicio',
+            name='respuesta',
+            field=evaluations.compresion.JSONComprimidoField(help_text='Respuesta del estudiante en formato JSON'),
+        ),
+    ]
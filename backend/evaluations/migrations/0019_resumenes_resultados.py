@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-18 11:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0018_respuestas_comprimidas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEvaluacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje_maximo', models.FloatField(default=0)),
+                ('total_ejercicios', models.PositiveIntegerField(default=0)),
+                ('participantes', models.PositiveIntegerField(default=0)),
+                ('finalizados', models.PositiveIntegerField(default=0)),
+                ('aprobados', models.PositiveIntegerField(default=0)),
+                ('suma_puntajes', models.FloatField(default=0, help_text='Suma de puntajes de los finalizados')),
+                ('por_ejercicio', models.JSONField(blank=True, default=dict)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('evaluacion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen', to='evaluations.evaluacion')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Evaluación',
+                'verbose_name_plural': 'Resúmenes de Evaluación',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenParticipacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(default='pendiente', max_length=10)),
+                ('puntaje', models.FloatField(default=0, help_text='Puntaje de la participación, con ajustes')),
+                ('puntaje_maximo', models.FloatField(default=0)),
+                ('ejercicios_respondidos', models.PositiveIntegerField(default=0)),
+                ('ejercicios_correctos', models.PositiveIntegerField(default=0)),
+                ('aprobado', models.BooleanField(default=False)),
+                ('respuestas', models.JSONField(blank=True, default=dict)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_participacion', to=settings.AUTH_USER_MODEL)),
+                ('evaluacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_participacion', to='evaluations.evaluacion')),
+                ('participacion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen', to='evaluations.estudianteevaluacion')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Participación',
+                'verbose_name_plural': 'Resúmenes de Participación',
+                'indexes': [models.Index(fields=['evaluacion', 'estado'], name='evaluations_evaluac_63dd6d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 12:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0019_resumenes_resultados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCalificacion',
+            fields=[
+                ('id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(max_length=10)),
+                ('estado', models.CharField(default='en_cola', max_length=12)),
+                ('proceso', models.CharField(blank=True, max_length=100)),
+                ('datos', models.JSONField(default=dict)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('participacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs_calificacion', to='evaluations.estudianteevaluacion')),
+            ],
+            options={
+                'verbose_name': 'Job de Calificación',
+                'verbose_name_plural': 'Jobs de Calificación',
+                'indexes': [models.Index(fields=['estado', 'proceso'], name='evaluations_estado_555c4e_idx')],
+            },
+        ),
+    ]
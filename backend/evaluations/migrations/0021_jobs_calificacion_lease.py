@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0020_jobs_calificacion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='jobcalificacion',
+            name='evaluations_estado_555c4e_idx',
+        ),
+        migrations.AddField(
+            model_name='jobcalificacion',
+            name='lease_hasta',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='jobcalificacion',
+            index=models.Index(fields=['estado', 'lease_hasta'], name='evaluations_estado_ad17af_idx'),
+        ),
+    ]
@@ -3,7 +3,11 @@ from django.db import models
 from django.utils.crypto import get_random_string
 import uuid
 import json
+import logging
 from users.models import User  # Importa tu modelo de usuario existente
+from .compresion import JSONComprimidoField
+
+logger = logging.getLogger('judge')
 
 
 class Curso(models.Model):
@@ -69,22 +73,18 @@ class Ejercicio(models.Model):
                     try:
                         contenido = json.loads(contenido)
                     except json.JSONDecodeError:
-                        print(f"❌ Error al parsear contenido para ejercicio {self.id}")
+                        logger.warning(f"Contenido no es JSON válido en el ejercicio {self.id}")
                         return {}
                 
                 # Verificar que contenido sea dict y tenga templates
                 if isinstance(contenido, dict) and 'templates' in contenido:
                     templates = contenido['templates']
                     if isinstance(templates, dict):
-                        print(f"✅ Modelo: Templates encontrados para ejercicio {self.id}: {templates}")
                         return templates
-                    else:
-                        print(f"⚠️ Modelo: Templates no es dict para ejercicio {self.id}: {type(templates)}")
-                else:
-                    print(f"⚠️ Modelo: No hay campo 'templates' en contenido para ejercicio {self.id}")
+                    logger.warning(f"Templates del ejercicio {self.id} no es dict: {type(templates).__name__}")
                     
-        except Exception as e:
-            print(f"❌ Error en templates_por_lenguaje para ejercicio {self.id}: {str(e)}")
+        except Exception:
+            logger.exception(f"Error en templates_por_lenguaje para ejercicio {self.id}")
         
         return {}
     
@@ -105,6 +105,13 @@ class Ejercicio(models.Model):
             except:
                 self.creador_nombre = self.creador.username
         super().save(*args, **kwargs)
+        
+        # Precompilar el plan de calificación (ver grading_plan)
+        try:
+            from .grading_plan import guardar_plan
+            guardar_plan(self)
+        except Exception:
+            logger.exception(f"No se pudo precompilar el plan de calificación del ejercicio {self.id}")
     
     def get_etiquetas(self):
         """Método helper para obtener etiquetas del contenido"""
@@ -226,7 +233,8 @@ class RespuestaEjercicio(models.Model):
     """
     estudiante_evaluacion = models.ForeignKey(EstudianteEvaluacion, on_delete=models.CASCADE, related_name='respuestas')
     ejercicio = models.ForeignKey(Ejercicio, on_delete=models.CASCADE, related_name='respuestas')
-    respuesta = models.JSONField(help_text="Respuesta del estudiante en formato JSON")
+    # Código y salida: se recortan y comprimen al guardar (ver compresion.py)
+    respuesta = JSONComprimidoField(help_text="Respuesta del estudiante en formato JSON")
     es_correcta = models.BooleanField(null=True, blank=True)
     puntaje_obtenido = models.FloatField(default=0)
     tiempo_respuesta = models.DurationField(null=True, blank=True)
@@ -294,9 +302,10 @@ class HistorialEvaluacion(models.Model):
     tiempo_total = models.DurationField(null=True, blank=True)
     tiempo_total_ms = models.BigIntegerField(null=True, blank=True, help_text="Tiempo total en milisegundos")
     
-    # Detalles completos de la evaluación y respuestas
-    detalles = models.JSONField(help_text="Detalles completos de la evaluación incluyendo respuestas", default=dict)
-    
+    # Estadísticas y datos de la evaluación; las respuestas están en
+    # HistorialRespuesta (ver evaluations/historial_store.py)
+    detalles = models.JSONField(help_text="Estadísticas y datos de la evaluación", default=dict)
+
     # Estado de la evaluación
     evaluacion_activa = models.BooleanField(default=True)  # Falso si la evaluación fue borrada
     
@@ -311,7 +320,148 @@ class HistorialEvaluacion(models.Model):
     
     def __str__(self):
         return f"{self.estudiante_nombre} - {self.evaluacion_titulo} ({self.fecha_almacenamiento.strftime('%d/%m/%Y')})"
-    
+
+
+class SnapshotEjercicio(models.Model):
+    """
+    Copia del ejercicio (enunciado, puntaje y contenido) tal como se evaluó,
+    compartida por todos los historiales con el mismo contenido
+    """
+    hash = models.CharField(max_length=64, unique=True)
+    ejercicio_id = models.IntegerField(default=0)
+    datos = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name = "Snapshot de Ejercicio"
+        verbose_name_plural = "Snapshots de Ejercicios"
+
+    def __str__(self):
+        return f"{self.datos.get('titulo', self.ejercicio_id)} ({self.hash[:12]})"
+
+
+class CodigoHistorial(models.Model):
+    """Código enviado por un estudiante, guardado una vez por contenido"""
+    hash = models.CharField(max_length=64, unique=True)
+    codigo = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = "Código de Historial"
+        verbose_name_plural = "Códigos de Historial"
+
+    def __str__(self):
+        return self.hash[:12]
+
+
+class HistorialRespuesta(models.Model):
+    """Respuesta de un ejercicio en el historial: referencias y puntajes"""
+    historial = models.ForeignKey(HistorialEvaluacion, on_delete=models.CASCADE, related_name='respuestas_guardadas')
+    orden = models.PositiveIntegerField(default=0)
+    snapshot = models.ForeignKey(SnapshotEjercicio, on_delete=models.PROTECT, related_name='respuestas')
+    codigo = models.ForeignKey(CodigoHistorial, on_delete=models.PROTECT, related_name='respuestas')
+    language_id = models.IntegerField(default=71)
+    es_correcta = models.BooleanField(default=False)
+    puntaje_obtenido = models.FloatField(default=0)
+    puntaje_maximo = models.FloatField(default=0)
+    # Salida de la ejecución del estudiante (comprimida, ver compresion.py)
+    resultados = JSONComprimidoField(default=list, blank=True)
+    stderr = models.TextField(blank=True, default='')
+    fecha_respuesta = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Respuesta de Historial"
+        verbose_name_plural = "Respuestas de Historial"
+        ordering = ['historial', 'orden']
+
+    def __str__(self):
+        return f"{self.historial_id} - {self.snapshot.ejercicio_id}"
+
+
+
+class ResumenParticipacion(models.Model):
+    """
+    Resultados de un estudiante en una evaluación, mantenidos por señales al
+    guardar respuestas, participaciones y ajustes (ver resumenes.py)
+    """
+    participacion = models.OneToOneField(EstudianteEvaluacion, on_delete=models.CASCADE, related_name='resumen')
+    evaluacion = models.ForeignKey(Evaluacion, on_delete=models.CASCADE, related_name='resumenes_participacion')
+    estudiante = models.ForeignKey(User, on_delete=models.CASCADE, related_name='resumenes_participacion')
+    estado = models.CharField(max_length=10, default='pendiente')
+    puntaje = models.FloatField(default=0, help_text="Puntaje de la participación, con ajustes")
+    puntaje_maximo = models.FloatField(default=0)
+    ejercicios_respondidos = models.PositiveIntegerField(default=0)
+    ejercicios_correctos = models.PositiveIntegerField(default=0)
+    aprobado = models.BooleanField(default=False)
+    # ejercicio_id -> titulo, puntajes, es_correcta y fecha de la respuesta
+    respuestas = models.JSONField(default=dict, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumen de Participación"
+        verbose_name_plural = "Resúmenes de Participación"
+        indexes = [models.Index(fields=['evaluacion', 'estado'])]
+
+    def __str__(self):
+        return f"{self.participacion_id} - {self.puntaje}/{self.puntaje_maximo}"
+
+
+class ResumenEvaluacion(models.Model):
+    """
+    Agregados de una evaluación, actualizados con la diferencia entre el
+    resumen anterior y el nuevo de cada participación (ver resumenes.py)
+    """
+    evaluacion = models.OneToOneField(Evaluacion, on_delete=models.CASCADE, related_name='resumen')
+    puntaje_maximo = models.FloatField(default=0)
+    total_ejercicios = models.PositiveIntegerField(default=0)
+    participantes = models.PositiveIntegerField(default=0)
+    finalizados = models.PositiveIntegerField(default=0)
+    aprobados = models.PositiveIntegerField(default=0)
+    suma_puntajes = models.FloatField(default=0, help_text="Suma de puntajes de los finalizados")
+    # ejercicio_id -> {'respondidas': n, 'correctas': n}
+    por_ejercicio = models.JSONField(default=dict, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumen de Evaluación"
+        verbose_name_plural = "Resúmenes de Evaluación"
+
+    def __str__(self):
+        return f"{self.evaluacion_id} - {self.finalizados}/{self.participantes}"
+
+    @property
+    def promedio(self):
+        return self.suma_puntajes / self.finalizados if self.finalizados else 0
+
+    @property
+    def tasa_aprobacion(self):
+        return self.aprobados / self.finalizados * 100 if self.finalizados else 0
+
+
+class JobCalificacion(models.Model):
+    """
+    Job de calificación admitido en un proceso web (respondido con 202), guardado
+    hasta que termina para que un reinicio no pierda el envío (ver admission.py)
+    """
+    id = models.CharField(max_length=32, primary_key=True)
+    participacion = models.ForeignKey(EstudianteEvaluacion, on_delete=models.CASCADE, related_name='jobs_calificacion')
+    tipo = models.CharField(max_length=10)
+    estado = models.CharField(max_length=12, default='en_cola')
+    # Proceso que lo califica, que renueva lease_hasta mientras vive; al
+    # vencer el lease otro proceso lo recupera
+    proceso = models.CharField(max_length=100, blank=True)
+    lease_hasta = models.DateTimeField(null=True, blank=True)
+    # El job completo de grading_jobs.crear_job, con el código enviado
+    datos = models.JSONField(default=dict)
+    creado = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Job de Calificación"
+        verbose_name_plural = "Jobs de Calificación"
+        indexes = [models.Index(fields=['estado', 'lease_hasta'])]
+
+    def __str__(self):
+        return f"{self.id} - {self.tipo} ({self.estado})"
+
     
 def get_codigo_con_funciones_auxiliares(ejercicio, codigo):
     """
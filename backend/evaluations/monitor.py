@@ -0,0 +1,245 @@
+# backend/evaluations/monitor.py
+"""
+Monitor en vivo de los participantes de una evaluación (Server-Sent Events).
+
+En vez de consultar /participantes/ cada pocos segundos, el docente abre
+GET /api/evaluaciones/<id>/monitor/ (Accept: text/event-stream) y recibe:
+
+- `snapshot`: la lista de participantes, igual que /participantes/;
+- un evento por cambio con el participante afectado (id, estado,
+  progreso, puntaje, fechas): `ingreso`, `progreso`, `puntaje`,
+  `finalizado` o `expulsado`;
+- un comentario `: ping` cada MONITOR_SSE_PING segundos sin cambios.
+
+La conexión se cierra a los MONITOR_SSE_DURACION segundos (para no ocupar
+un worker indefinidamente) y el cliente vuelve a conectar. Como EventSource
+no permite enviar el header Authorization del JWT, el frontend lee el stream
+con fetch (response.body) y reconecta al terminar.
+
+submit_batch, finalizar_evaluacion, expulsar_estudiante y ajustar_puntaje
+publican los cambios al confirmar su transacción. Con REDIS_URL se publican
+en el canal `monitor:evaluacion:<id>` de Redis (pub/sub) y llegan a los
+streams abiertos en cualquier proceso; sin Redis, solo a los de este
+proceso. Publicar nunca hace fallar el request que lo provoca.
+"""
+import collections
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+from . import grading_jobs
+
+logger = logging.getLogger('judge')
+
+MONITOR_PREFIJO = 'monitor:evaluacion'
+MONITOR_SSE_DURACION = getattr(settings, 'MONITOR_SSE_DURACION', 300)
+MONITOR_SSE_PING = getattr(settings, 'MONITOR_SSE_PING', 15)
+# Milisegundos antes de reconectar (campo `retry:` de SSE)
+MONITOR_SSE_RETRY_MS = 3000
+
+
+def _iso(fecha):
+    return fecha.isoformat() if fecha else None
+
+
+def nombre_estudiante(estudiante):
+    """Nombre completo del perfil o, si no hay, el username"""
+    try:
+        perfil = estudiante.profile
+        nombre = f"{perfil.nombres} {perfil.apellidos}".strip()
+        return nombre or estudiante.username
+    except Exception:
+        return estudiante.username
+
+
+def datos_participante(participacion):
+    """Campos de una participación que cambian durante el examen"""
+    return {
+        'id': participacion.id,
+        'estudiante_id': participacion.estudiante_id,
+        'estado': participacion.estado,
+        'progreso': participacion.progreso,
+        'puntaje': participacion.puntaje,
+        'fecha_inicio': _iso(participacion.fecha_inicio),
+        'fecha_fin': _iso(participacion.fecha_fin),
+    }
+
+
+def participantes_evaluacion(evaluacion_id):
+    """
+    Participantes de una evaluación con su resumen de resultados, en una
+    consulta (estudiante, perfil y resumen con select_related)
+    """
+    from .models import EstudianteEvaluacion
+    from .resumenes import obtener_resumen_evaluacion
+
+    resumen_evaluacion = obtener_resumen_evaluacion(evaluacion_id)
+    participaciones = EstudianteEvaluacion.objects.filter(evaluacion_id=evaluacion_id).select_related(
+        'estudiante', 'estudiante__profile', 'resumen'
+    ).order_by('id')
+
+    participantes = []
+    for participacion in participaciones:
+        resumen = getattr(participacion, 'resumen', None)
+        participantes.append({
+            **datos_participante(participacion),
+            'estudiante_nombre': nombre_estudiante(participacion.estudiante),
+            'email': participacion.estudiante.email,
+            'puntaje_maximo': resumen_evaluacion.puntaje_maximo if resumen_evaluacion else 0,
+            'ejercicios_correctos': resumen.ejercicios_correctos if resumen else 0,
+            'aprobado': resumen.aprobado if resumen else False,
+        })
+    return participantes
+
+
+class BusLocal:
+    """Pub/sub dentro del proceso, para cuando no hay Redis"""
+
+    def __init__(self, tamano_cola=1000):
+        self.tamano_cola = tamano_cola
+        self._lock = threading.Lock()
+        self._colas = collections.defaultdict(set)
+
+    def publicar(self, evaluacion_id, mensaje):
+        with self._lock:
+            colas = list(self._colas.get(evaluacion_id, ()))
+        for cola in colas:
+            try:
+                cola.put_nowait(mensaje)
+            except queue.Full:
+                # Un cliente que no lee no debe frenar a los demás
+                pass
+
+    def suscribir(self, evaluacion_id):
+        cola = queue.Queue(maxsize=self.tamano_cola)
+        with self._lock:
+            self._colas[evaluacion_id].add(cola)
+        return SuscripcionLocal(self, evaluacion_id, cola)
+
+    def _quitar(self, evaluacion_id, cola):
+        with self._lock:
+            self._colas[evaluacion_id].discard(cola)
+            if not self._colas[evaluacion_id]:
+                del self._colas[evaluacion_id]
+
+
+class SuscripcionLocal:
+    def __init__(self, bus, evaluacion_id, cola):
+        self._bus = bus
+        self._evaluacion_id = evaluacion_id
+        self._cola = cola
+
+    def siguiente(self, timeout):
+        """Siguiente mensaje o None si no llega ninguno en `timeout` segundos"""
+        try:
+            return self._cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cerrar(self):
+        self._bus._quitar(self._evaluacion_id, self._cola)
+
+
+class SuscripcionRedis:
+    def __init__(self, conexion, canal):
+        self._pubsub = conexion.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(canal)
+
+    def siguiente(self, timeout):
+        """Siguiente mensaje (puede volver antes de `timeout` con None)"""
+        mensaje = self._pubsub.get_message(timeout=timeout)
+        if mensaje and mensaje.get('type') == 'message':
+            return json.loads(mensaje['data'])
+        return None
+
+    def cerrar(self):
+        self._pubsub.close()
+
+
+_bus_local = BusLocal()
+
+
+def canal(evaluacion_id):
+    return f"{MONITOR_PREFIJO}:{evaluacion_id}"
+
+
+def suscribir(evaluacion_id):
+    """Suscripción a los cambios de una evaluación (Redis si hay REDIS_URL)"""
+    if grading_jobs.REDIS_URL:
+        return SuscripcionRedis(grading_jobs.get_redis(), canal(evaluacion_id))
+    return _bus_local.suscribir(evaluacion_id)
+
+
+def _enviar(evaluacion_id, mensaje, participacion=None):
+    try:
+        if participacion is not None:
+            # Un ingreso lleva además el nombre para añadir la fila
+            mensaje['participante'].update({
+                'estudiante_nombre': nombre_estudiante(participacion.estudiante),
+                'email': participacion.estudiante.email,
+            })
+        if grading_jobs.REDIS_URL:
+            grading_jobs.get_redis().publish(canal(evaluacion_id), json.dumps(mensaje))
+        else:
+            _bus_local.publicar(evaluacion_id, mensaje)
+    except Exception as e:
+        logger.warning(f"No se pudo publicar el evento {mensaje['tipo']} de la evaluación {evaluacion_id}: {str(e)}")
+
+
+def publicar(tipo, participacion):
+    """Publica el cambio de una participación al confirmar la transacción actual"""
+    mensaje = {
+        'tipo': tipo,
+        'evaluacion_id': participacion.evaluacion_id,
+        'participante': datos_participante(participacion),
+        'fecha': timezone.now().isoformat(),
+    }
+    nueva = participacion if tipo == 'ingreso' else None
+    transaction.on_commit(lambda: _enviar(participacion.evaluacion_id, mensaje, nueva))
+
+
+def formatear_evento(tipo, datos):
+    return f"event: {tipo}\ndata: {json.dumps(datos, default=str)}\n\n"
+
+
+def eventos_sse(suscripcion, participantes, duracion=MONITOR_SSE_DURACION, ping=MONITOR_SSE_PING):
+    """
+    Generador del stream: el snapshot inicial y luego cada mensaje de la
+    suscripción, con pings mientras no hay cambios. Cierra la suscripción
+    al terminar o cuando el cliente se desconecta.
+    """
+    try:
+        yield f"retry: {MONITOR_SSE_RETRY_MS}\n\n"
+        yield formatear_evento('snapshot', {'participantes': participantes})
+        fin = time.monotonic() + duracion
+        ultimo_envio = time.monotonic()
+        while True:
+            ahora = time.monotonic()
+            if ahora >= fin:
+                return
+            mensaje = suscripcion.siguiente(timeout=min(ping, fin - ahora))
+            if mensaje is not None:
+                yield formatear_evento(mensaje['tipo'], mensaje)
+                ultimo_envio = time.monotonic()
+            elif time.monotonic() - ultimo_envio >= ping:
+                yield ": ping\n\n"
+                ultimo_envio = time.monotonic()
+    finally:
+        suscripcion.cerrar()
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Permite negociar text/event-stream; los errores se devuelven en JSON"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, default=str)
@@ -0,0 +1,244 @@
+# backend/evaluations/resumenes.py
+"""
+Resúmenes materializados de resultados por evaluación.
+
+Las pantallas del docente y de resultados recalculaban en cada request el
+puntaje máximo (sumando los ejercicios), los puntajes y el detalle de cada
+respuesta a partir de las filas sueltas. Aquí se mantienen:
+
+- ResumenParticipacion: una fila por participación con el puntaje, el
+  máximo, si aprueba y el resumen de cada respuesta;
+- ResumenEvaluacion: una fila por evaluación con participantes,
+  finalizados, aprobados, suma de puntajes (promedio) y respondidas y
+  correctas por ejercicio.
+
+Las señales (signals.py) recalculan el resumen de la participación cuando
+cambian sus respuestas, la propia participación o sus ajustes de puntaje, y
+los agregados de la evaluación se corrigen con la diferencia entre el
+resumen anterior y el nuevo, sin recorrer al resto de estudiantes. El
+recálculo se hace al confirmar la transacción (on_commit), así la fila de
+la evaluación solo se bloquea un momento y no durante todo el guardado de
+un batch.
+
+`recalcular_evaluacion` reconstruye todo desde cero: la usan la migración,
+los cambios de ejercicios de la evaluación y `manage.py recalcular_resumenes`.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+logger = logging.getLogger('judge')
+
+
+def _resumen_respuestas(filas):
+    """ejercicio_id -> resumen de la respuesta, a partir de values() de RespuestaEjercicio"""
+    return {
+        str(fila['ejercicio_id']): {
+            'titulo': fila['ejercicio__titulo'],
+            'puntaje_obtenido': fila['puntaje_obtenido'],
+            'puntaje_maximo': fila['ejercicio__puntaje'],
+            'es_correcta': bool(fila['es_correcta']),
+            'fecha_respuesta': fila['fecha_respuesta'].isoformat() if fila['fecha_respuesta'] else None,
+        }
+        for fila in filas
+    }
+
+
+CAMPOS_RESPUESTA = ('ejercicio_id', 'ejercicio__titulo', 'ejercicio__puntaje', 'es_correcta',
+                    'puntaje_obtenido', 'fecha_respuesta')
+
+
+def _datos_participacion(participacion, respuestas, resumen_evaluacion, puntaje_aprobacion):
+    """Campos de ResumenParticipacion de una participación"""
+    puntaje = participacion.puntaje or 0
+    puntaje_maximo = resumen_evaluacion.puntaje_maximo
+    return {
+        'evaluacion_id': participacion.evaluacion_id,
+        'estudiante_id': participacion.estudiante_id,
+        'estado': participacion.estado,
+        'puntaje': puntaje,
+        'puntaje_maximo': puntaje_maximo,
+        'ejercicios_respondidos': len(respuestas),
+        'ejercicios_correctos': sum(1 for r in respuestas.values() if r['es_correcta']),
+        'aprobado': puntaje_maximo > 0 and puntaje / puntaje_maximo * 100 >= puntaje_aprobacion,
+        'respuestas': respuestas,
+    }
+
+
+def _contribucion(resumen):
+    """Lo que aporta el resumen de una participación a los agregados de su evaluación"""
+    if resumen is None:
+        return {'participantes': 0, 'finalizados': 0, 'aprobados': 0, 'suma_puntajes': 0, 'por_ejercicio': {}}
+    finalizado = resumen.estado == 'finalizado'
+    return {
+        'participantes': 1,
+        'finalizados': int(finalizado),
+        'aprobados': int(finalizado and resumen.aprobado),
+        'suma_puntajes': resumen.puntaje if finalizado else 0,
+        'por_ejercicio': {
+            ejercicio_id: (1, int(respuesta['es_correcta']))
+            for ejercicio_id, respuesta in (resumen.respuestas or {}).items()
+        },
+    }
+
+
+def _aplicar(resumen_evaluacion, anterior, nueva):
+    """Suma a los agregados la diferencia entre dos contribuciones"""
+    for campo in ('participantes', 'finalizados', 'aprobados', 'suma_puntajes'):
+        valor = getattr(resumen_evaluacion, campo) + nueva[campo] - anterior[campo]
+        setattr(resumen_evaluacion, campo, max(valor, 0))
+
+    por_ejercicio = dict(resumen_evaluacion.por_ejercicio or {})
+    for ejercicio_id in set(anterior['por_ejercicio']) | set(nueva['por_ejercicio']):
+        respondidas_antes, correctas_antes = anterior['por_ejercicio'].get(ejercicio_id, (0, 0))
+        respondidas, correctas = nueva['por_ejercicio'].get(ejercicio_id, (0, 0))
+        actual = por_ejercicio.get(ejercicio_id, {'respondidas': 0, 'correctas': 0})
+        actual = {
+            'respondidas': max(actual['respondidas'] + respondidas - respondidas_antes, 0),
+            'correctas': max(actual['correctas'] + correctas - correctas_antes, 0),
+        }
+        if actual['respondidas']:
+            por_ejercicio[ejercicio_id] = actual
+        else:
+            por_ejercicio.pop(ejercicio_id, None)
+    resumen_evaluacion.por_ejercicio = por_ejercicio
+
+
+def _resumen_evaluacion_bloqueado(evaluacion_id):
+    """
+    ResumenEvaluacion con select_for_update. Si no existe, la transacción que
+    crea la fila la construye entera antes de confirmar; otra que llegue a la
+    vez espera en el get_or_create a que la fila exista y solo aplica su
+    diferencia, así que ninguna participación se cuenta dos veces.
+    """
+    from .models import ResumenEvaluacion
+
+    _, creado = ResumenEvaluacion.objects.get_or_create(evaluacion_id=evaluacion_id)
+    if creado:
+        recalcular_evaluacion(evaluacion_id)
+    return ResumenEvaluacion.objects.select_for_update().get(evaluacion_id=evaluacion_id)
+
+
+def actualizar_participacion(participacion_id):
+    """
+    Recalcula el resumen de una participación y corrige los agregados de su
+    evaluación con la diferencia. Devuelve el ResumenParticipacion (None si
+    la participación ya no existe).
+    """
+    from .models import EstudianteEvaluacion, RespuestaEjercicio, ResumenParticipacion
+
+    with transaction.atomic():
+        participacion = EstudianteEvaluacion.objects.select_related('evaluacion').filter(pk=participacion_id).first()
+        if participacion is None:
+            return None
+        resumen_evaluacion = _resumen_evaluacion_bloqueado(participacion.evaluacion_id)
+        resumen = ResumenParticipacion.objects.filter(participacion_id=participacion_id).first()
+        anterior = _contribucion(resumen)
+
+        respuestas = _resumen_respuestas(
+            RespuestaEjercicio.objects.filter(estudiante_evaluacion_id=participacion_id).values(*CAMPOS_RESPUESTA)
+        )
+        datos = _datos_participacion(participacion, respuestas, resumen_evaluacion,
+                                     participacion.evaluacion.puntaje_aprobacion)
+        if resumen is None:
+            resumen = ResumenParticipacion.objects.create(participacion_id=participacion_id, **datos)
+        else:
+            for campo, valor in datos.items():
+                setattr(resumen, campo, valor)
+            resumen.save()
+
+        _aplicar(resumen_evaluacion, anterior, _contribucion(resumen))
+        resumen_evaluacion.save()
+    return resumen
+
+
+def quitar_participacion(participacion_id, evaluacion_id):
+    """Descuenta de los agregados una participación que se va a borrar"""
+    from .models import ResumenEvaluacion, ResumenParticipacion
+
+    with transaction.atomic():
+        resumen_evaluacion = ResumenEvaluacion.objects.select_for_update().filter(evaluacion_id=evaluacion_id).first()
+        resumen = ResumenParticipacion.objects.filter(participacion_id=participacion_id).first()
+        if resumen_evaluacion is None or resumen is None:
+            return
+        _aplicar(resumen_evaluacion, _contribucion(resumen), _contribucion(None))
+        resumen_evaluacion.save()
+
+
+def recalcular_evaluacion(evaluacion_id):
+    """Reconstruye desde cero los resúmenes de una evaluación y de sus participaciones"""
+    from .models import (EstudianteEvaluacion, Evaluacion, EvaluacionEjercicio, RespuestaEjercicio,
+                         ResumenEvaluacion, ResumenParticipacion)
+
+    with transaction.atomic():
+        evaluacion = Evaluacion.objects.filter(pk=evaluacion_id).first()
+        if evaluacion is None:
+            return None
+        ejercicios = EvaluacionEjercicio.objects.filter(evaluacion_id=evaluacion_id).aggregate(
+            puntaje_maximo=Sum('ejercicio__puntaje'), total=Count('id')
+        )
+        resumen_evaluacion, _ = ResumenEvaluacion.objects.update_or_create(
+            evaluacion_id=evaluacion_id,
+            defaults={
+                'puntaje_maximo': float(ejercicios['puntaje_maximo'] or 0),
+                'total_ejercicios': ejercicios['total'],
+                'participantes': 0, 'finalizados': 0, 'aprobados': 0, 'suma_puntajes': 0,
+                'por_ejercicio': {},
+            },
+        )
+
+        respuestas = {}
+        for fila in RespuestaEjercicio.objects.filter(
+            estudiante_evaluacion__evaluacion_id=evaluacion_id
+        ).values('estudiante_evaluacion_id', *CAMPOS_RESPUESTA):
+            respuestas.setdefault(fila['estudiante_evaluacion_id'], []).append(fila)
+
+        resumenes = []
+        for participacion in EstudianteEvaluacion.objects.filter(evaluacion_id=evaluacion_id):
+            datos = _datos_participacion(participacion, _resumen_respuestas(respuestas.get(participacion.id, [])),
+                                         resumen_evaluacion, evaluacion.puntaje_aprobacion)
+            resumen = ResumenParticipacion(participacion_id=participacion.id, **datos)
+            _aplicar(resumen_evaluacion, _contribucion(None), _contribucion(resumen))
+            resumenes.append(resumen)
+
+        ResumenParticipacion.objects.bulk_create(
+            resumenes,
+            update_conflicts=True,
+            unique_fields=['participacion'],
+            update_fields=['evaluacion', 'estudiante', 'estado', 'puntaje', 'puntaje_maximo',
+                           'ejercicios_respondidos', 'ejercicios_correctos', 'aprobado', 'respuestas'],
+        )
+        resumen_evaluacion.save()
+    return resumen_evaluacion
+
+
+def obtener_resumen_evaluacion(evaluacion_id):
+    """ResumenEvaluacion de una evaluación, construyéndolo si aún no existe"""
+    from .models import ResumenEvaluacion
+
+    resumen = ResumenEvaluacion.objects.filter(evaluacion_id=evaluacion_id).first()
+    return resumen or recalcular_evaluacion(evaluacion_id)
+
+
+def obtener_resumen_participacion(participacion):
+    """ResumenParticipacion de una participación, calculándolo si aún no existe"""
+    from .models import ResumenParticipacion
+
+    resumen = ResumenParticipacion.objects.filter(participacion_id=participacion.id).first()
+    return resumen or actualizar_participacion(participacion.id)
+
+
+def programar(funcion, *args):
+    """
+    Ejecuta `funcion(*args)` al confirmar la transacción actual (o ya, si no
+    hay ninguna). Un fallo del resumen se registra y no afecta al guardado
+    que lo provocó; `recalcular_resumenes` lo corrige.
+    """
+    def ejecutar():
+        try:
+            funcion(*args)
+        except Exception as e:
+            logger.error(f"Error al actualizar el resumen ({funcion.__name__}{args}): {str(e)}")
+
+    transaction.on_commit(ejecutar)
@@ -0,0 +1,57 @@
+# backend/evaluations/signals.py
+"""
+Mantenimiento de los resúmenes de resultados (ver resumenes.py) y aviso de
+los ingresos al monitor en vivo (ver monitor.py).
+
+Las escrituras masivas que no envían señales (bulk_create de las respuestas
+de un batch) terminan guardando la participación, y eso actualiza su
+resumen.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import monitor
+from .models import AjustePuntaje, Ejercicio, EstudianteEvaluacion, Evaluacion, EvaluacionEjercicio, RespuestaEjercicio
+from .resumenes import actualizar_participacion, programar, quitar_participacion, recalcular_evaluacion
+
+
+@receiver(post_save, sender=RespuestaEjercicio)
+@receiver(post_delete, sender=RespuestaEjercicio)
+@receiver(post_save, sender=AjustePuntaje)
+@receiver(post_delete, sender=AjustePuntaje)
+def respuesta_o_ajuste_cambiado(sender, instance, **kwargs):
+    programar(actualizar_participacion, instance.estudiante_evaluacion_id)
+
+
+@receiver(post_save, sender=EstudianteEvaluacion)
+def participacion_guardada(sender, instance, created=False, **kwargs):
+    programar(actualizar_participacion, instance.id)
+    # Las participaciones se crean desde varias vistas (get_or_create)
+    if created:
+        monitor.publicar('ingreso', instance)
+
+
+@receiver(pre_delete, sender=EstudianteEvaluacion)
+def participacion_borrada(sender, instance, origin=None, **kwargs):
+    # Si se borra la evaluación entera sus resúmenes desaparecen con ella
+    if isinstance(origin, Evaluacion) or getattr(origin, 'model', None) is Evaluacion:
+        return
+    quitar_participacion(instance.id, instance.evaluacion_id)
+
+
+@receiver(post_save, sender=EvaluacionEjercicio)
+@receiver(post_delete, sender=EvaluacionEjercicio)
+def ejercicios_de_evaluacion_cambiados(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Evaluacion) or getattr(origin, 'model', None) is Evaluacion:
+        return
+    programar(recalcular_evaluacion, instance.evaluacion_id)
+
+
+@receiver(post_save, sender=Ejercicio)
+def ejercicio_guardado(sender, instance, created, update_fields=None, **kwargs):
+    # El puntaje y el título del ejercicio están en los resúmenes de cada
+    # evaluación que lo usa
+    if created or (update_fields and not {'puntaje', 'titulo'} & set(update_fields)):
+        return
+    for evaluacion_id in EvaluacionEjercicio.objects.filter(ejercicio=instance).values_list('evaluacion_id', flat=True):
+        programar(recalcular_evaluacion, evaluacion_id)
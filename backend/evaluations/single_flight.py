@@ -0,0 +1,203 @@
+# backend/evaluations/single_flight.py
+"""
+Deduplicación de ejecuciones idénticas en curso (single-flight).
+
+Cuando varias peticiones envían a la vez el mismo código con la misma entrada
+(la plantilla inicial de un ejercicio, el código que el docente proyecta...),
+solo una llega a Judge0 y las demás esperan y reciben una copia de su
+resultado. La clave es un digest del código, la entrada, la salida esperada,
+el lenguaje y los límites de ejecución.
+
+Dentro de un proceso se coordina con un Event por clave. Con REDIS_URL,
+además, el primer proceso toma `<prefijo>:lock:<clave>` (SET NX con TTL),
+publica el resultado en `<prefijo>:r:<clave>` durante SINGLE_FLIGHT_RESULT_TTL
+segundos y los demás procesos lo leen en vez de ejecutar. Si quien ejecuta
+falla o su cerrojo caduca, los que esperaban ejecutan por su cuenta.
+
+No es una caché: una vez entregado, el resultado solo se conserva unos
+segundos para los que seguían esperando.
+"""
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import grading_jobs
+
+logger = logging.getLogger('judge')
+
+SINGLE_FLIGHT_ENABLED = getattr(settings, 'SINGLE_FLIGHT_ENABLED', True)
+SINGLE_FLIGHT_LOCK_TTL = getattr(settings, 'SINGLE_FLIGHT_LOCK_TTL', 60)
+SINGLE_FLIGHT_RESULT_TTL = getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL', 5)
+
+
+def clave_ejecucion(tipo, code, entrada, expected_output, language):
+    """Digest de todo lo que determina el resultado de una ejecución"""
+    from .judge_utils import DEFAULT_EXECUTION_OPTIONS
+
+    datos = json.dumps({
+        'tipo': tipo,
+        'codigo': code,
+        'entrada': entrada,
+        'salida_esperada': expected_output,
+        'lenguaje': language,
+        'limites': DEFAULT_EXECUTION_OPTIONS,
+    }, sort_keys=True)
+    return hashlib.sha256(datos.encode('utf-8')).hexdigest()
+
+
+class _Vuelo:
+    __slots__ = ('evento', 'resultado', 'completado')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.completado = False
+
+
+class SingleFlight:
+    """
+    Ejecuciones en curso por clave, en el proceso y (con `conexion`) en Redis.
+
+    Cuenta en `<prefijo>:stats` las ejecuciones reales ('ejecutadas') y las
+    que recibieron el resultado de otra ('compartidas').
+    """
+
+    def __init__(self, conexion=None, prefijo='singleflight', lock_ttl=SINGLE_FLIGHT_LOCK_TTL,
+                 resultado_ttl=SINGLE_FLIGHT_RESULT_TTL, intervalo=0.05):
+        self.redis = conexion
+        self.prefijo = prefijo
+        self.lock_ttl = lock_ttl
+        self.resultado_ttl = resultado_ttl
+        self.intervalo = intervalo
+        self.stats = f"{prefijo}:stats"
+        self._vuelos = {}
+        self._lock = threading.Lock()
+
+    def _contar(self, campo):
+        try:
+            if self.redis is not None:
+                self.redis.hincrby(self.stats, campo, 1)
+                return
+            clave = f"{self.stats}:{campo}"
+            cache.add(clave, 0, timeout=None)
+            cache.incr(clave)
+        except Exception as e:
+            logger.debug(f"No se pudo contar {campo} en single-flight: {str(e)}")
+
+    def ejecutar(self, clave, funcion):
+        """
+        Devuelve el resultado de `funcion()`, compartido con las llamadas
+        simultáneas con la misma clave
+        """
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+
+        if not lider:
+            vuelo.evento.wait(self.lock_ttl)
+            if vuelo.completado:
+                self._contar('compartidas')
+                return copy.deepcopy(vuelo.resultado)
+            # La ejecución compartida falló: cada uno lo intenta por su cuenta
+            return funcion()
+
+        try:
+            vuelo.resultado = self._ejecutar_entre_procesos(clave, funcion)
+            vuelo.completado = True
+            return vuelo.resultado
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            vuelo.evento.set()
+
+    def _ejecutar_entre_procesos(self, clave, funcion):
+        if self.redis is None:
+            self._contar('ejecutadas')
+            return funcion()
+
+        cerrojo = f"{self.prefijo}:lock:{clave}"
+        clave_resultado = f"{self.prefijo}:r:{clave}"
+        token = uuid.uuid4().hex
+        try:
+            limite = time.monotonic() + self.lock_ttl
+            while True:
+                datos = self.redis.get(clave_resultado)
+                if datos is not None:
+                    self._contar('compartidas')
+                    return json.loads(datos)
+                if self.redis.set(cerrojo, token, nx=True, px=int(self.lock_ttl * 1000)):
+                    break
+                if time.monotonic() >= limite:
+                    token = None
+                    break
+                time.sleep(self.intervalo)
+        except Exception as e:
+            logger.warning(f"Single-flight sin Redis: {str(e)}")
+            token = None
+
+        try:
+            resultado = funcion()
+            self._contar('ejecutadas')
+            if token is not None:
+                try:
+                    self.redis.set(clave_resultado, json.dumps(resultado, default=str), ex=self.resultado_ttl)
+                except Exception as e:
+                    logger.warning(f"No se pudo publicar el resultado compartido: {str(e)}")
+            return resultado
+        finally:
+            if token is not None:
+                self._liberar(cerrojo, token)
+
+    def _liberar(self, cerrojo, token):
+        """Borra el cerrojo solo si sigue siendo nuestro"""
+        import redis
+
+        try:
+            with self.redis.pipeline() as pipe:
+                pipe.watch(cerrojo)
+                if pipe.get(cerrojo) == token:
+                    pipe.multi()
+                    pipe.delete(cerrojo)
+                    pipe.execute()
+        except redis.WatchError:
+            pass
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el cerrojo de single-flight: {str(e)}")
+
+    def estadisticas(self):
+        if self.redis is not None:
+            stats = self.redis.hgetall(self.stats)
+            datos = {campo: int(stats.get(campo, 0)) for campo in ('ejecutadas', 'compartidas')}
+        else:
+            datos = {campo: cache.get(f"{self.stats}:{campo}", 0) for campo in ('ejecutadas', 'compartidas')}
+        with self._lock:
+            datos['en_curso'] = len(self._vuelos)
+        return datos
+
+
+_single_flight = None
+
+
+def get_single_flight():
+    """Single-flight compartido por el proceso (entre procesos si hay REDIS_URL)"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight(grading_jobs.get_redis() if grading_jobs.REDIS_URL else None)
+    return _single_flight
+
+
+def ejecutar_una_vez(tipo, code, entrada, expected_output, language, funcion):
+    """`funcion()` deduplicada por el digest de la ejecución (ver clave_ejecucion)"""
+    if not SINGLE_FLIGHT_ENABLED:
+        return funcion()
+    clave = clave_ejecucion(tipo, code, entrada, expected_output, language)
+    return get_single_flight().ejecutar(clave, funcion)
@@ -0,0 +1,245 @@
+# curiosmaze_backend/evaluations/tests/test_admission.py
+
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from evaluations import admission, judge_utils
+from evaluations.admission import ControlAdmision
+from evaluations.judge_utils import Judge0Client
+from evaluations.management.commands._judge0_stub import Judge0Stub
+from evaluations.models import (Curso, Ejercicio, EstudianteEvaluacion, Evaluacion, EvaluacionEjercicio,
+                                JobCalificacion)
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+def participacion(id, evaluacion_id):
+    return SimpleNamespace(id=id, evaluacion_id=evaluacion_id, estudiante_id=id)
+
+
+class ControlAdmisionTestCase(SimpleTestCase):
+    def setUp(self):
+        self.guardados = {}
+        self.calificados = []
+        self.terminado = threading.Event()
+        self.esperados = 1
+
+    def _control(self, max_global, max_por_evaluacion):
+        def ejecutar(job):
+            self.calificados.append((job['evaluacion_id'], job['ejercicios'][0]['codigo']))
+            if len(self.calificados) >= self.esperados:
+                self.terminado.set()
+
+        return ControlAdmision(max_global, max_por_evaluacion, ejecutar=ejecutar,
+                               guardar=lambda job: self.guardados.update({job['id']: dict(job)}))
+
+    def _encolar(self, control, estudiante, evaluacion_id, codigo, ejercicio_id=1):
+        with control.admitir('codigo', participacion(estudiante, evaluacion_id),
+                             [{'ejercicio_id': ejercicio_id, 'codigo': codigo}]) as job:
+            return job
+
+    def test_plazas_por_evaluacion_y_globales(self):
+        control = self._control(max_global=2, max_por_evaluacion=1)
+
+        self.assertTrue(control.reservar(1))
+        self.assertFalse(control.reservar(1))
+        self.assertTrue(control.reservar(2))
+        job = self._encolar(control, 10, 3, 'print(1)')
+
+        self.assertEqual((job['estado'], job['posicion']), ('en_cola', 1))
+        self.assertEqual(job['espera_estimada_s'], 5.0)
+        # Un envío nuevo del mismo ejercicio sustituye al que esperaba
+        otro = self._encolar(control, 10, 3, 'print(2)')
+        self.assertEqual(otro['id'], job['id'])
+        self.assertEqual(control.estado(3)['en_cola'], 1)
+        self.assertEqual(self.guardados[job['id']]['ejercicios'][0]['codigo'], 'print(2)')
+
+        control.liberar(1, duracion=1.0)
+
+        self.assertTrue(self.terminado.wait(5))
+        self.assertEqual(self.calificados, [(3, 'print(2)')])
+        self.assertEqual(control.estado(3)['en_cola'], 0)
+
+    def test_las_evaluaciones_se_turnan(self):
+        control = self._control(max_global=1, max_por_evaluacion=1)
+        self.esperados = 3
+        self.assertTrue(control.reservar(9))
+        self._encolar(control, 1, 1, 'a1', ejercicio_id=1)
+        self._encolar(control, 1, 1, 'a2', ejercicio_id=2)
+        self._encolar(control, 2, 2, 'b1')
+
+        control.liberar(9)
+
+        self.assertTrue(self.terminado.wait(5))
+        self.assertEqual(self.calificados, [(1, 'a1'), (2, 'b1'), (1, 'a2')])
+        self.assertEqual(control.estado()['en_curso'], 0)
+
+    def test_admitido_ocupa_la_plaza_hasta_salir(self):
+        control = self._control(max_global=1, max_por_evaluacion=1)
+
+        with control.admitir('codigo', participacion(1, 1), [{'ejercicio_id': 1, 'codigo': 'x'}]) as job:
+            self.assertIsNone(job)
+            self.assertEqual(control.estado(1)['en_curso'], 1)
+        self.assertEqual(control.estado()['en_curso'], 0)
+
+
+class AdmisionEndpointsTestCase(TestCase):
+    def setUp(self):
+        for c in caches.all():
+            c.clear()
+        self.stub = Judge0Stub().start()
+        self.client_judge0 = Judge0Client(self.stub.url)
+        patcher = patch.object(judge_utils, '_judge0_client', self.client_judge0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.docente = User.objects.create_user(
+            username='docente_adm', email='docente_adm@test.com', password='testpass123'
+        )
+        UserProfile.objects.create(user=self.docente, rol='docente', nombres='Docente',
+                                   apellidos='Adm', identificacion='adm001')
+        self.estudiante = User.objects.create_user(
+            username='estudiante_adm', email='estudiante_adm@test.com', password='testpass123'
+        )
+        UserProfile.objects.create(user=self.estudiante, rol='estudiante', nombres='Estudiante',
+                                   apellidos='Adm', identificacion='adm002')
+
+        curso = Curso.objects.create(nombre='Curso', docente=self.docente)
+        self.evaluacion = Evaluacion.objects.create(
+            titulo='Evaluación', curso=curso, fecha_inicio=timezone.now(),
+            estado='activa', creador=self.docente, codigo_acceso='ADM001'
+        )
+        self.ejercicio = Ejercicio.objects.create(
+            titulo='Doble', descripcion='Imprime el doble', tipo='practico', puntaje=10,
+            creador=self.docente, contenido={'ejemplos': [{'entrada': '2', 'salida': '4'}]}
+        )
+        EvaluacionEjercicio.objects.create(evaluacion=self.evaluacion, ejercicio=self.ejercicio, orden=0)
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.estudiante)
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        for c in caches.all():
+            c.clear()
+
+    def _con_control(self, control):
+        patcher = patch.object(admission, '_control', control)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sin_plaza_responde_202_con_el_job(self):
+        self._con_control(ControlAdmision(max_global=0, max_por_evaluacion=0))
+
+        response = self.api.post('/api/submit-codigo/', {
+            'evaluacion_id': self.evaluacion.id, 'ejercicio_id': self.ejercicio.id,
+            'codigo': 'print(int(input()) * 2)', 'language_id': 71,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['posicion'], 1)
+        self.assertEqual(self.stub.peticiones('POST', '/submissions'), 0)
+        estado = self.api.get(response.data['status_url'])
+        self.assertEqual(estado.data['estado'], 'en_cola')
+
+        docente = APIClient()
+        docente.force_authenticate(user=self.docente)
+        cola = docente.get(f'/api/evaluaciones/{self.evaluacion.id}/cola-calificacion/')
+        self.assertEqual(cola.status_code, 200)
+        self.assertEqual(cola.data['en_cola'], 1)
+        self.assertEqual(self.api.get(f'/api/evaluaciones/{self.evaluacion.id}/cola-calificacion/').status_code, 403)
+
+    def test_batch_sobre_el_limite_se_encola_en_vez_de_429(self):
+        encolados = []
+        self._con_control(ControlAdmision(ejecutar=encolados.append))
+        datos = {
+            'evaluacion_id': self.evaluacion.id, 'batch_id': 'adm',
+            'ejercicios': [{'ejercicio_id': self.ejercicio.id, 'codigo': 'print(int(input()) * 2)'}],
+        }
+
+        respuestas = [self.api.post('/api/submit-batch/', datos, format='json') for _ in range(6)]
+
+        self.assertEqual([r.status_code for r in respuestas], [200] * 5 + [202])
+        # Había plaza: el job empieza sin esperar
+        self.assertEqual(respuestas[-1].data['posicion'], 0)
+
+    def test_batch_con_resultados_sobre_el_limite_se_guarda(self):
+        self._con_control(ControlAdmision(ejecutar=lambda job: None))
+        datos = {
+            'evaluacion_id': self.evaluacion.id, 'batch_id': 'adm',
+            'ejercicios': [{'ejercicio_id': self.ejercicio.id, 'codigo': 'print(int(input()) * 2)'}],
+            'resultados_judge0': [{'ejercicio_id': self.ejercicio.id, 'success': True, 'puntaje_obtenido': 10}],
+        }
+
+        respuestas = [self.api.post('/api/submit-batch/', datos, format='json') for _ in range(6)]
+
+        # Los resultados ya calificados no llaman a Judge0: se guardan sin job
+        self.assertEqual([r.status_code for r in respuestas], [200] * 6)
+        self.assertTrue(respuestas[-1].data['success'])
+        self.assertFalse(JobCalificacion.objects.exists())
+
+    def test_job_admitido_sobrevive_a_un_reinicio(self):
+        self._con_control(ControlAdmision(max_global=0, max_por_evaluacion=0))
+
+        response = self.api.post('/api/submit-codigo/', {
+            'evaluacion_id': self.evaluacion.id, 'ejercicio_id': self.ejercicio.id,
+            'codigo': 'print(int(input()) * 2)', 'language_id': 71,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        fila = JobCalificacion.objects.get(id=response.data['job_id'])
+        self.assertEqual((fila.estado, fila.proceso), ('en_cola', admission.PROCESO))
+        self.assertGreater(fila.lease_hasta, timezone.now())
+        # Con el lease vigente ningún otro proceso lo toma
+        self.assertEqual(ControlAdmision(ejecutar=lambda job: None).recuperar(), 0)
+
+        # El proceso muere: se pierde la caché y deja de renovar el lease
+        for c in caches.all():
+            c.clear()
+        vencido = timezone.now() - timedelta(seconds=1)
+        JobCalificacion.objects.filter(id=fila.id).update(proceso='caido:1:abcdef', lease_hasta=vencido)
+        JobCalificacion.objects.create(id='vivo', participacion=fila.participacion, tipo='codigo',
+                                       proceso='vivo:1:abcdef', lease_hasta=timezone.now() + timedelta(seconds=60),
+                                       datos={**fila.datos, 'id': 'vivo'})
+        self.assertEqual(self.api.get(response.data['status_url']).data['estado'], 'en_cola')
+
+        calificados = []
+        terminado = threading.Event()
+
+        def ejecutar(job):
+            calificados.append(job['id'])
+            terminado.set()
+
+        control = ControlAdmision(ejecutar=ejecutar)
+        # Solo se recupera el job con el lease vencido, y una sola vez
+        self.assertEqual(control.recuperar(), 1)
+        self.assertEqual(control.recuperar(), 0)
+        self.assertTrue(terminado.wait(5))
+        self.assertEqual(calificados, [fila.id])
+        fila.refresh_from_db()
+        self.assertEqual(fila.proceso, admission.PROCESO)
+        self.assertGreater(fila.lease_hasta, timezone.now())
+        self.assertEqual(JobCalificacion.objects.get(id='vivo').proceso, 'vivo:1:abcdef')
+
+    def test_renovar_leases_solo_de_este_proceso(self):
+        participacion_estudiante = EstudianteEvaluacion.objects.create(estudiante=self.estudiante,
+                                                                       evaluacion=self.evaluacion)
+        vencido = timezone.now() - timedelta(seconds=1)
+        for id, proceso in (('propio', admission.PROCESO), ('ajeno', 'otro:1:abcdef')):
+            JobCalificacion.objects.create(id=id, participacion=participacion_estudiante, tipo='codigo',
+                                           proceso=proceso, lease_hasta=vencido)
+
+        self.assertEqual(ControlAdmision().renovar_leases(), 1)
+
+        self.assertGreater(JobCalificacion.objects.get(id='propio').lease_hasta, timezone.now())
+        self.assertEqual(JobCalificacion.objects.get(id='ajeno').lease_hasta, vencido)
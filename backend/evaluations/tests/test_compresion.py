@@ -0,0 +1,103 @@
+# curiosmaze_backend/evaluations/tests/test_compresion.py
+
+import io
+import json
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from evaluations import compresion
+from evaluations.compresion import MARCA, desempaquetar, empaquetar, esta_comprimido, recortar_salidas
+from evaluations.models import Curso, Ejercicio, EstudianteEvaluacion, Evaluacion, RespuestaEjercicio
+
+User = get_user_model()
+
+
+def respuesta_grande(ejemplos=50):
+    return {
+        'codigo': 'n = int(input())\nprint(n * 2)\n',
+        'resultados': [
+            {'entrada': str(i), 'salida_esperada': str(i * 2), 'salida_obtenida': str(i * 2),
+             'es_correcto': True, 'stdout': f'depuración {i}\n' * 20}
+            for i in range(ejemplos)
+        ],
+    }
+
+
+class CompresionTestCase(SimpleTestCase):
+    def test_recorta_salidas_anidadas_y_marca_el_dict(self):
+        valor = {'codigo': 'x' * 100, 'resultados': [{'stderr': 'e' * 100}, {'stderr': 'ok'}]}
+
+        recortado = recortar_salidas(valor, maximo=10)
+
+        self.assertEqual(recortado['codigo'], 'x' * 100)
+        self.assertEqual(recortado['resultados'][0], {'stderr': 'e' * 10, 'truncado': True})
+        self.assertEqual(recortado['resultados'][1], {'stderr': 'ok'})
+        self.assertNotIn('truncado', recortado)
+
+    def test_solo_comprime_por_encima_del_umbral(self):
+        pequena = {'codigo': 'print(1)', 'resultados': []}
+        grande = respuesta_grande()
+
+        self.assertIs(empaquetar(pequena), pequena)
+        sobre = empaquetar(grande)
+        self.assertTrue(esta_comprimido(sobre))
+        self.assertLess(len(json.dumps(sobre)), len(json.dumps(grande)) / 3)
+        self.assertEqual(desempaquetar(sobre), grande)
+        self.assertEqual(desempaquetar(pequena), pequena)
+
+    def test_siempre_escribe_zlib(self):
+        # Aunque este proceso tenga zstandard, otro sin él debe poder leer la fila
+        with patch.object(compresion, 'zstandard', Mock()):
+            sobre = empaquetar(respuesta_grande())
+
+        self.assertEqual(sobre[MARCA], 'zlib')
+        with patch.object(compresion, 'zstandard', None):
+            self.assertEqual(desempaquetar(sobre), respuesta_grande())
+
+
+class RespuestaComprimidaTestCase(TestCase):
+    def setUp(self):
+        docente = User.objects.create_user(username='docente_zip', email='docente_zip@test.com', password='x')
+        estudiante = User.objects.create_user(username='estudiante_zip', email='estudiante_zip@test.com', password='x')
+        curso = Curso.objects.create(nombre='Curso', docente=docente)
+        evaluacion = Evaluacion.objects.create(titulo='Parcial', curso=curso, fecha_inicio=timezone.now(),
+                                               estado='activa', creador=docente, codigo_acceso='ZIP001')
+        ejercicio = Ejercicio.objects.create(titulo='Doble', descripcion='Doble', tipo='practico', puntaje=10,
+                                             creador=docente)
+        participacion = EstudianteEvaluacion.objects.create(estudiante=estudiante, evaluacion=evaluacion,
+                                                            estado='activo', fecha_inicio=timezone.now())
+        self.datos = dict(estudiante_evaluacion=participacion, ejercicio=ejercicio, es_correcta=True)
+
+    def _guardado(self, respuesta):
+        """Valor de la columna tal como está en la base de datos"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT respuesta FROM {RespuestaEjercicio._meta.db_table} WHERE id = %s", [respuesta.id])
+            valor = cursor.fetchone()[0]
+        return json.loads(valor) if isinstance(valor, str) else valor
+
+    def test_se_guarda_comprimida_y_se_lee_igual(self):
+        contenido = respuesta_grande()
+        respuesta = RespuestaEjercicio.objects.create(respuesta=contenido, **self.datos)
+
+        self.assertIn(MARCA, self._guardado(respuesta))
+        self.assertEqual(RespuestaEjercicio.objects.get(id=respuesta.id).respuesta, contenido)
+
+    def test_filas_anteriores_se_leen_y_se_comprimen_al_reescribir(self):
+        contenido = respuesta_grande()
+        respuesta = RespuestaEjercicio.objects.create(respuesta={}, **self.datos)
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {RespuestaEjercicio._meta.db_table} SET respuesta = %s WHERE id = %s",
+                           [json.dumps(contenido), respuesta.id])
+
+        self.assertEqual(RespuestaEjercicio.objects.get(id=respuesta.id).respuesta, contenido)
+        self.assertNotIn(MARCA, self._guardado(respuesta))
+
+        call_command('comprimir_respuestas', stdout=io.StringIO())
+
+        self.assertIn(MARCA, self._guardado(respuesta))
+        self.assertEqual(RespuestaEjercicio.objects.get(id=respuesta.id).respuesta, contenido)
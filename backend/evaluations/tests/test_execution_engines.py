@@ -0,0 +1,183 @@
+# curiosmaze_backend/evaluations/tests/test_execution_engines.py
+
+import os
+import signal
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from evaluations import execution_engines, judge_utils
+from evaluations.execution_engines import (
+    Judge0Engine,
+    LocalSandboxEngine,
+    WarmPoolEngine,
+    get_execution_engine,
+)
+
+
+class LocalSandboxEngineTestCase(SimpleTestCase):
+    def setUp(self):
+        self.motor = LocalSandboxEngine(max_concurrentes=2, opciones={
+            **judge_utils.DEFAULT_EXECUTION_OPTIONS,
+            'cpu_time_limit': 1,
+            'cpu_extra_time': 0,
+            'wall_time_limit': 2,
+            'memory_limit': 256000,
+        })
+
+    def test_salida_correcta_e_incorrecta(self):
+        codigo = "print(int(input()) * 2)"
+
+        correcto = self.motor.ejecutar(codigo, '21', '42')
+        incorrecto = self.motor.ejecutar(codigo, '21', '41')
+
+        self.assertTrue(correcto['success'])
+        self.assertEqual(correcto['status']['id'], 3)
+        self.assertEqual(correcto['stdout'], '42\n')
+        self.assertEqual(incorrecto['status']['id'], 4)
+        self.assertFalse(incorrecto['success'])
+
+    def test_lote_mantiene_el_orden(self):
+        resultados = self.motor.ejecutar_lote("print(input()[::-1])", [('abc', 'cba'), ('xy', 'yx'), ('1', '2')])
+
+        self.assertEqual([r['status']['id'] for r in resultados], [3, 3, 4])
+        self.assertEqual([r['stdout'] for r in resultados], ['cba\n', 'yx\n', '1\n'])
+
+    def test_limites_de_tiempo_memoria_y_errores(self):
+        bucle = self.motor.ejecutar("while True:\n    pass")
+        memoria = self.motor.ejecutar("datos = bytearray(1024 * 1024 * 1024)")
+        error = self.motor.ejecutar("raise ValueError('fallo')")
+
+        self.assertEqual(bucle['status']['id'], 5)
+        self.assertEqual(memoria['status']['id'], 11)
+        self.assertIn('MemoryError', memoria['stderr'])
+        self.assertEqual(error['status']['id'], 11)
+        self.assertIn('ValueError: fallo', error['stderr'])
+
+    def test_codigo_mayor_que_el_limite_de_argv(self):
+        # Un argumento de argv no puede pasar de 128 KB en Linux
+        codigo = "# " + "x" * 200 * 1024 + "\nprint(input()[::-1])"
+
+        resultado = self.motor.ejecutar(codigo, 'abc', 'cba')
+
+        self.assertEqual(resultado['status']['id'], 3)
+        self.assertEqual(resultado['stdout'], 'cba\n')
+
+    def test_fallo_al_lanzar_el_proceso(self):
+        with patch.object(execution_engines.subprocess, 'Popen',
+                          side_effect=OSError(7, 'Argument list too long')):
+            resultado = self.motor.ejecutar("print(1)")
+
+        self.assertFalse(resultado['success'])
+        self.assertEqual(resultado['status']['id'], 13)
+        self.assertIn('Argument list too long', resultado['error'])
+
+    def test_lenguaje_no_soportado(self):
+        resultado = self.motor.ejecutar("console.log(1)", language='javascript')
+
+        self.assertEqual(resultado['status']['id'], 13)
+        self.assertFalse(resultado['success'])
+
+    def test_judge_utils_usa_el_motor_configurado(self):
+        with patch.object(execution_engines, '_motor', self.motor):
+            resultado = judge_utils.ejecutar_codigo("print(input())", 'hola', 'hola')
+            ejemplos = judge_utils.verificar_ejemplos("print(int(input()) + 1)", [
+                {'entrada': '1', 'salida': '2'}, {'entrada': '5', 'salida': '7'}
+            ])
+
+        self.assertEqual(resultado['status']['id'], 3)
+        self.assertEqual(ejemplos['casos_correctos'], 1)
+        self.assertEqual(ejemplos['total_ejemplos'], 2)
+        self.assertFalse(ejemplos['incompleto'])
+
+    def test_primeras_llamadas_concurrentes_crean_un_solo_motor(self):
+        creados = []
+
+        def crear(motor, *args, **kwargs):
+            creados.append(motor)
+            time.sleep(0.05)
+
+        barrera = threading.Barrier(8)
+        motores = []
+
+        def pedir():
+            barrera.wait()
+            motores.append(get_execution_engine())
+
+        with patch.object(execution_engines, '_motor', None), \
+                patch.object(execution_engines, 'EXECUTION_ENGINE', 'pool'), \
+                patch.object(WarmPoolEngine, '__init__', crear):
+            hilos = [threading.Thread(target=pedir) for _ in range(8)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+        self.assertEqual(len(creados), 1)
+        self.assertTrue(all(motor is creados[0] for motor in motores))
+
+    def test_motor_por_defecto_es_judge0(self):
+        with patch.object(execution_engines, '_motor', None), \
+                patch.object(execution_engines, 'EXECUTION_ENGINE', 'desconocido'):
+            self.assertIsInstance(get_execution_engine(), Judge0Engine)
+
+
+class WarmPoolEngineTestCase(SimpleTestCase):
+    def setUp(self):
+        self.respaldo = MagicMock()
+        self.motor = WarmPoolEngine(max_concurrentes=2, max_ejecuciones=3, respaldo=self.respaldo, opciones={
+            **judge_utils.DEFAULT_EXECUTION_OPTIONS,
+            'cpu_time_limit': 1,
+            'cpu_extra_time': 0,
+            'wall_time_limit': 2,
+            'memory_limit': 256000,
+        })
+        self.addCleanup(self.motor.cerrar)
+
+    def test_ejemplos_con_cpu_y_memoria(self):
+        resultados = self.motor.ejecutar_lote("print(int(input()) * 2)", [('2', '4'), ('3', '7')])
+
+        self.assertEqual([r['status']['id'] for r in resultados], [3, 4])
+        for resultado in resultados:
+            self.assertGreater(resultado['memory'], 0)
+            self.assertIn('wall_time', resultado)
+
+    def test_estado_no_se_comparte_entre_ejecuciones(self):
+        self.motor.ejecutar("import math\nmath.pi = 3\nx = 1")
+        resultado = self.motor.ejecutar("import math\nprint(math.pi, 'x' in globals())")
+
+        self.assertEqual(resultado['stdout'], '3.141592653589793 False\n')
+        self.assertEqual(self.motor.estadisticas()['arrancados'], 1)
+
+    def test_recicla_tras_max_ejecuciones_y_fallos(self):
+        for _ in range(3):
+            self.motor.ejecutar("print(1)")
+        self.assertEqual(self.motor.estadisticas()['reciclados'], 1)
+
+        # Worker muerto entre ejecuciones
+        self.motor.ejecutar("print(1)")
+        os.kill(self.motor._libres[0].proceso.pid, signal.SIGKILL)
+        fallido = self.motor.ejecutar("print(1)")
+        siguiente = self.motor.ejecutar("print(1)")
+
+        self.assertEqual(fallido['status']['id'], 13)
+        self.assertEqual(siguiente['status']['id'], 3)
+        self.assertEqual(self.motor.estadisticas()['reciclados'], 2)
+
+    def test_limites_de_tiempo_y_salida_del_estudiante(self):
+        bucle = self.motor.ejecutar("while True:\n    pass")
+        salida = self.motor.ejecutar("import sys\nprint('parcial')\nsys.exit('adios')")
+
+        self.assertEqual(bucle['status']['id'], 5)
+        self.assertEqual(salida['status']['id'], 11)
+        self.assertEqual(salida['stdout'], 'parcial\n')
+        self.assertEqual(salida['stderr'], 'adios\n')
+
+    def test_otros_lenguajes_van_al_respaldo(self):
+        self.respaldo.ejecutar.return_value = {'success': True}
+
+        self.motor.ejecutar("console.log(1)", '', '1', 'javascript')
+
+        self.respaldo.ejecutar.assert_called_once_with("console.log(1)", '', '1', 'javascript')
@@ -0,0 +1,78 @@
+# curiosmaze_backend/evaluations/tests/test_grading_cache.py
+
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from evaluations import grading_cache, judge_utils
+from evaluations.grading_cache import GradingResultCache, clave_calificacion
+from evaluations.judge_utils import Judge0Client
+from evaluations.management.commands._judge0_stub import Judge0Stub
+from evaluations.models import Ejercicio
+from evaluations.views import calificar_codigo
+
+
+class GradingCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        for c in caches.all():
+            c.clear()
+        self.stub = Judge0Stub().start()
+        self.client_judge0 = Judge0Client(self.stub.url)
+        for objetivo, atributo, valor in ((judge_utils, '_judge0_client', self.client_judge0),
+                                          (grading_cache, '_grading_cache', GradingResultCache())):
+            patcher = patch.object(objetivo, atributo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.ejercicio = Ejercicio(id=1, puntaje=10, contenido={
+            'ejemplos': [{'entrada': '2', 'salida': '4'}, {'entrada': '3', 'salida': '6'}]
+        })
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        for c in caches.all():
+            c.clear()
+
+    def test_reenvio_identico_no_llama_a_judge0(self):
+        primero = calificar_codigo('print(int(input()) * 2)', self.ejercicio)
+        envios = self.stub.peticiones('POST', '/submissions/batch')
+
+        # Solo cambian espacios al final y saltos de línea
+        segundo = calificar_codigo('print(int(input()) * 2)   \r\n\n', self.ejercicio)
+
+        self.assertEqual(self.stub.peticiones('POST', '/submissions/batch'), envios)
+        self.assertTrue(segundo['desde_cache'])
+        self.assertEqual(segundo['puntaje_obtenido'], primero['puntaje_obtenido'])
+        self.assertEqual(grading_cache.get_grading_cache().estadisticas(), {'hits': 1, 'misses': 1})
+
+    def test_clave_cambia_con_el_ejercicio_lenguaje_y_limites(self):
+        clave = clave_calificacion('print(1)', self.ejercicio, 71)
+
+        self.assertNotEqual(clave, clave_calificacion('print(2)', self.ejercicio, 71))
+        self.assertNotEqual(clave, clave_calificacion('print(1)', self.ejercicio, 63))
+        with patch.dict(judge_utils.DEFAULT_EXECUTION_OPTIONS, {'cpu_time_limit': 10}):
+            self.assertNotEqual(clave, clave_calificacion('print(1)', self.ejercicio, 71))
+        self.ejercicio.contenido = {'ejemplos': [{'entrada': '2', 'salida': '5'}]}
+        self.assertNotEqual(clave, clave_calificacion('print(1)', self.ejercicio, 71))
+
+    def test_no_guarda_calificaciones_fallidas(self):
+        self.stub.stop()
+        with patch.object(judge_utils.judge0_health, 'check', return_value=(False, 'caído')):
+            calificar_codigo('print(int(input()) * 2)', self.ejercicio)
+        self.stub = Judge0Stub().start()
+
+        self.assertIsNone(grading_cache.get_grading_cache().obtener(
+            clave_calificacion('print(int(input()) * 2)', self.ejercicio)
+        ))
+
+
+class VerificarCachesTestCase(SimpleTestCase):
+    def test_alias_que_no_responde_es_un_error_de_arranque(self):
+        from evaluations.checks import verificar_caches
+
+        self.assertEqual(verificar_caches(None), [])
+        with patch.object(caches['sessions'], 'set', side_effect=ConnectionError('NOAUTH Authentication required')):
+            errores = verificar_caches(None)
+        self.assertEqual([e.id for e in errores], ['evaluations.E001'])
+        self.assertIn("'sessions'", errores[0].msg)
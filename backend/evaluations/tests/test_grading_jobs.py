@@ -0,0 +1,334 @@
+# curiosmaze_backend/evaluations/tests/test_grading_jobs.py
+
+import json
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from evaluations import grading_jobs, judge_utils
+from evaluations.judge_utils import Judge0Client
+from evaluations.management.commands._judge0_stub import Judge0Stub
+from evaluations.models import (
+    Curso,
+    Ejercicio,
+    EstudianteEvaluacion,
+    Evaluacion,
+    EvaluacionEjercicio,
+    RespuestaEjercicio,
+)
+from evaluations.views import calificar_ejercicios, guardar_resultados_batch
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+class ColaEnMemoria:
+    """Misma interfaz que GradingJobQueue para los endpoints, sin Redis"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.cola = []
+
+    def guardar(self, job):
+        self.jobs[job['id']] = json.loads(json.dumps(job))
+
+    def obtener(self, job_id):
+        return self.jobs.get(job_id)
+
+    def encolar(self, job):
+        self.guardar(job)
+        self.cola.append(job['id'])
+
+
+class GradingJobsTestCase(TestCase):
+    def setUp(self):
+        for c in caches.all():
+            c.clear()
+        self.stub = Judge0Stub().start()
+        self.client_judge0 = Judge0Client(self.stub.url)
+        self.cola = ColaEnMemoria()
+        for objetivo, atributo, valor in ((judge_utils, '_judge0_client', self.client_judge0),
+                                          (grading_jobs, 'GRADING_ASYNC', True),
+                                          (grading_jobs, '_grading_queue', self.cola)):
+            patcher = patch.object(objetivo, atributo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.docente = User.objects.create_user(
+            username='docente_jobs', email='docente_jobs@test.com', password='testpass123'
+        )
+        self.estudiante = User.objects.create_user(
+            username='estudiante_jobs', email='estudiante_jobs@test.com', password='testpass123'
+        )
+        UserProfile.objects.create(user=self.estudiante, rol='estudiante', nombres='Estudiante',
+                                   apellidos='Jobs', identificacion='jobs123')
+
+        curso = Curso.objects.create(nombre='Curso', docente=self.docente)
+        self.evaluacion = Evaluacion.objects.create(
+            titulo='Evaluación', curso=curso, fecha_inicio=timezone.now(),
+            estado='activa', creador=self.docente, codigo_acceso='JOBS01'
+        )
+        self.ejercicios = []
+        for orden in range(2):
+            ejercicio = Ejercicio.objects.create(
+                titulo=f'Doble {orden}', descripcion='Imprime el doble', tipo='practico',
+                puntaje=10, creador=self.docente,
+                contenido={'ejemplos': [{'entrada': '2', 'salida': '4'}, {'entrada': '3', 'salida': '6'}]}
+            )
+            EvaluacionEjercicio.objects.create(evaluacion=self.evaluacion, ejercicio=ejercicio, orden=orden)
+            self.ejercicios.append(ejercicio)
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.estudiante)
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        for c in caches.all():
+            c.clear()
+
+    def _submit_batch(self):
+        return self.api.post('/api/submit-batch/', {
+            'evaluacion_id': self.evaluacion.id,
+            'batch_id': 'jobs',
+            'ejercicios': [{'ejercicio_id': ej.id, 'codigo': 'print(int(input()) * 2)', 'language_id': 71}
+                           for ej in self.ejercicios],
+        }, format='json')
+
+    def test_submit_batch_encola_sin_esperar_a_judge0(self):
+        response = self._submit_batch()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['estado'], 'en_cola')
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(self.cola.cola, [response.data['job_id']])
+        self.assertEqual(self.stub.peticiones('POST', '/submissions/batch'), 0)
+        self.assertFalse(RespuestaEjercicio.objects.exists())
+
+    def test_batch_sobre_el_limite_se_encola(self):
+        respuestas = [self._submit_batch() for _ in range(6)]
+
+        # El sexto supera JUDGE_RATE_LIMITS: también va a la cola en vez de un 429
+        self.assertEqual([r.status_code for r in respuestas], [202] * 6)
+        self.assertEqual(self.cola.cola, [r.data['job_id'] for r in respuestas])
+
+    def test_worker_califica_y_reporta_progreso(self):
+        job_id = self._submit_batch().data['job_id']
+        estados = []
+
+        def guardar(job):
+            self.cola.guardar(job)
+            estados.append([p['estado'] for p in job['progreso']])
+
+        grading_jobs.ejecutar_job(self.cola.obtener(job_id), al_actualizar=guardar)
+
+        self.assertEqual(estados[0], ['pendiente', 'pendiente'])
+        # Los ejercicios se califican en paralelo: el progreso llega en orden de finalización
+        self.assertTrue(any(sorted(e) == ['completado', 'pendiente'] for e in estados))
+        self.assertEqual(RespuestaEjercicio.objects.filter(es_correcta=True).count(), 2)
+        participacion = EstudianteEvaluacion.objects.get(estudiante=self.estudiante)
+        self.assertEqual(participacion.puntaje, 20)
+        self.assertEqual(participacion.estado, 'finalizado')
+
+        response = self.api.get(f'/api/grading-jobs/{job_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['estado'], 'completado')
+        self.assertEqual(response.data['completados'], 2)
+        self.assertEqual(response.data['resultado']['total_puntaje'], 20)
+
+    def test_estado_de_job_ajeno(self):
+        job_id = self._submit_batch().data['job_id']
+        otro = APIClient()
+        otro.force_authenticate(user=User.objects.create_user(
+            username='otro_jobs', email='otro_jobs@test.com', password='testpass123'
+        ))
+
+        self.assertEqual(otro.get(f'/api/grading-jobs/{job_id}/').status_code, 403)
+
+    def test_sin_cola_califica_en_el_request(self):
+        with patch.object(grading_jobs, 'GRADING_ASYNC', False):
+            response = self._submit_batch()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_puntaje'], 20)
+        self.assertEqual(self.cola.cola, [])
+
+    def test_guardar_batch_con_consultas_constantes(self):
+        for orden in range(2, 8):
+            ejercicio = Ejercicio.objects.create(titulo=f'Extra {orden}', descripcion='Extra', tipo='practico',
+                                                 puntaje=10, creador=self.docente)
+            EvaluacionEjercicio.objects.create(evaluacion=self.evaluacion, ejercicio=ejercicio, orden=orden)
+            self.ejercicios.append(ejercicio)
+        participacion = EstudianteEvaluacion.objects.create(estudiante=self.estudiante, evaluacion=self.evaluacion,
+                                                             estado='activo', fecha_inicio=timezone.now())
+
+        def guardar(ejercicios, puntaje):
+            enviados = [{'ejercicio_id': str(ej.id), 'codigo': 'print(1)', 'language_id': 63} for ej in ejercicios]
+            resultados = [{'ejercicio_id': str(ej.id), 'success': True, 'es_correcto': True,
+                           'puntaje_obtenido': puntaje, 'puntaje_maximo': 10} for ej in ejercicios]
+            # in_bulk, upsert, conteos y update de la participación (+ savepoint)
+            with self.assertNumQueries(6):
+                return guardar_resultados_batch(self.evaluacion, participacion, enviados, resultados, 'consultas')
+
+        guardar(self.ejercicios[:2], 5)
+        respuesta = guardar(self.ejercicios[:6], 10)
+
+        self.assertEqual(respuesta['total_puntaje'], 60)
+        self.assertEqual(respuesta['progreso'], 75)
+        self.assertEqual(RespuestaEjercicio.objects.filter(estudiante_evaluacion=participacion).count(), 6)
+        self.assertFalse(RespuestaEjercicio.objects.filter(puntaje_obtenido=5).exists())
+        self.assertEqual(set(RespuestaEjercicio.objects.values_list('language_id', flat=True)), {63})
+        participacion.refresh_from_db()
+        self.assertEqual(participacion.estado, 'activo')
+
+
+class CalificarEjerciciosTestCase(SimpleTestCase):
+    def setUp(self):
+        for c in caches.all():
+            c.clear()
+        self.stub = Judge0Stub(tiempo_ejecucion=0.3).start()
+        self.client_judge0 = Judge0Client(self.stub.url, pool_size=8)
+        patcher = patch.object(judge_utils, '_judge0_client', self.client_judge0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        judge_utils.check_judge0_availability(forzar=True)
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        for c in caches.all():
+            c.clear()
+
+    def test_tiempo_acotado_por_el_ejercicio_mas_lento(self):
+        ejemplos = [{'entrada': '2', 'salida': '4'}]
+        tareas = [(Ejercicio(id=i, puntaje=10, contenido={'ejemplos': ejemplos}), 'print(int(input()) * 2)', 71)
+                  for i in range(1, 5)]
+
+        inicio = time.monotonic()
+        resultados = calificar_ejercicios(tareas, max_workers=4)
+
+        # En secuencia serían al menos 4 * 0.3s
+        self.assertLess(time.monotonic() - inicio, 0.9)
+        self.assertEqual([r['ejercicio_id'] for r in resultados], [1, 2, 3, 4])
+        self.assertTrue(all(r['es_correcto'] for r in resultados))
+
+
+class RedisEnMemoria:
+    """Lo justo de redis-py (decode_responses=True) para GradingJobQueue; las claves no expiran"""
+
+    def __init__(self):
+        self.datos = {}
+
+    def set(self, clave, valor, ex=None):
+        self.datos[clave] = valor
+
+    def get(self, clave):
+        return self.datos.get(clave)
+
+    def exists(self, clave):
+        return int(clave in self.datos)
+
+    def delete(self, clave):
+        self.datos.pop(clave, None)
+
+    def rpush(self, clave, valor):
+        self.datos.setdefault(clave, []).append(valor)
+        return len(self.datos[clave])
+
+    def llen(self, clave):
+        return len(self.datos.get(clave, []))
+
+    def lmove(self, origen, destino, lado_origen, lado_destino):
+        lista = self.datos.get(origen)
+        if not lista:
+            return None
+        valor = lista.pop(0 if lado_origen == 'LEFT' else -1)
+        destino_lista = self.datos.setdefault(destino, [])
+        destino_lista.insert(0 if lado_destino == 'LEFT' else len(destino_lista), valor)
+        return valor
+
+    def blmove(self, origen, destino, timeout, lado_origen, lado_destino):
+        return self.lmove(origen, destino, lado_origen, lado_destino)
+
+    def lrem(self, clave, cuenta, valor):
+        if valor in self.datos.get(clave, []):
+            self.datos[clave].remove(valor)
+
+    def sadd(self, clave, valor):
+        self.datos.setdefault(clave, set()).add(valor)
+
+    def srem(self, clave, valor):
+        self.datos.get(clave, set()).discard(valor)
+
+    def smembers(self, clave):
+        return set(self.datos.get(clave, set()))
+
+    def scard(self, clave):
+        return len(self.datos.get(clave, set()))
+
+    def hincrby(self, clave, campo, valor):
+        hash_ = self.datos.setdefault(clave, {})
+        hash_[str(campo)] = int(hash_.get(str(campo), 0)) + valor
+        return hash_[str(campo)]
+
+    def hget(self, clave, campo):
+        return self.datos.get(clave, {}).get(str(campo))
+
+    def hgetall(self, clave):
+        return dict(self.datos.get(clave, {}))
+
+    def pipeline(self):
+        return PipelineEnMemoria(self)
+
+
+class PipelineEnMemoria:
+    def __init__(self, redis):
+        self.redis = redis
+        self.llamadas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, nombre):
+        return lambda *args, **kwargs: self.llamadas.append((nombre, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, nombre)(*args, **kwargs) for nombre, args, kwargs in self.llamadas]
+
+
+class RecuperarPendientesTestCase(SimpleTestCase):
+    def test_solo_reencola_los_jobs_de_workers_caidos(self):
+        redis = RedisEnMemoria()
+        vivo = grading_jobs.GradingJobQueue(redis, worker_id='vivo')
+        caido = grading_jobs.GradingJobQueue(redis, worker_id='caido')
+        for worker in (vivo, caido):
+            worker.renovar_lease()
+        for i in range(3):
+            vivo.encolar({'id': f'job{i}', 'evaluacion_id': 1})
+
+        self.assertEqual(vivo.tomar()['id'], 'job0')
+        self.assertEqual(caido.tomar()['id'], 'job1')
+
+        # Un worker que arranca mientras los dos siguen vivos no reencola nada
+        nuevo = grading_jobs.GradingJobQueue(redis, worker_id='nuevo')
+        self.assertEqual(nuevo.recuperar_pendientes(), 0)
+
+        redis.delete(caido._lease('caido'))
+        self.assertEqual(nuevo.recuperar_pendientes(), 1)
+        self.assertEqual(redis.datos['grading:cola'], ['job1', 'job2'])
+        self.assertEqual(redis.datos[vivo.procesando], ['job0'])
+        self.assertEqual(redis.smembers('grading:workers'), {'vivo'})
+        self.assertEqual(vivo.estado_evaluacion(1)['en_curso'], 1)
+
+        # Baja ordenada: lo que tenía en curso vuelve a la cola
+        self.assertEqual(vivo.retirar(), 1)
+        self.assertEqual(redis.datos['grading:cola'], ['job0', 'job1', 'job2'])
+        self.assertEqual(vivo.estado_evaluacion(1)['en_cola'], 3)
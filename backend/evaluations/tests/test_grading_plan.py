@@ -0,0 +1,77 @@
+# curiosmaze_backend/evaluations/tests/test_grading_plan.py
+
+import json
+import subprocess
+import sys
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from evaluations import grading_plan, judge_utils
+from evaluations.grading_plan import obtener_plan
+from evaluations.models import Ejercicio
+from evaluations.views import calificar_codigo
+
+
+def ejecutar_python_local(codigo, **kwargs):
+    proceso = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, timeout=10)
+    return {'success': proceso.returncode == 0, 'stdout': proceso.stdout, 'stderr': proceso.stderr,
+            'status': {'id': 3 if proceso.returncode == 0 else 11}}
+
+
+class GradingPlanTestCase(TestCase):
+    def setUp(self):
+        for c in caches.all():
+            c.clear()
+        grading_plan._planes.clear()
+
+    def tearDown(self):
+        for c in caches.all():
+            c.clear()
+        grading_plan._planes.clear()
+
+    def _ejercicio(self, **campos):
+        return Ejercicio.objects.create(titulo='Doble', descripcion='Doble', tipo='practico', puntaje=10, **campos)
+
+    def test_plan_se_construye_al_guardar(self):
+        ejercicio = self._ejercicio(contenido=json.dumps({'ejemplos': [{'entrada': '2', 'salida': '4\n'}]}))
+
+        with patch.object(grading_plan, 'construir_plan') as mock_construir:
+            plan = obtener_plan(Ejercicio.objects.get(id=ejercicio.id))
+        mock_construir.assert_not_called()
+
+        self.assertEqual(plan['modo'], 'ejemplos')
+        self.assertEqual(plan['ejemplos'], [{'entrada': '2', 'salida': '4'}])
+        self.assertEqual(plan['version'], grading_plan.PLAN_VERSION)
+
+    def test_plan_de_filas_antiguas_y_cambios_en_el_ejercicio(self):
+        ejercicio = self._ejercicio(contenido={'ejemplos': [{'entrada': '2', 'salida': '4'}]})
+        for c in caches.all():
+            c.clear()
+        grading_plan._planes.clear()
+
+        self.assertEqual(obtener_plan(ejercicio)['ejemplos'][0]['salida'], '4')
+
+        # Un cambio hecho sin save() (p. ej. queryset.update) también invalida el plan
+        Ejercicio.objects.filter(id=ejercicio.id).update(contenido={'ejemplos': [{'entrada': '2', 'salida': '5'}]})
+        self.assertEqual(obtener_plan(Ejercicio.objects.get(id=ejercicio.id))['ejemplos'][0]['salida'], '5')
+
+    def test_tests_compilados_por_lenguaje(self):
+        ejercicio = self._ejercicio(tests_avanzados={
+            '71': "ejecutar_tests_avanzados(doble, [(1, 2), (2, 4)])",
+            '63': "ejecutarTestsAvanzados(doble, [[1, 2]])",
+        })
+
+        plan = obtener_plan(ejercicio)
+
+        self.assertEqual(plan['modo'], 'tests')
+        self.assertTrue(plan['tests']['71']['estructurado'])
+        self.assertIn('function ejecutarTestsAvanzados', ''.join(plan['tests']['63']['partes']))
+
+        with patch.object(judge_utils, 'ejecutar_codigo', ejecutar_python_local):
+            resultado = calificar_codigo("def doble(x):\n    return x * 2", ejercicio)
+
+        self.assertTrue(resultado['es_correcto'])
+        self.assertEqual(resultado['casos_correctos'], 2)
+        self.assertEqual(resultado['puntaje_obtenido'], 10)
@@ -0,0 +1,198 @@
+# curiosmaze_backend/evaluations/tests/test_historial_store.py
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from evaluations.historial_store import (con_respuestas, detalles_completos, guardar_respuestas,
+                                         pagina_historial, purgar_huerfanos, separar_detalles)
+from evaluations.models import (CodigoHistorial, Curso, Ejercicio, EstudianteEvaluacion, Evaluacion,
+                                EvaluacionEjercicio, HistorialEvaluacion, HistorialRespuesta,
+                                RespuestaEjercicio, SnapshotEjercicio)
+from evaluations.views import guardar_evaluacion_en_historial
+from users.models import UserProfile
+
+User = get_user_model()
+
+CONTENIDO = {
+    'ejemplos': [{'entrada': '2', 'salida': '4'}],
+    'tests_avanzados': 'assert doble(3) == 6',
+    'templates_por_lenguaje': {'71': '# tu código'},
+}
+
+
+def detalles_anteriores(codigo, puntaje_obtenido):
+    """`detalles` tal como los guardaba guardar_evaluacion_en_historial antes"""
+    comun = {
+        'es_correcta': puntaje_obtenido > 0,
+        'puntaje_obtenido': puntaje_obtenido,
+        'puntaje_maximo': 10.0,
+        'codigo': codigo,
+        'resultados': [{'entrada': '2', 'salida_obtenida': '4'}],
+        'stderr': '',
+        'language_id': 71,
+    }
+    return {
+        'respuestas': [{
+            'ejercicio_id': 7, 'ejercicio_titulo': 'Doble', 'ejercicio_descripcion': 'Imprime el doble',
+            'fecha_respuesta': '2025-06-01T10:00:00+00:00', **comun,
+        }],
+        'ejercicios': [{
+            'id': 7, 'titulo': 'Doble', 'descripcion': 'Imprime el doble', 'puntaje': 10.0,
+            'dificultad': 'facil', 'contenido': CONTENIDO, 'template': codigo, **comun,
+        }],
+        'estadisticas': {'total_ejercicios': 1},
+        'evaluacion': {'titulo': 'Parcial'},
+    }
+
+
+class SepararDetallesTestCase(SimpleTestCase):
+    def test_deja_solo_estadisticas_y_evaluacion(self):
+        compactos, entradas = separar_detalles(detalles_anteriores('print(1)', 10.0))
+
+        self.assertEqual(compactos, {'estadisticas': {'total_ejercicios': 1}, 'evaluacion': {'titulo': 'Parcial'}})
+        self.assertEqual(len(entradas), 1)
+        self.assertEqual(entradas[0]['snapshot']['contenido'], CONTENIDO)
+        self.assertEqual(entradas[0]['codigo'], 'print(1)')
+
+    def test_ejercicio_sin_respuesta_no_se_pierde(self):
+        detalles = detalles_anteriores('print(1)', 10.0)
+        detalles['respuestas'] = []
+
+        _, entradas = separar_detalles(detalles)
+
+        self.assertEqual([e['snapshot']['id'] for e in entradas], [7])
+        self.assertEqual(entradas[0]['puntaje_maximo'], 10.0)
+
+
+class HistorialNormalizadoTestCase(TestCase):
+    def setUp(self):
+        self.docente = User.objects.create_user(
+            username='docente_hist', email='docente_hist@test.com', password='testpass123'
+        )
+        UserProfile.objects.create(user=self.docente, rol='docente', nombres='Docente',
+                                   apellidos='Hist', identificacion='hist001')
+        self.estudiantes = []
+        for i in range(2):
+            estudiante = User.objects.create_user(
+                username=f'estudiante_hist{i}', email=f'estudiante_hist{i}@test.com', password='testpass123'
+            )
+            UserProfile.objects.create(user=estudiante, rol='estudiante', nombres='Estudiante',
+                                       apellidos=f'Hist{i}', identificacion=f'hist1{i}')
+            self.estudiantes.append(estudiante)
+
+        curso = Curso.objects.create(nombre='Curso', docente=self.docente)
+        self.evaluacion = Evaluacion.objects.create(
+            titulo='Parcial', curso=curso, fecha_inicio=timezone.now(),
+            estado='activa', creador=self.docente, codigo_acceso='HIS001'
+        )
+        self.ejercicio = Ejercicio.objects.create(
+            titulo='Doble', descripcion='Imprime el doble', tipo='practico', puntaje=10,
+            creador=self.docente, contenido=CONTENIDO
+        )
+        EvaluacionEjercicio.objects.create(evaluacion=self.evaluacion, ejercicio=self.ejercicio, orden=0)
+
+    def _finalizar(self, estudiante, codigo):
+        participacion = EstudianteEvaluacion.objects.create(
+            estudiante=estudiante, evaluacion=self.evaluacion, estado='finalizado',
+            fecha_inicio=timezone.now(), fecha_fin=timezone.now()
+        )
+        RespuestaEjercicio.objects.create(
+            estudiante_evaluacion=participacion, ejercicio=self.ejercicio, es_correcta=True,
+            puntaje_obtenido=10, respuesta={'codigo': codigo, 'resultados': [{'salida_obtenida': '4'}]}
+        )
+        return guardar_evaluacion_en_historial(participacion)
+
+    def test_ejercicio_y_codigo_se_comparten_entre_estudiantes(self):
+        primero = self._finalizar(self.estudiantes[0], 'print(int(input()) * 2)')
+        segundo = self._finalizar(self.estudiantes[1], 'print(int(input()) * 2)')
+
+        self.assertEqual(HistorialRespuesta.objects.count(), 2)
+        self.assertEqual(SnapshotEjercicio.objects.count(), 1)
+        self.assertEqual(CodigoHistorial.objects.count(), 1)
+        self.assertNotIn('ejercicios', primero.detalles)
+        self.assertNotIn('respuestas', segundo.detalles)
+
+    def test_la_vista_devuelve_el_formato_anterior(self):
+        historial = self._finalizar(self.estudiantes[0], 'print(int(input()) * 2)')
+        api = APIClient()
+        api.force_authenticate(user=self.estudiantes[0])
+
+        response = api.get(f'/api/historial/{historial.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        ejercicio = response.data['evaluacion']['ejercicios'][0]
+        self.assertEqual(ejercicio['codigo'], 'print(int(input()) * 2)')
+        self.assertEqual(ejercicio['tests_avanzados'], CONTENIDO['tests_avanzados'])
+
+    def test_migrar_detalles_anteriores_ida_y_vuelta(self):
+        anteriores = [detalles_anteriores('print(1)', 10.0), detalles_anteriores('print(2)', 0.0)]
+        historiales = []
+        for i, detalles in enumerate(anteriores):
+            compactos, entradas = separar_detalles(detalles)
+            historial = HistorialEvaluacion.objects.create(estudiante_id=i, evaluacion_id=1, detalles=compactos)
+            historiales.append((historial.id, entradas))
+
+        guardar_respuestas(historiales)
+
+        recuperados = [detalles_completos(h) for h in con_respuestas(HistorialEvaluacion.objects.order_by('estudiante_id'))]
+        for original, recuperado in zip(anteriores, recuperados):
+            self.assertEqual(recuperado['respuestas'][0]['codigo'], original['respuestas'][0]['codigo'])
+            self.assertEqual(recuperado['respuestas'][0]['puntaje_obtenido'], original['respuestas'][0]['puntaje_obtenido'])
+            self.assertEqual(recuperado['ejercicios'][0]['contenido'], CONTENIDO)
+            self.assertEqual(recuperado['estadisticas'], original['estadisticas'])
+        self.assertEqual(SnapshotEjercicio.objects.count(), 1)
+
+        HistorialEvaluacion.objects.filter(estudiante_id=1).delete()
+        self.assertEqual(purgar_huerfanos(), (0, 1))
+
+
+class HistorialPaginadoTestCase(TestCase):
+    def setUp(self):
+        self.estudiante = User.objects.create_user(
+            username='estudiante_pag', email='estudiante_pag@test.com', password='testpass123'
+        )
+        respuestas = []
+        for i in range(5):
+            compactos, entradas = separar_detalles(detalles_anteriores(f'print({i})', 10.0))
+            historial = HistorialEvaluacion.objects.create(
+                estudiante_id=self.estudiante.id, evaluacion_id=i + 1, evaluacion_titulo=f'Parcial {i}',
+                evaluacion_puntaje_total=10, puntaje_total=10, detalles=compactos
+            )
+            respuestas.append((historial.id, entradas))
+        guardar_respuestas(respuestas)
+        # Dos historiales con la misma fecha: el id desempata
+        HistorialEvaluacion.objects.filter(evaluacion_id__in=[2, 3]).update(
+            fecha_almacenamiento=HistorialEvaluacion.objects.get(evaluacion_id=2).fecha_almacenamiento
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.estudiante)
+
+    def test_las_paginas_recorren_todo_sin_repetir(self):
+        vistos = []
+        params = {'limite': 2}
+        while True:
+            response = self.api.get('/api/historial-evaluaciones/', params)
+            self.assertEqual(response.status_code, 200)
+            vistos.extend(h['id'] for h in response.data['historial'])
+            if not response.data['hay_mas']:
+                break
+            params['cursor'] = response.data['siguiente_cursor']
+
+        esperados = list(HistorialEvaluacion.objects.order_by('-fecha_almacenamiento', '-id').values_list('id', flat=True))
+        self.assertEqual(vistos, esperados)
+
+    def test_resumen_sin_codigo_ni_resultados(self):
+        with self.assertNumQueries(2):
+            filas, _ = pagina_historial(self.estudiante.id, limite=5)
+
+        respuesta = filas[0]['respuestas'][0]
+        self.assertEqual((respuesta['ejercicio_id'], respuesta['ejercicio_titulo']), (7, 'Doble'))
+        self.assertNotIn('codigo', respuesta)
+        self.assertNotIn('resultados', respuesta)
+
+    def test_cursor_invalido(self):
+        response = self.api.get('/api/historial-evaluaciones/', {'cursor': 'no-es-un-cursor'})
+
+        self.assertEqual(response.status_code, 400)
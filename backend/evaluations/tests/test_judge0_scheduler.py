@@ -0,0 +1,99 @@
+# curiosmaze_backend/evaluations/tests/test_judge0_scheduler.py
+
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from evaluations import judge0_scheduler, views
+from evaluations.judge0_scheduler import Judge0Scheduler, prioridad_judge0
+
+
+class Judge0SchedulerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = Judge0Scheduler(max_concurrentes=1)
+        self.orden = []
+        self.hilos = []
+
+    def _en_cola(self):
+        return sum(c['en_cola'] for c in self.scheduler.estadisticas()['clases'].values())
+
+    def _encolar(self, clase, estudiante, etiqueta):
+        esperadas = self._en_cola() + 1
+
+        def pedir():
+            with prioridad_judge0(clase, estudiante):
+                with self.scheduler.turno():
+                    self.orden.append(etiqueta)
+
+        hilo = threading.Thread(target=pedir)
+        hilo.start()
+        self.hilos.append(hilo)
+        while self._en_cola() < esperadas:
+            time.sleep(0.001)
+
+    def _atender_todo(self):
+        for hilo in self.hilos:
+            hilo.join(5)
+
+    def test_prioridad_y_reparto_entre_estudiantes(self):
+        with self.scheduler.turno():
+            self._encolar('test', 1, 'test-1')
+            self._encolar('final', 1, 'final-1a')
+            self._encolar('final', 1, 'final-1b')
+            self._encolar('final', 1, 'final-1c')
+            self._encolar('submit', 2, 'submit-2')
+            self._encolar('final', 2, 'final-2')
+            self._encolar('final', 3, 'final-3')
+
+            estadisticas = self.scheduler.estadisticas()
+            self.assertEqual(estadisticas['en_curso'], 1)
+            self.assertEqual(estadisticas['clases']['final']['en_cola'], 5)
+            self.assertEqual(estadisticas['clases']['final']['estudiantes_en_cola'], 3)
+        self._atender_todo()
+
+        self.assertEqual(self.orden, [
+            'final-1a', 'final-2', 'final-3', 'final-1b', 'final-1c', 'submit-2', 'test-1'
+        ])
+        estadisticas = self.scheduler.estadisticas()
+        self.assertEqual(estadisticas['en_curso'], 0)
+        self.assertEqual(estadisticas['clases']['final']['atendidas'], 5)
+        self.assertGreater(estadisticas['clases']['test']['espera_max_ms'], 0)
+
+    def test_limite_de_concurrencia(self):
+        scheduler = Judge0Scheduler(max_concurrentes=3)
+        en_curso = []
+        maximo = []
+        lock = threading.Lock()
+
+        def ejecutar():
+            with scheduler.turno():
+                with lock:
+                    en_curso.append(1)
+                    maximo.append(len(en_curso))
+                time.sleep(0.01)
+                with lock:
+                    en_curso.pop()
+
+        hilos = [threading.Thread(target=ejecutar) for _ in range(20)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join(5)
+
+        self.assertEqual(max(maximo), 3)
+        self.assertEqual(scheduler.estadisticas()['clases']['submit']['atendidas'], 20)
+
+    def test_calificar_en_paralelo_conserva_la_prioridad(self):
+        vistas = []
+
+        def calificar(codigo, ejercicio, language_id):
+            vistas.append(judge0_scheduler._solicitud.get())
+            return {'ejercicio_id': ejercicio, 'success': True}
+
+        with patch.object(views, 'calificar_codigo', calificar), prioridad_judge0('final', 7):
+            views.calificar_ejercicios([(1, 'a', 71), (2, 'b', 71), (3, 'c', 71)], max_workers=3)
+
+        self.assertEqual(vistas, [('final', 7)] * 3)
+        self.assertEqual(judge0_scheduler._solicitud.get(), ('submit', None))
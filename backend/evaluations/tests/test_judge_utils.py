@@ -0,0 +1,387 @@
+# curiosmaze_backend/evaluations/tests/test_judge_utils.py
+
+import subprocess
+import sys
+import time
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase
+
+from evaluations import judge_utils
+from evaluations.judge_utils import Judge0Client, Judge0HealthMonitor, PollingBackoff
+from evaluations.management.commands._judge0_stub import Judge0Stub
+from evaluations.models import Ejercicio
+
+
+class Judge0ClientTestCase(SimpleTestCase):
+    def setUp(self):
+        self.stub = Judge0Stub().start()
+        self.client_judge0 = Judge0Client(self.stub.url, auth_token='secreto', pool_size=2)
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+
+    def test_reutiliza_conexion_keep_alive(self):
+        """Varias llamadas secuenciales comparten una sola conexión TCP"""
+        for _ in range(10):
+            token = self.client_judge0.post('/submissions', json={'source_code': 'print(1)'}).json()['token']
+            response = self.client_judge0.get(f'/submissions/{token}')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.stub.conexiones, 1)
+
+    def test_envia_token_de_autenticacion(self):
+        self.assertEqual(self.client_judge0.session.headers['X-Auth-Token'], 'secreto')
+
+    def test_ejecutar_codigo_usa_cliente_compartido(self):
+        with patch.object(judge_utils, '_judge0_client', self.client_judge0):
+            resultado = judge_utils.ejecutar_codigo('print(1)', expected_output='1')
+
+        self.assertTrue(resultado['success'])
+        self.assertEqual(resultado['stdout'], '1')
+        self.assertEqual(self.stub.conexiones, 1)
+
+
+class Judge0HealthMonitorTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = Judge0Stub().start()
+        self.client_judge0 = Judge0Client(self.stub.url, max_retries=0)
+        patcher = patch.object(judge_utils, '_judge0_client', self.client_judge0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.monitor = Judge0HealthMonitor(ttl=60, umbral=2, cooldown=60, timeout=1)
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        cache.clear()
+
+    def test_resultado_en_cache_evita_sondas(self):
+        for _ in range(5):
+            disponible, _ = self.monitor.check()
+            self.assertTrue(disponible)
+
+        self.assertEqual(self.stub.conexiones, 1)
+
+    def test_circuito_se_abre_tras_fallos_consecutivos(self):
+        self.stub.stop()
+        disponible, _ = self.monitor.check(forzar=True)
+        self.assertFalse(disponible)
+        self.assertFalse(self.monitor.circuito_abierto())
+
+        self.monitor.check(forzar=True)
+        self.assertTrue(self.monitor.circuito_abierto())
+
+        # Con el circuito abierto no se intenta conectar
+        with patch.object(self.client_judge0, 'get') as mock_get:
+            disponible, mensaje = self.monitor.check(forzar=True)
+        mock_get.assert_not_called()
+        self.assertFalse(disponible)
+        self.assertIn('circuito abierto', mensaje)
+        self.stub = Judge0Stub().start()
+
+    def test_half_open_cierra_el_circuito_si_judge0_responde(self):
+        cache.set(Judge0HealthMonitor.KEY_ABIERTO_HASTA, 1, timeout=60)
+
+        disponible, _ = self.monitor.check()
+
+        self.assertTrue(disponible)
+        self.assertIsNone(cache.get(Judge0HealthMonitor.KEY_ABIERTO_HASTA))
+
+    def test_ejecutar_codigo_falla_rapido_con_circuito_abierto(self):
+        with patch.object(judge_utils, 'judge0_health', self.monitor):
+            self.monitor.registrar_fallo()
+            self.monitor.registrar_fallo()
+            with patch.object(self.client_judge0, 'post') as mock_post:
+                resultado = judge_utils.ejecutar_codigo('print(1)')
+
+        mock_post.assert_not_called()
+        self.assertFalse(resultado['success'])
+        self.assertTrue(resultado['unavailable'])
+
+
+class VerificarEjemplosTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = Judge0Stub().start()
+        self.client_judge0 = Judge0Client(self.stub.url)
+        patcher = patch.object(judge_utils, '_judge0_client', self.client_judge0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        cache.clear()
+
+    def test_todos_los_ejemplos_en_un_solo_batch(self):
+        ejemplos = [{'entrada': str(i), 'salida': str(i * 2)} for i in range(10)]
+
+        resultado = judge_utils.verificar_ejemplos('print(int(input()) * 2)', ejemplos)
+
+        self.assertTrue(resultado['success'])
+        self.assertEqual(resultado['casos_correctos'], 10)
+        self.assertEqual(resultado['total_ejemplos'], 10)
+        self.assertEqual(resultado['porcentaje_exito'], 100)
+        self.assertEqual([r['ejemplo'] for r in resultado['resultados']], list(range(1, 11)))
+        self.assertEqual(self.stub.peticiones('POST', '/submissions/batch'), 1)
+        self.assertEqual(self.stub.peticiones('GET', '/submissions/batch'), 1)
+        self.assertEqual(self.stub.peticiones('POST', '/submissions'), 0)
+
+    def test_mas_ejemplos_que_el_limite_de_batch(self):
+        ejemplos = [{'entrada': str(i), 'salida': str(i * 2)} for i in range(25)]
+
+        resultado = judge_utils.verificar_ejemplos('print(int(input()) * 2)', ejemplos)
+
+        self.assertEqual(resultado['casos_correctos'], 25)
+        self.assertEqual([r['salida_obtenida'] for r in resultado['resultados']], [str(i * 2) for i in range(25)])
+        self.assertEqual(self.stub.peticiones('POST', '/submissions/batch'), 2)
+        self.assertEqual(self.stub.peticiones('GET', '/submissions/batch'), 2)
+
+    def test_respuesta_que_no_es_json_da_error_por_caso(self):
+        respuesta = Mock(status_code=201, text='<html>', json=Mock(side_effect=ValueError('no es JSON')))
+        with patch.object(self.client_judge0, 'post', return_value=respuesta):
+            resultados = judge_utils.ejecutar_batch('print(1)', [('', '1'), ('', '1')])
+
+        self.assertEqual(len(resultados), 2)
+        self.assertFalse(any(r['success'] for r in resultados))
+        self.assertIn('no es JSON', resultados[0]['error'])
+
+
+class ProcesarBatchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = Judge0Stub().start()
+        self.client_judge0 = Judge0Client(self.stub.url)
+        patcher = patch.object(judge_utils, '_judge0_client', self.client_judge0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        cache.clear()
+
+    def test_metadatos_en_una_consulta(self):
+        ejercicios = [Ejercicio.objects.create(titulo=f'E{i}', descripcion='E', tipo='practico', puntaje=5 * i)
+                      for i in range(1, 6)]
+        enviados = [{'ejercicio_id': ej.id, 'codigo': 'print(1)'} for ej in ejercicios]
+        enviados.append({'ejercicio_id': 999, 'codigo': 'print(1)', 'language_id': 63})
+        judge_utils.check_judge0_availability(forzar=True)
+
+        with self.assertNumQueries(1):
+            resultado = judge_utils.procesar_batch_con_judge0(enviados)
+
+        self.assertTrue(resultado['success'])
+        self.assertEqual([r['puntaje_maximo'] for r in resultado['resultados']], [5, 10, 15, 20, 25, 10])
+        self.assertTrue(all(r['es_correcto'] for r in resultado['resultados']))
+        self.assertIsNone(resultado['resultados'][-1]['version_ejercicio'])
+
+
+class InterpretarResultadoTestCase(SimpleTestCase):
+    def _interpretar(self, status_id, **campos):
+        return judge_utils.interpretar_resultado_judge0({'status': {'id': status_id}, **campos}, 8)
+
+    def test_estados(self):
+        aceptado = self._interpretar(3, stdout='ok\n')
+        incorrecto = self._interpretar(4, stdout='mal\n')
+        compilacion = self._interpretar(6, compile_output='error: ;')
+        ejecucion = self._interpretar(11, stderr='ZeroDivisionError')
+        sin_entrada = self._interpretar(11, stderr='EOFError: EOF when reading a line')
+
+        self.assertEqual((aceptado['es_correcto'], aceptado['puntaje_obtenido'], aceptado['output']), (True, 8, 'ok\n'))
+        self.assertEqual((incorrecto['success'], incorrecto['puntaje_obtenido']), (True, 0))
+        self.assertEqual((compilacion['success'], compilacion['stderr']), (False, 'error: ;'))
+        self.assertEqual((ejecucion['success'], ejecucion['output']), (False, 'Error de ejecución'))
+        self.assertEqual((sin_entrada['es_correcto'], sin_entrada['porcentaje']), (True, 100))
+        self.assertEqual(self._interpretar(None)['puntaje_maximo'], 8)
+
+
+class PollingBackoffTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = Judge0Stub(tiempo_ejecucion=0.05).start()
+        self.client_judge0 = Judge0Client(self.stub.url)
+        patcher = patch.object(judge_utils, '_judge0_client', self.client_judge0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # La sonda de disponibilidad no cuenta como consulta de resultados
+        judge_utils.check_judge0_availability(forzar=True)
+        self.stub.reset_conexiones()
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        cache.clear()
+
+    def test_esperas_crecen_hasta_el_tope(self):
+        polling = PollingBackoff(initial_delay=0.1, multiplier=2, max_delay=0.5, deadline=60)
+        with patch.object(judge_utils.time, 'sleep') as mock_sleep:
+            for attempt in polling:
+                if attempt == 5:
+                    break
+
+        esperas = [llamada.args[0] for llamada in mock_sleep.call_args_list]
+        self.assertEqual(esperas, [0.1, 0.2, 0.4, 0.5, 0.5, 0.5])
+
+    def test_se_detiene_al_agotar_el_plazo(self):
+        inicio = time.monotonic()
+        intentos = list(PollingBackoff(initial_delay=0.01, max_delay=0.05, deadline=0.2))
+
+        self.assertLess(time.monotonic() - inicio, 0.3)
+        self.assertGreater(len(intentos), 3)
+
+    def test_ejecucion_rapida_no_espera_un_segundo(self):
+        token = self.client_judge0.post('/submissions', json={'expected_output': 'ok'}).json()['token']
+
+        inicio = time.monotonic()
+        resultado = judge_utils.wait_for_result(token)
+
+        self.assertLess(time.monotonic() - inicio, 0.5)
+        self.assertEqual(resultado['status']['id'], 3)
+
+    def test_codigo_pequeno_usa_wait_true(self):
+        resultado = judge_utils.ejecutar_codigo('print(1)', expected_output='1')
+
+        self.assertTrue(resultado['success'])
+        self.assertEqual(self.stub.peticiones('POST', '/submissions'), 1)
+        self.assertEqual(self.stub.peticiones('GET'), 0)
+
+    def test_codigo_grande_usa_polling(self):
+        codigo = 'x = 1\n' * (judge_utils.JUDGE0_WAIT_MAX_SOURCE // 6 + 1)
+
+        resultado = judge_utils.ejecutar_codigo(codigo, expected_output='1')
+
+        self.assertTrue(resultado['success'])
+        self.assertGreaterEqual(self.stub.peticiones('GET'), 1)
+
+
+class Judge0CallbackTestCase(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = Judge0Stub(tiempo_ejecucion=0.1).start()
+        self.client_judge0 = Judge0Client(self.stub.url)
+        for atributo, valor in (('_judge0_client', self.client_judge0),
+                                ('JUDGE0_CALLBACK_URL', f'{self.live_server_url}/api/judge0/callback/'),
+                                ('JUDGE0_CALLBACK_SECRET', 'secreto')):
+            patcher = patch.object(judge_utils, atributo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # La sonda de disponibilidad no cuenta como consulta de resultados
+        judge_utils.check_judge0_availability(forzar=True)
+        self.stub.reset_conexiones()
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        cache.clear()
+
+    def test_batch_espera_callbacks_sin_consultar_a_judge0(self):
+        ejemplos = [{'entrada': str(i), 'salida': str(i * 2)} for i in range(5)]
+
+        resultado = judge_utils.verificar_ejemplos('print(int(input()) * 2)', ejemplos)
+
+        self.assertEqual(resultado['casos_correctos'], 5)
+        self.assertEqual(self.stub.peticiones('GET', '/submissions/batch'), 0)
+
+    def test_wait_for_result_usa_el_callback(self):
+        codigo = 'x = 1\n' * (judge_utils.JUDGE0_WAIT_MAX_SOURCE // 6 + 1)
+
+        resultado = judge_utils.ejecutar_codigo(codigo, expected_output='ok')
+
+        self.assertTrue(resultado['success'])
+        self.assertEqual(resultado['stdout'], 'ok')
+        self.assertEqual(self.stub.peticiones('GET'), 0)
+
+    def test_callback_con_secreto_invalido(self):
+        response = self.client.put('/api/judge0/callback/?secret=otro',
+                                   data={'token': 'abc'}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertIsNone(cache.get(f'{judge_utils.Judge0ResultStore.PREFIJO}abc'))
+
+    def test_sin_secreto_configurado_no_hay_callbacks(self):
+        with patch.object(judge_utils, 'JUDGE0_CALLBACK_SECRET', ''):
+            self.assertIsNone(judge_utils.judge0_callback_url())
+            for url in ('/api/judge0/callback/', '/api/judge0/callback/?secret='):
+                response = self.client.put(url, data={'token': 'abc', 'status': {'id': 3}},
+                                           content_type='application/json')
+                self.assertEqual(response.status_code, 403)
+
+        self.assertIsNone(cache.get(f'{judge_utils.Judge0ResultStore.PREFIJO}abc'))
+
+
+def ejecutar_python_local(codigo, **kwargs):
+    """Sustituye a Judge0 ejecutando el programa con el intérprete local"""
+    proceso = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, timeout=10)
+    return {'success': proceso.returncode == 0, 'stdout': proceso.stdout, 'stderr': proceso.stderr,
+            'status': {'id': 3 if proceso.returncode == 0 else 11}}
+
+
+class TestsAvanzadosTestCase(SimpleTestCase):
+    TESTS = "ejecutar_tests_avanzados(doble, [(1, 2), (2, 4), (3, 6)])"
+
+    def _ejecutar(self, codigo):
+        with patch.object(judge_utils, 'ejecutar_codigo', ejecutar_python_local):
+            return judge_utils.ejecutar_tests_avanzados(codigo, self.TESTS)
+
+    def test_resumen_estructurado(self):
+        resultado = self._ejecutar("def doble(x):\n    return x * 2 if x < 3 else 0")
+
+        self.assertEqual(resultado['pruebas_pasadas'], 2)
+        self.assertEqual(resultado['total_pruebas'], 3)
+        self.assertFalse(resultado['es_correcto'])
+        self.assertEqual([estado for estado, _ in resultado['pruebas']], ['ok', 'ok', 'fallo'])
+        self.assertTrue(all(isinstance(ms, float) for _, ms in resultado['pruebas']))
+        self.assertNotIn(judge_utils.MARCA_RESUMEN_TESTS, resultado['output'])
+
+    def test_imprimir_los_marcadores_no_suma_pruebas(self):
+        resultado = self._ejecutar(
+            "print('Resultado: 3/3 pruebas pasadas')\n"
+            "print('✓ CORRECTO ✓ CORRECTO ✓ CORRECTO')\n"
+            "def doble(x):\n    return 0"
+        )
+
+        self.assertEqual(resultado['pruebas_pasadas'], 0)
+        self.assertFalse(resultado['es_correcto'])
+
+    def test_redefinir_print_no_altera_el_resumen(self):
+        resultado = self._ejecutar(
+            "import builtins\n"
+            "def print(*args, **kwargs):\n"
+            "    builtins.print(*(str(a).replace('fallo', 'ok') for a in args), **kwargs)\n"
+            "def doble(x):\n    return 0"
+        )
+
+        self.assertEqual(resultado['pruebas_pasadas'], 0)
+        self.assertEqual([estado for estado, _ in resultado['pruebas']], ['fallo', 'fallo', 'fallo'])
+
+    def test_redefinir_el_registro_no_altera_el_resumen(self):
+        resultado = self._ejecutar(
+            "import __main__\n"
+            "def doble(x):\n"
+            "    __main__._cm_registrar = lambda e, i=None: __main__._cm_pruebas.append(['ok', 0])\n"
+            "    return -1"
+        )
+
+        self.assertEqual(resultado['pruebas_pasadas'], 0)
+        self.assertEqual([estado for estado, _ in resultado['pruebas']], ['fallo', 'fallo', 'fallo'])
+
+    def test_resumen_falsificado_se_descarta(self):
+        marca = f"{judge_utils.MARCA_RESUMEN_TESTS}abc@@"
+        salida = f'hola\n{marca}{{"pruebas":[["ok",1]]}}\n{marca}{{"pruebas":[["ok",1]]}}\n'
+
+        pruebas, _ = judge_utils.parsear_resumen_tests(salida, 'abc')
+
+        self.assertIsNone(pruebas)
+
+    def test_resumen_con_formato_invalido(self):
+        marca = f"{judge_utils.MARCA_RESUMEN_TESTS}abc@@"
+
+        for registro in ('{"pruebas":[["ok"]]}', '{"pruebas":[["quizas",1]]}', '{"otro":[]}', 'no es json'):
+            pruebas, salida = judge_utils.parsear_resumen_tests(f"hola\n{marca}{registro}\n", 'abc')
+            self.assertIsNone(pruebas)
+            self.assertEqual(salida, 'hola')
@@ -0,0 +1,119 @@
+# curiosmaze_backend/evaluations/tests/test_monitor.py
+
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from evaluations import monitor
+from evaluations.models import Curso, EstudianteEvaluacion, Evaluacion
+from users.models import UserProfile
+
+User = get_user_model()
+
+
+def _evento(chunk):
+    """(tipo, datos) de un evento SSE"""
+    if isinstance(chunk, bytes):
+        chunk = chunk.decode()
+    lineas = dict(linea.split(': ', 1) for linea in chunk.strip().split('\n'))
+    return lineas['event'], json.loads(lineas['data'])
+
+
+class BusLocalTestCase(SimpleTestCase):
+    def test_publicar_llega_solo_a_los_suscriptores_de_la_evaluacion(self):
+        bus = monitor.BusLocal(tamano_cola=2)
+        suscripcion = bus.suscribir(1)
+        otra = bus.suscribir(2)
+
+        for i in range(3):
+            bus.publicar(1, {'tipo': 'progreso', 'n': i})
+
+        # La cola llena descarta en vez de bloquear al que publica
+        self.assertEqual(suscripcion.siguiente(timeout=0.01)['n'], 0)
+        self.assertEqual(suscripcion.siguiente(timeout=0.01)['n'], 1)
+        self.assertIsNone(suscripcion.siguiente(timeout=0.01))
+        self.assertIsNone(otra.siguiente(timeout=0.01))
+
+        suscripcion.cerrar()
+        otra.cerrar()
+        self.assertEqual(bus._colas, {})
+
+    def test_eventos_sse_envia_ping_y_cierra_la_suscripcion(self):
+        bus = monitor.BusLocal()
+        suscripcion = bus.suscribir(1)
+        bus.publicar(1, {'tipo': 'finalizado', 'participante': {'id': 7}})
+
+        chunks = list(monitor.eventos_sse(suscripcion, [], duracion=0.3, ping=0.1))
+
+        self.assertTrue(chunks[0].startswith('retry: '))
+        self.assertEqual(_evento(chunks[1]), ('snapshot', {'participantes': []}))
+        self.assertEqual(_evento(chunks[2])[1]['participante'], {'id': 7})
+        self.assertIn(': ping\n\n', chunks[3:])
+        self.assertEqual(bus._colas, {})
+
+
+class MonitorParticipantesTestCase(TestCase):
+    def setUp(self):
+        self.docente = User.objects.create_user(
+            username='docente_mon', email='docente_mon@test.com', password='testpass123'
+        )
+        UserProfile.objects.create(user=self.docente, rol='docente', nombres='Docente',
+                                   apellidos='Monitor', identificacion='mon001')
+        self.estudiante = User.objects.create_user(
+            username='estudiante_mon', email='estudiante_mon@test.com', password='testpass123'
+        )
+        UserProfile.objects.create(user=self.estudiante, rol='estudiante', nombres='Ana',
+                                   apellidos='Pérez', identificacion='mon002')
+        curso = Curso.objects.create(nombre='Curso', docente=self.docente)
+        self.evaluacion = Evaluacion.objects.create(
+            titulo='Parcial', curso=curso, fecha_inicio=timezone.now(), estado='activa',
+            creador=self.docente, codigo_acceso='MON001'
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.docente)
+
+    def test_stream_envia_snapshot_y_cambios(self):
+        otro = User.objects.create_user(username='estudiante_mon2', email='estudiante_mon2@test.com',
+                                        password='testpass123')
+        EstudianteEvaluacion.objects.create(estudiante=otro, evaluacion=self.evaluacion, estado='activo',
+                                            fecha_inicio=timezone.now())
+
+        with patch.object(monitor, 'MONITOR_SSE_DURACION', 0.5), patch.object(monitor, 'MONITOR_SSE_PING', 0.5):
+            response = self.api.get(f'/api/evaluaciones/{self.evaluacion.id}/monitor/',
+                                    HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        next(stream)
+        tipo, snapshot = _evento(next(stream))
+        self.assertEqual(tipo, 'snapshot')
+        self.assertEqual([p['estudiante_id'] for p in snapshot['participantes']], [otro.id])
+
+        # Ingreso (señal de la participación nueva) y expulsión por el docente
+        with self.captureOnCommitCallbacks(execute=True):
+            EstudianteEvaluacion.objects.create(estudiante=self.estudiante, evaluacion=self.evaluacion,
+                                                estado='activo', fecha_inicio=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.api.post(f'/api/evaluaciones/{self.evaluacion.id}/expulsar-estudiante/',
+                                      {'estudiante_id': self.estudiante.id}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+
+        tipo, ingreso = _evento(next(stream))
+        self.assertEqual(tipo, 'ingreso')
+        self.assertEqual(ingreso['participante']['estudiante_nombre'], 'Ana Pérez')
+        tipo, expulsion = _evento(next(stream))
+        self.assertEqual(tipo, 'expulsado')
+        self.assertEqual(expulsion['participante']['estado'], 'expulsado')
+        # Al cumplirse MONITOR_SSE_DURACION el stream termina
+        list(stream)
+
+    def test_estudiante_no_puede_abrir_el_monitor(self):
+        api = APIClient()
+        api.force_authenticate(user=self.estudiante)
+        response = api.get(f'/api/evaluaciones/{self.evaluacion.id}/monitor/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(json.loads(response.content)['success'])
@@ -0,0 +1,111 @@
+# curiosmaze_backend/evaluations/tests/test_rate_limit.py
+
+import concurrent.futures
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from middleware import JudgeRateLimitMiddleware, VentanaDeslizante
+from users.models import UserProfile
+
+User = get_user_model()
+
+LIMITES = {
+    '/api/submit-codigo/': {'default': (10, 60), 'docente': (50, 60), 'admin': None},
+}
+
+
+@override_settings(JUDGE_RATE_LIMITS=LIMITES)
+class JudgeRateLimitTestCase(TestCase):
+    def setUp(self):
+        caches['ratelimit'].clear()
+        self.factory = RequestFactory()
+        self.middleware = JudgeRateLimitMiddleware(lambda request: HttpResponse('ok'))
+
+    def tearDown(self):
+        caches['ratelimit'].clear()
+
+    def _enviar(self, rol='estudiante', user_id=1, ruta='/api/submit-codigo/'):
+        request = self.factory.post(ruta)
+        request.user = SimpleNamespace(is_authenticated=True, id=user_id, profile=SimpleNamespace(rol=rol))
+        return self.middleware(request)
+
+    def test_sin_exceso_con_100_solicitudes_en_paralelo(self):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=100) as executor:
+            respuestas = list(executor.map(lambda _: self._enviar(), range(100)))
+
+        codigos = [r.status_code for r in respuestas]
+        self.assertEqual(codigos.count(200), 10)
+        self.assertEqual(codigos.count(429), 90)
+        rechazada = next(r for r in respuestas if r.status_code == 429)
+        self.assertGreaterEqual(int(rechazada['Retry-After']), 1)
+        self.assertLessEqual(int(rechazada['Retry-After']), 120)
+        # Otro estudiante tiene su propio límite
+        self.assertEqual(self._enviar(user_id=2).status_code, 200)
+
+    def test_limites_por_rol_y_ruta(self):
+        self.assertEqual([self._enviar('docente').status_code for _ in range(51)].count(429), 1)
+        self.assertTrue(all(self._enviar('admin', user_id=3).status_code == 200 for _ in range(100)))
+        self.assertTrue(all(self._enviar(ruta='/api/test-codigo/').status_code == 200 for _ in range(20)))
+
+    @override_settings(JUDGE_RATE_LIMITS={'/api/submit-codigo/': {'default': (0, 60)}})
+    def test_limite_cero_no_deja_pasar_a_nadie(self):
+        self.middleware = JudgeRateLimitMiddleware(lambda request: HttpResponse('ok'))
+        respuesta = self._enviar()
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertEqual(respuesta['Retry-After'], '60')
+
+    def test_identifica_al_usuario_por_el_token_jwt(self):
+        user = User.objects.create_user(username='docente_rl', email='rl@test.com', password='testpass123')
+        UserProfile.objects.create(user=user, rol='docente', nombres='Docente', apellidos='RL',
+                                   identificacion='rl123')
+        token = str(RefreshToken.for_user(user).access_token)
+
+        codigos = []
+        for _ in range(12):
+            request = self.factory.post('/api/submit-codigo/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            codigos.append(self.middleware(request).status_code)
+
+        # Con el límite de docente, no el de un anónimo
+        self.assertEqual(codigos, [200] * 12)
+
+    def test_el_rol_del_token_se_consulta_una_vez(self):
+        user = User.objects.create_user(username='docente_rl2', email='rl2@test.com', password='testpass123')
+        UserProfile.objects.create(user=user, rol='docente', nombres='Docente', apellidos='RL',
+                                   identificacion='rl456')
+        token = str(RefreshToken.for_user(user).access_token)
+
+        def enviar():
+            request = self.factory.post('/api/submit-codigo/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            return self.middleware(request).status_code
+
+        with self.assertNumQueries(1):
+            self.assertEqual(enviar(), 200)
+        with self.assertNumQueries(0):
+            self.assertEqual([enviar() for _ in range(11)], [200] * 11)
+
+
+class VentanaDeslizanteTestCase(TestCase):
+    def setUp(self):
+        caches['ratelimit'].clear()
+        self.ventana = VentanaDeslizante(caches['ratelimit'])
+
+    def test_la_ventana_anterior_pesa_segun_el_tiempo_transcurrido(self):
+        for _ in range(10):
+            self.assertTrue(self.ventana.consumir('u1', 10, 60, ahora=6000 + 30)[0])
+        self.assertEqual(self.ventana.consumir('u1', 10, 60, ahora=6000 + 59), (False, 7))
+
+        # A mitad de la siguiente ventana la anterior cuenta como 5
+        permitidas = [self.ventana.consumir('u1', 10, 60, ahora=6060 + 30)[0] for _ in range(6)]
+        self.assertEqual(permitidas, [True] * 5 + [False])
+        # Las rechazadas no cuentan: basta esperar a que la anterior pese menos
+        self.assertEqual(self.ventana.consumir('u1', 10, 60, ahora=6060 + 30), (False, 6))
+        self.assertTrue(self.ventana.consumir('u1', 10, 60, ahora=6060 + 36)[0])
+
+    def test_limite_cero_rechaza_con_la_ventana_entera(self):
+        self.assertEqual(self.ventana.consumir('u1', 0, 60, ahora=6000 + 30), (False, 60))
+        self.assertEqual(self.ventana.consumir('u1', 0, 60, ahora=6060 + 59), (False, 60))
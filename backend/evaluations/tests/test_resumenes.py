@@ -0,0 +1,205 @@
+# curiosmaze_backend/evaluations/tests/test_resumenes.py
+
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from evaluations.models import (AjustePuntaje, Curso, Ejercicio, EstudianteEvaluacion, Evaluacion,
+                                EvaluacionEjercicio, RespuestaEjercicio, ResumenEvaluacion, ResumenParticipacion)
+from evaluations import resumenes
+from evaluations.resumenes import recalcular_evaluacion
+from users.models import UserProfile
+
+User = get_user_model()
+
+CAMPOS_AGREGADOS = ('puntaje_maximo', 'total_ejercicios', 'participantes', 'finalizados', 'aprobados',
+                    'suma_puntajes', 'por_ejercicio')
+
+
+class ResumenesTestCase(TestCase):
+    def setUp(self):
+        self.docente = User.objects.create_user(
+            username='docente_res', email='docente_res@test.com', password='testpass123'
+        )
+        UserProfile.objects.create(user=self.docente, rol='docente', nombres='Docente',
+                                   apellidos='Res', identificacion='res001')
+        self.estudiantes = [
+            User.objects.create_user(username=f'estudiante_res{i}', email=f'estudiante_res{i}@test.com',
+                                     password='testpass123')
+            for i in range(3)
+        ]
+        curso = Curso.objects.create(nombre='Curso', docente=self.docente)
+        self.evaluacion = Evaluacion.objects.create(
+            titulo='Parcial', curso=curso, fecha_inicio=timezone.now(), estado='activa',
+            creador=self.docente, codigo_acceso='RES001', puntaje_aprobacion=60
+        )
+        self.ejercicios = []
+        for orden in range(2):
+            ejercicio = Ejercicio.objects.create(titulo=f'Ejercicio {orden}', descripcion='x', tipo='practico',
+                                                 puntaje=10, creador=self.docente)
+            EvaluacionEjercicio.objects.create(evaluacion=self.evaluacion, ejercicio=ejercicio, orden=orden)
+            self.ejercicios.append(ejercicio)
+
+    def _responder(self, estudiante, correctas, finalizar=True):
+        """Participación con una respuesta por ejercicio; `correctas` indica cuáles aciertan"""
+        with self.captureOnCommitCallbacks(execute=True):
+            participacion = EstudianteEvaluacion.objects.create(
+                estudiante=estudiante, evaluacion=self.evaluacion, estado='activo', fecha_inicio=timezone.now()
+            )
+            for ejercicio, correcta in zip(self.ejercicios, correctas):
+                RespuestaEjercicio.objects.create(
+                    estudiante_evaluacion=participacion, ejercicio=ejercicio, respuesta={'codigo': 'print(1)'},
+                    es_correcta=correcta, puntaje_obtenido=10 if correcta else 0
+                )
+            participacion.puntaje = 10 * sum(correctas)
+            if finalizar:
+                participacion.estado = 'finalizado'
+            participacion.save()
+        return participacion
+
+    def _agregados(self):
+        resumen = ResumenEvaluacion.objects.get(evaluacion=self.evaluacion)
+        return {campo: getattr(resumen, campo) for campo in CAMPOS_AGREGADOS}
+
+    def test_agregados_incrementales_igual_que_recalcular(self):
+        self._responder(self.estudiantes[0], [True, True])
+        self._responder(self.estudiantes[1], [True, False])
+        self._responder(self.estudiantes[2], [False, False], finalizar=False)
+
+        incrementales = self._agregados()
+        resumen = ResumenEvaluacion.objects.get(evaluacion=self.evaluacion)
+        self.assertEqual((resumen.participantes, resumen.finalizados, resumen.aprobados), (3, 2, 1))
+        self.assertEqual(resumen.promedio, 15)
+        self.assertEqual(resumen.tasa_aprobacion, 50)
+        self.assertEqual(resumen.por_ejercicio[str(self.ejercicios[1].id)], {'respondidas': 3, 'correctas': 1})
+
+        recalcular_evaluacion(self.evaluacion.id)
+        self.assertEqual(self._agregados(), incrementales)
+
+    def test_ajuste_de_puntaje_y_borrado_de_participacion(self):
+        participacion = self._responder(self.estudiantes[0], [True, False])
+        self._responder(self.estudiantes[1], [True, True])
+        self.assertFalse(ResumenParticipacion.objects.get(participacion=participacion).aprobado)
+
+        api = APIClient()
+        api.force_authenticate(user=self.docente)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = api.post(f'/api/evaluaciones/{self.evaluacion.id}/ajustar-puntaje/', {
+                'estudiante_id': self.estudiantes[0].id, 'ajuste': 4, 'motivo': 'Revisión'
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(AjustePuntaje.objects.exists())
+        self.assertTrue(ResumenParticipacion.objects.get(participacion=participacion).aprobado)
+        self.assertEqual(self._agregados()['aprobados'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            participacion.delete()
+        agregados = self._agregados()
+        self.assertEqual((agregados['participantes'], agregados['finalizados'], agregados['suma_puntajes']), (1, 1, 20))
+        recalcular_evaluacion(self.evaluacion.id)
+        self.assertEqual(self._agregados(), agregados)
+
+    def test_nuevo_ejercicio_cambia_el_maximo(self):
+        self._responder(self.estudiantes[0], [True, True])
+        ejercicio = Ejercicio.objects.create(titulo='Extra', descripcion='x', tipo='practico', puntaje=5,
+                                             creador=self.docente)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            EvaluacionEjercicio.objects.create(evaluacion=self.evaluacion, ejercicio=ejercicio, orden=2)
+
+        self.assertEqual(self._agregados()['puntaje_maximo'], 25)
+        self.assertEqual(ResumenParticipacion.objects.get().puntaje_maximo, 25)
+
+    def test_endpoints_leen_el_resumen(self):
+        self._responder(self.estudiantes[0], [True, False])
+        api = APIClient()
+        api.force_authenticate(user=self.docente)
+
+        resumen = api.get(f'/api/evaluaciones/{self.evaluacion.id}/resumen-resultados/')
+        self.assertEqual(resumen.status_code, 200)
+        self.assertEqual((resumen.data['finalizados'], resumen.data['promedio']), (1, 10))
+        self.assertEqual(resumen.data['por_ejercicio'][str(self.ejercicios[0].id)]['porcentaje_correctas'], 100)
+
+        participantes = api.get(f'/api/evaluaciones/{self.evaluacion.id}/participantes/')
+        self.assertEqual(participantes.data[0]['ejercicios_correctos'], 1)
+        self.assertEqual(participantes.data[0]['puntaje_maximo'], 20)
+
+        estudiante = APIClient()
+        estudiante.force_authenticate(user=self.estudiantes[0])
+        self.assertEqual(estudiante.get(f'/api/evaluaciones/{self.evaluacion.id}/resumen-resultados/').status_code, 403)
+        resultados = estudiante.get(f'/api/evaluaciones/{self.evaluacion.id}/resultados/')
+        self.assertEqual(resultados.data['puntaje_maximo'], 20)
+        self.assertEqual(len(resultados.data['respuestas']), 2)
+
+
+class ResumenesConcurrenciaTestCase(TransactionTestCase):
+    """Las participaciones se guardan en transacciones separadas y el resumen se actualiza al confirmar"""
+
+    def setUp(self):
+        self.docente = User.objects.create_user(
+            username='docente_conc', email='docente_conc@test.com', password='testpass123'
+        )
+        self.estudiantes = [
+            User.objects.create_user(username=f'estudiante_conc{i}', email=f'estudiante_conc{i}@test.com',
+                                     password='testpass123')
+            for i in range(2)
+        ]
+        self.evaluacion = Evaluacion.objects.create(
+            titulo='Parcial', fecha_inicio=timezone.now(), estado='activa', creador=self.docente,
+            codigo_acceso='CONC01'
+        )
+        ejercicio = Ejercicio.objects.create(titulo='Ejercicio', descripcion='x', tipo='practico',
+                                             puntaje=10, creador=self.docente)
+        EvaluacionEjercicio.objects.create(evaluacion=self.evaluacion, ejercicio=ejercicio, orden=0)
+        # Las dos primeras actualizaciones son las que crean la fila
+        ResumenEvaluacion.objects.filter(evaluacion=self.evaluacion).delete()
+
+    def _participar(self, estudiante):
+        with transaction.atomic():
+            EstudianteEvaluacion.objects.create(estudiante=estudiante, evaluacion=self.evaluacion,
+                                                estado='activo', fecha_inicio=timezone.now())
+
+    def _verificar_agregados(self):
+        resumen = ResumenEvaluacion.objects.get(evaluacion=self.evaluacion)
+        agregados = {campo: getattr(resumen, campo) for campo in CAMPOS_AGREGADOS}
+        self.assertEqual(resumen.participantes, 2)
+        self.assertEqual(ResumenParticipacion.objects.filter(evaluacion=self.evaluacion).count(), 2)
+        recalcular_evaluacion(self.evaluacion.id)
+        resumen.refresh_from_db()
+        self.assertEqual({campo: getattr(resumen, campo) for campo in CAMPOS_AGREGADOS}, agregados)
+
+    def test_dos_participaciones_en_transacciones_separadas(self):
+        for estudiante in self.estudiantes:
+            self._participar(estudiante)
+
+        self._verificar_agregados()
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_primeras_actualizaciones_simultaneas_no_cuentan_doble(self):
+        barrera = threading.Barrier(2, timeout=10)
+        original = resumenes._resumen_evaluacion_bloqueado
+
+        def bloqueado(evaluacion_id):
+            # Las dos participaciones ya están confirmadas y ninguna encontró la fila
+            barrera.wait()
+            return original(evaluacion_id)
+
+        def participar(estudiante):
+            try:
+                self._participar(estudiante)
+            finally:
+                connection.close()
+
+        with patch.object(resumenes, '_resumen_evaluacion_bloqueado', bloqueado):
+            hilos = [threading.Thread(target=participar, args=(e,)) for e in self.estudiantes]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+        self._verificar_agregados()
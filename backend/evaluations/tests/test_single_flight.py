@@ -0,0 +1,92 @@
+# curiosmaze_backend/evaluations/tests/test_single_flight.py
+
+import concurrent.futures
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from evaluations import judge_utils, single_flight
+from evaluations.execution_engines import Judge0Engine
+from evaluations.judge_utils import Judge0Client
+from evaluations.management.commands._judge0_stub import Judge0Stub
+from evaluations.single_flight import SingleFlight
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.stub = Judge0Stub(latencia=0.2).start()
+        self.client_judge0 = Judge0Client(self.stub.url)
+        for objetivo, atributo, valor in ((judge_utils, '_judge0_client', self.client_judge0),
+                                          (single_flight, '_single_flight', SingleFlight())):
+            patcher = patch.object(objetivo, atributo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.client_judge0.close()
+        self.stub.stop()
+        cache.clear()
+
+    def _en_paralelo(self, funcion, argumentos):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(argumentos)) as executor:
+            return list(executor.map(lambda args: funcion(*args), argumentos))
+
+    def test_ejecuciones_identicas_simultaneas_se_envian_una_vez(self):
+        motor = Judge0Engine()
+
+        resultados = self._en_paralelo(motor.ejecutar, [('print(input())', 'hola')] * 8)
+
+        self.assertEqual(self.stub.peticiones('POST', '/submissions'), 1)
+        self.assertTrue(all(r['stdout'] == resultados[0]['stdout'] for r in resultados))
+        self.assertIsNot(resultados[0], resultados[1])
+        estadisticas = single_flight.get_single_flight().estadisticas()
+        self.assertEqual(estadisticas['ejecutadas'], 1)
+        self.assertEqual(estadisticas['compartidas'], 7)
+
+        # Pasada la ejecución, un envío igual vuelve a Judge0
+        motor.ejecutar('print(input())', 'hola')
+        self.assertEqual(self.stub.peticiones('POST', '/submissions'), 2)
+
+    def test_entradas_distintas_no_se_comparten(self):
+        motor = Judge0Engine()
+
+        self._en_paralelo(motor.ejecutar_lote, [
+            ('print(input())', [('a', 'a'), ('b', 'b')]),
+            ('print(input())', [('a', 'a'), ('b', 'b')]),
+            ('print(input())', [('a', 'a'), ('c', 'c')]),
+        ])
+
+        self.assertEqual(self.stub.peticiones('POST', '/submissions/batch'), 2)
+
+    def test_fallo_de_la_ejecucion_compartida(self):
+        vuelo = SingleFlight()
+        iniciada = threading.Event()
+        continuar = threading.Event()
+        llamadas = []
+
+        def lider():
+            llamadas.append('lider')
+            iniciada.set()
+            continuar.wait(5)
+            raise RuntimeError('Judge0 falló')
+
+        def seguidor():
+            llamadas.append('seguidor')
+            return {'success': True}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            futuro_lider = executor.submit(vuelo.ejecutar, 'clave', lider)
+            iniciada.wait(5)
+            futuro_seguidor = executor.submit(vuelo.ejecutar, 'clave', seguidor)
+            # El seguidor queda esperando al líder
+            time.sleep(0.1)
+            continuar.set()
+
+        with self.assertRaises(RuntimeError):
+            futuro_lider.result()
+        self.assertEqual(futuro_seguidor.result(), {'success': True})
+        self.assertEqual(llamadas, ['lider', 'seguidor'])
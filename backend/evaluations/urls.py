@@ -21,6 +21,12 @@ urlpatterns = [
     # Endpoints para prueba y envío de código
     path('test-codigo/', views.test_codigo, name='test_codigo'),
     path('submit-codigo/', views.submit_codigo, name='submit_codigo'),
+    
+    # Callback de Judge0 (PUT con el resultado de cada submission)
+    path('judge0/callback/', views.judge0_callback, name='judge0_callback'),
+    
+    # Métricas del planificador de envíos a Judge0
+    path('judge0/planificador/', views.judge0_scheduler_status, name='judge0_scheduler_status'),
     path('evaluaciones/<int:pk>/admin-check/', admin_check_evaluacion, name='admin_check_evaluacion'),
     
     # Endpoint para obtener el estado de la evaluación
@@ -28,6 +34,9 @@ urlpatterns = [
     path('evaluaciones/<int:pk>/resultados/', resultados_evaluacion, name='resultados_evaluacion'),
     
     path('evaluaciones/<int:pk>/participantes/', get_participantes_evaluacion, name='participantes-evaluacion'),
+    path('evaluaciones/<int:pk>/cola-calificacion/', views.cola_calificacion_evaluacion, name='cola-calificacion-evaluacion'),
+    path('evaluaciones/<int:pk>/resumen-resultados/', views.resumen_resultados_evaluacion, name='resumen-resultados-evaluacion'),
+    path('evaluaciones/<int:pk>/monitor/', views.monitor_participantes, name='monitor-participantes'),
     
     path('evaluaciones/<int:pk>/ajustar-puntaje/', views.ajustar_puntaje, name='ajustar-puntaje'),
     path('evaluaciones/<int:pk>/expulsar-estudiante/', views.expulsar_estudiante, name='expulsar-estudiante'),
@@ -35,6 +44,9 @@ urlpatterns = [
     # Nueva ruta para procesamiento en lote
     path('submit-batch/', views.submit_batch, name='submit_batch'),
     
+    # Estado de los jobs de calificación asíncrona
+    path('grading-jobs/<str:job_id>/', views.grading_job_status, name='grading_job_status'),
+    
     # Nueva ruta para obtener el historial de evaluaciones
     path('historial-evaluaciones/', obtener_historial_evaluaciones, name='historial-evaluaciones'),
     path('historial/<int:historial_id>/', obtener_evaluacion_historial, name='evaluacion-historial'),
@@ -1,26 +1,23 @@
 # backend/evaluations/views.py
 import concurrent.futures
+import contextvars
 import json
 import logging
-import os
-import subprocess
-import tempfile
-import threading
 import time
-from functools import lru_cache
-from django.db import models
+from django.db import models, transaction
 
 from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Avg, Count, Q
-from django.http import JsonResponse, Http404
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 
 from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes, renderer_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
 from users.models import User, UserProfile
@@ -33,6 +30,8 @@ from users.permissions import (
     IsOwnerOrDocenteOrAdmin,
 )
 
+from . import monitor
+from .judge0_scheduler import get_judge0_scheduler, prioridad_judge0
 from .models import (
     AjustePuntaje,
     Curso,
@@ -325,75 +324,24 @@ def procesar_ejercicio(codigo, ejercicio_id, evaluacion_id, estudiante_evaluacio
                     entrada = ejemplo.get('entrada', '')
                     salida_esperada = ejemplo.get('salida', '').strip()
                     
-                    # Ejecutar realmente el código
-                    try:
-                        import tempfile
-                        import subprocess
-                        
-                        # Crear archivo con el código
-                        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as f:
-                            f.write(codigo.encode('utf-8'))
-                            temp_file = f.name
-                        
-                        # Crear archivo con la entrada
-                        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
-                            f.write(entrada.encode('utf-8'))
-                            input_file = f.name
-                        
-                        # Ejecutar el código con la entrada
-                        process = subprocess.run(
-                            ['python', temp_file],
-                            stdin=open(input_file, 'r'),
-                            capture_output=True,
-                            text=True,
-                            timeout=5
-                        )
-                        
-                        # Verificar si la salida coincide con la esperada
-                        salida_obtenida = process.stdout.strip()
-                        
-                        # Registrar esta salida para diagnóstico
-                        output_total.append({
-                            'input': entrada,
-                            'expected': salida_esperada,
-                            'actual': salida_obtenida,
-                            'correct': salida_obtenida == salida_esperada,
-                            'stderr': process.stderr
-                        })
-                        
-                        if salida_obtenida == salida_esperada:
-                            casos_correctos += 1
-                        
-                        # Limpiar archivos temporales
-                        import os
-                        try:
-                            os.unlink(temp_file)
-                            os.unlink(input_file)
-                        except:
-                            pass
-                            
-                    except subprocess.TimeoutExpired:
-                        # Este ejemplo falló por timeout
-                        output_total.append({
-                            'input': entrada,
-                            'expected': salida_esperada,
-                            'actual': "TIMEOUT",
-                            'correct': False,
-                            'stderr': "Tiempo de ejecución excedido"
-                        })
-                        continue
-                    except Exception as e:
-                        # Este ejemplo falló por algún error
-                        import logging
-                        logging.error(f"Error en ejemplo: {str(e)}")
-                        output_total.append({
-                            'input': entrada,
-                            'expected': salida_esperada,
-                            'actual': "ERROR",
-                            'correct': False,
-                            'stderr': str(e)
-                        })
-                        continue
+                    # Ejecutar realmente el código en el sandbox local
+                    from .execution_engines import get_local_sandbox
+                    result = get_local_sandbox().ejecutar(codigo, entrada, salida_esperada)
+                    salida_obtenida = result['stdout'].strip()
+                    if result['status']['id'] == 5:
+                        salida_obtenida = "TIMEOUT"
+                    
+                    # Registrar esta salida para diagnóstico
+                    output_total.append({
+                        'input': entrada,
+                        'expected': salida_esperada,
+                        'actual': salida_obtenida,
+                        'correct': salida_obtenida == salida_esperada,
+                        'stderr': result['stderr']
+                    })
+                    
+                    if salida_obtenida == salida_esperada:
+                        casos_correctos += 1
                 
                 # Actualizar resultado
                 resultado['casos_correctos'] = casos_correctos
@@ -429,25 +377,12 @@ def procesar_ejercicio(codigo, ejercicio_id, evaluacion_id, estudiante_evaluacio
                 resultado['output'] = code_result['stdout']
                 resultado['stderr'] = code_result['stderr']
             except ImportError:
-                # Si no existe judge_utils, usar el método original
-                import tempfile
-                import subprocess
-                
-                # Crear archivo con el código
-                with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as f:
-                    f.write(codigo.encode('utf-8'))
-                    temp_file = f.name
-                
-                # Intentar ejecutar el código
-                process = subprocess.run(
-                    ['python', temp_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
+                # Si no existe judge_utils, usar el sandbox local
+                from .execution_engines import get_local_sandbox
+                code_result = get_local_sandbox().ejecutar(codigo)
                 
                 # Si no hay errores, consideramos que el ejercicio es correcto
-                if process.returncode == 0:
+                if code_result['success']:
                     resultado['casos_correctos'] = 1
                     resultado['total_casos'] = 1
                     resultado['es_correcto'] = True
@@ -461,15 +396,8 @@ def procesar_ejercicio(codigo, ejercicio_id, evaluacion_id, estudiante_evaluacio
                     resultado['puntaje_obtenido'] = 0
                 
                 # Añadir salida y stderr para diagnóstico
-                resultado['output'] = process.stdout
-                resultado['stderr'] = process.stderr
-                
-                # Limpiar archivo temporal
-                import os
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
+                resultado['output'] = code_result['stdout']
+                resultado['stderr'] = code_result['stderr']
         
         # Guardar respuesta en la base de datos - más robusto ante errores DB
         try:
@@ -941,82 +869,503 @@ def get_detalles_evaluacion(request, pk):
 # Funciones para ejecutar código de los estudiantes
 def ejecutar_codigo(codigo, entrada):
     """
-    Ejecuta código Python con una entrada determinada y devuelve el resultado.
-    Optimizado para reducir operaciones I/O.
+    Ejecuta código Python localmente con una entrada determinada y devuelve el resultado.
+    Usa el sandbox local (rlimits y entrada por pipe, sin ficheros temporales).
     """
-    import hashlib
+    from .execution_engines import get_local_sandbox
     
-    # Calcular hashes para caché
-    codigo_hash = hashlib.md5(codigo.encode()).hexdigest()
-    entrada_hash = hashlib.md5(entrada.encode()).hexdigest()
+    sandbox = get_local_sandbox()
+    result = sandbox.ejecutar(codigo, entrada)
+    error = result['stderr']
+    if result['status']['id'] == 5:
+        error = error or f"Tiempo de ejecución excedido (límite: {sandbox.wall_time_limit:g} segundos)"
     
-    # Guardar en caché temporal por 1 hora
-    cache.set(f"codigo_{codigo_hash}", codigo, timeout=3600)
-    cache.set(f"entrada_{entrada_hash}", entrada, timeout=3600)
+    return {
+        'output': result['stdout'],
+        'error': error,
+        'time': float(result['time'])
+    }
+
+
+def calificar_codigo(codigo, ejercicio, language_id=71):
+    """
+    Califica el código del estudiante para un ejercicio usando Judge0
     
-    # Crear archivo temporal para el código
-    with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as f:
-        f.write(codigo.encode('utf-8'))
-        temp_file = f.name
+    Usa los tests avanzados del ejercicio, sus ejemplos o, si no tiene
+    ninguno, una ejecución simple del código. Un reenvío idéntico se
+    responde desde la caché de calificaciones (grading_cache) sin ir a Judge0.
     
-    # Crear archivo temporal para la entrada
-    with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
-        f.write(entrada.encode('utf-8'))
-        input_file = f.name
+    Args:
+        codigo (str): Código fuente del estudiante
+        ejercicio (Ejercicio): Ejercicio a calificar
+        language_id (int, optional): ID del lenguaje en Judge0
+        
+    Returns:
+        dict: Resultado de la calificación
+    """
+    from .grading_cache import calificar_con_cache
     
-    try:
-        start_time = time.time()
-        process = subprocess.Popen(
-            ['python', temp_file],
-            stdin=open(input_file, 'r'),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+    return calificar_con_cache(_calificar_codigo_judge0, codigo, ejercicio, language_id)
+
+
+def _calificar_codigo_judge0(codigo, ejercicio, language_id=71):
+    """Califica con Judge0, sin caché (ver calificar_codigo)"""
+    from .grading_plan import obtener_plan
+    
+    # Contenido, ejemplos y tests ya preparados para este ejercicio
+    plan = obtener_plan(ejercicio)
+    
+    # Preparar resultado
+    resultado = {
+        'ejercicio_id': ejercicio.id,
+        'success': True,
+        'casos_correctos': 0,
+        'total_casos': 0,
+        'porcentaje': 0,
+        'puntaje_obtenido': 0,
+        'puntaje_maximo': plan['puntaje_maximo'],
+        'es_correcto': False
+    }
+    
+    # 1. Verificar si hay tests avanzados
+    if plan['modo'] == 'tests':
+        # Ejecutar tests avanzados
+        from .judge_utils import ejecutar_tests_preparados
+        
+        tests = plan['tests'].get(str(language_id))
+        if tests is None:
+            test_result = {'success': False, 'stderr': f'No hay tests para el lenguaje {language_id}'}
+        else:
+            test_result = ejecutar_tests_preparados(codigo, tests, language_id)
         
-        try:
-            output, error = process.communicate(timeout=5)
-            execution_time = time.time() - start_time
+        if test_result['success']:
+            casos_correctos = test_result['pruebas_pasadas']
+            total_casos = test_result['total_pruebas']
+            es_correcto = test_result['es_correcto']
             
-            return {
-                'output': output,
-                'error': error,
-                'time': execution_time
-            }
-        except subprocess.TimeoutExpired:
-            process.kill()
-            return {
-                'output': '',
-                'error': 'Tiempo de ejecución excedido (límite: 5 segundos)',
-                'time': 5.0
+            # Actualizar resultado
+            resultado['casos_correctos'] = casos_correctos
+            resultado['total_casos'] = total_casos
+            resultado['es_correcto'] = es_correcto
+            resultado['porcentaje'] = (casos_correctos / total_casos) * 100 if total_casos > 0 else 0
+            resultado['puntaje_obtenido'] = (casos_correctos / total_casos) * resultado['puntaje_maximo'] if total_casos > 0 else 0
+            
+            # Añadir salida para diagnóstico
+            resultado['output'] = test_result['output']
+            resultado['stderr'] = test_result['stderr']
+            # Resultado y tiempo de cada prueba: [[estado, ms], ...]
+            if test_result.get('pruebas') is not None:
+                resultado['pruebas'] = test_result['pruebas']
+        else:
+            resultado['success'] = False
+            resultado['message'] = 'Error en los tests avanzados'
+            resultado['stderr'] = test_result['stderr']
+    
+    # 2. Si hay ejemplos, usarlos como casos de prueba
+    elif plan['modo'] == 'ejemplos':
+        # Usar función de judge_utils para verificar ejemplos
+        from .judge_utils import verificar_ejemplos
+        
+        verification_result = verificar_ejemplos(codigo, plan['ejemplos'])
+        
+        if verification_result['success']:
+            casos_correctos = verification_result['casos_correctos']
+            total_casos = verification_result['total_ejemplos']
+            es_correcto = casos_correctos == total_casos
+            
+            # Actualizar resultado
+            resultado['casos_correctos'] = casos_correctos
+            resultado['total_casos'] = total_casos
+            resultado['es_correcto'] = es_correcto
+            resultado['porcentaje'] = verification_result['porcentaje_exito']
+            resultado['puntaje_obtenido'] = (casos_correctos / total_casos) * resultado['puntaje_maximo'] if total_casos > 0 else 0
+            resultado['output'] = verification_result['resultados']
+            resultado['incompleto'] = verification_result.get('incompleto', False)
+        else:
+            resultado['success'] = False
+            resultado['message'] = 'Error al verificar ejemplos'
+            resultado['stderr'] = verification_result.get('message', '')
+    
+    # 3. Si no hay tests ni ejemplos, ejecutar código simple
+    else:
+        # Usar función de judge_utils para ejecutar el código
+        from .judge_utils import ejecucion_completada, ejecutar_codigo
+        
+        code_result = ejecutar_codigo(codigo)
+        resultado['incompleto'] = not ejecucion_completada(code_result)
+        
+        # Si no hay errores, consideramos que el ejercicio es correcto
+        if code_result['success']:
+            resultado['casos_correctos'] = 1
+            resultado['total_casos'] = 1
+            resultado['es_correcto'] = True
+            resultado['porcentaje'] = 100
+            resultado['puntaje_obtenido'] = resultado['puntaje_maximo']
+        else:
+            resultado['casos_correctos'] = 0
+            resultado['total_casos'] = 1
+            resultado['es_correcto'] = False
+            resultado['porcentaje'] = 0
+            resultado['puntaje_obtenido'] = 0
+        
+        # Añadir salida para diagnóstico
+        resultado['output'] = code_result['stdout']
+        resultado['stderr'] = code_result['stderr']
+    
+    return resultado
+
+
+def guardar_respuesta_codigo(estudiante_evaluacion, ejercicio, codigo, resultado, language_id=71):
+    """
+    Guarda (o sobrescribe) la respuesta calificada de un ejercicio
+    
+    Un error de base de datos no invalida la calificación: se añade
+    'db_warning' al resultado.
+    """
+    try:
+        logger.info(f"Guardando con language_id: {language_id} para ejercicio {ejercicio.id}")
+        
+        # Preparar objeto de respuesta para guardar
+        respuesta_content = {
+            'codigo': codigo,
+            'resultados': resultado.get('output', []),
+            'language_id': language_id  # AGREGAR AL JSON TAMBIÉN
+        }
+        
+        # Si hay stderr, añadirlo
+        if 'stderr' in resultado and resultado['stderr']:
+            respuesta_content['stderr'] = resultado['stderr']
+        if resultado.get('pruebas') is not None:
+            respuesta_content['pruebas'] = resultado['pruebas']
+        
+        RespuestaEjercicio.objects.update_or_create(
+            estudiante_evaluacion=estudiante_evaluacion,
+            ejercicio=ejercicio,
+            defaults={
+                'respuesta': respuesta_content,
+                'es_correcta': resultado['es_correcto'],
+                'puntaje_obtenido': resultado['puntaje_obtenido'],
+                'fecha_respuesta': timezone.now(),
+                'language_id': language_id
             }
-    finally:
-        # Eliminar archivos temporales en segundo plano
-        def cleanup():
+        )
+        
+        logger.info(f"Respuesta guardada con language_id {language_id} para ejercicio {ejercicio.id}")
+        
+    except Exception as db_error:
+        # Reportar el error pero no fallar la ejecución completa
+        logger.error(f"Error al guardar respuesta en BD: {str(db_error)}")
+        # Añadir información al resultado
+        resultado['db_warning'] = "Respuesta evaluada pero no guardada en base de datos"
+    
+    return resultado
+
+
+def calificar_ejercicios(tareas, max_workers=None, al_calificar=None):
+    """
+    Califica varios ejercicios en paralelo con un pool acotado de hilos
+    
+    Cada tarea solo habla con Judge0 (sin tocar la base de datos), así que el
+    tiempo total queda acotado por el ejercicio más lento y no por la suma.
+    Las tareas heredan la prioridad de Judge0 del hilo que llama.
+    
+    Args:
+        tareas (list): Tuplas (ejercicio, codigo, language_id)
+        max_workers (int, optional): Tamaño del pool (por defecto JUDGE0_MAX_WORKERS)
+        al_calificar (callable, optional): Se llama en este hilo con cada
+            resultado en cuanto está listo
+        
+    Returns:
+        list: Resultados en el mismo orden que las tareas
+    """
+    if not tareas:
+        return []
+    
+    max_workers = max_workers or settings.JUDGE0_MAX_WORKERS
+    resultados = [None] * len(tareas)
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(tareas))) as executor:
+        futuros = {
+            executor.submit(contextvars.copy_context().run, calificar_codigo, codigo, ejercicio, language_id): idx
+            for idx, (ejercicio, codigo, language_id) in enumerate(tareas)
+        }
+        for futuro in concurrent.futures.as_completed(futuros):
+            idx = futuros[futuro]
+            ejercicio = tareas[idx][0]
             try:
-                if os.path.exists(temp_file):
-                    os.unlink(temp_file)
-                if os.path.exists(input_file):
-                    os.unlink(input_file)
-            except:
-                pass
-        threading.Thread(target=cleanup).start()
+                resultado = futuro.result()
+            except Exception as e:
+                logger.error(f"Error al calificar ejercicio {ejercicio.id}: {str(e)}")
+                resultado = {
+                    'ejercicio_id': ejercicio.id,
+                    'success': False,
+                    'message': f'Error: {str(e)}'
+                }
+            resultados[idx] = resultado
+            if al_calificar:
+                al_calificar(resultado)
+    
+    return resultados
+
+
+def _como_id(valor):
+    """ejercicio_id enviado por el frontend (int o string) como entero, o None"""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def calificar_batch_local(ejercicios, evaluacion_id, estudiante_evaluacion, batch_id='unknown', al_calificar=None):
+    """
+    Califica en el servidor los ejercicios de un batch (cuando el frontend no
+    envía resultados_judge0)
+    
+    Los ejercicios con código se califican en paralelo (calificar_ejercicios);
+    las respuestas se guardan después, en guardar_resultados_batch.
+    
+    Args:
+        ejercicios (list): Ejercicios enviados con ejercicio_id, codigo y language_id
+        evaluacion_id (int): ID de la evaluación
+        estudiante_evaluacion (EstudianteEvaluacion): Participación del estudiante
+        batch_id (str, optional): ID para tracking
+        al_calificar (callable, optional): Se llama con cada resultado en cuanto
+            está listo (progreso de los jobs de calificación)
         
+    Returns:
+        list: Resultados por ejercicio, en el orden de envío
+    """
+    # Importar la función auxiliar para añadir funciones de test si no existen
+    from .models import get_codigo_con_funciones_auxiliares
+    
+    def listo(resultado):
+        if al_calificar:
+            al_calificar(resultado)
+        return resultado
+    
+    ejercicios_db = Ejercicio.objects.in_bulk(
+        [_como_id(ej.get('ejercicio_id')) for ej in ejercicios if _como_id(ej.get('ejercicio_id'))]
+    )
+    
+    resultados = [None] * len(ejercicios)
+    tareas = []
+    posiciones = []
+    
+    for idx, ej in enumerate(ejercicios):
+        ejercicio_id = ej.get('ejercicio_id')
+        codigo = ej.get('codigo', '')
+        language_id = ej.get('language_id', 71)  # Por defecto Python
+        
+        if not ejercicio_id:
+            logger.warning(f"[Batch:{batch_id}] Ejercicio sin ID")
+            resultados[idx] = listo({
+                'ejercicio_id': None,
+                'success': False,
+                'message': 'ID de ejercicio no proporcionado'
+            })
+            continue
+        
+        ejercicio = ejercicios_db.get(_como_id(ejercicio_id))
+        if ejercicio is None:
+            logger.warning(f"[Batch:{batch_id}] Ejercicio {ejercicio_id} no encontrado")
+            resultados[idx] = listo({
+                'ejercicio_id': ejercicio_id,
+                'success': False,
+                'message': 'Ejercicio no encontrado'
+            })
+            continue
+        
+        # MODIFICADO: Manejar ejercicios sin código o con código vacío
+        if not codigo or codigo.strip() == '':
+            logger.info(f"[Batch:{batch_id}] Ejercicio {ejercicio_id} sin código, asignando 0 puntos")
+            resultados[idx] = listo({
+                'ejercicio_id': ejercicio_id,
+                'success': True,
+                'es_correcto': False,
+                'casos_correctos': 0,
+                'total_casos': 1,
+                'porcentaje': 0,
+                'puntaje_obtenido': 0,
+                'puntaje_maximo': ejercicio.puntaje or 10
+            })
+            continue
+        
+        # Aplicar funciones auxiliares si son necesarias y hay código
+        codigo = get_codigo_con_funciones_auxiliares(ejercicio, codigo)
+        tareas.append((ejercicio, codigo, language_id))
+        posiciones.append(idx)
+    
+    logger.info(f"[Batch:{batch_id}] Calificando {len(tareas)} ejercicios en paralelo")
+    for idx, resultado in zip(posiciones, calificar_ejercicios(tareas, al_calificar=al_calificar)):
+        # Conservar el ejercicio_id tal como lo envió el frontend
+        resultado['ejercicio_id'] = ejercicios[idx].get('ejercicio_id')
+        logger.info(f"[Batch:{batch_id}] Resultado ejercicio {resultado['ejercicio_id']}: {resultado.get('success')}, Es correcto: {resultado.get('es_correcto', False)}")
+        resultados[idx] = resultado
+    
+    return resultados
+
 
-@lru_cache(maxsize=128)
-def ejecutar_codigo_cached(codigo_hash, entrada_hash):
-    """Versión en caché de ejecutar_código que usa hashes como claves."""
-    codigo = cache.get(f"codigo_{codigo_hash}")
-    entrada = cache.get(f"entrada_{entrada_hash}")
+def _guardar_respuestas_batch(estudiante_evaluacion, ejercicios, resultados, batch_id):
+    """
+    Escribe las RespuestaEjercicio de un batch con un único upsert
     
-    if not codigo or not entrada:
-        return {
-            'output': '',
-            'error': 'Datos de ejecución no encontrados',
-            'time': 0
+    Los ejercicios se leen con un solo in_bulk y el código enviado se indexa
+    por ejercicio una vez; las respuestas previas se sobrescriben.
+    
+    Returns:
+        int: Respuestas guardadas
+    """
+    enviados = {}
+    for ej in ejercicios:
+        enviados.setdefault(_como_id(ej.get('ejercicio_id')), ej)
+    
+    ejercicios_db = Ejercicio.objects.in_bulk(
+        [_como_id(r.get('ejercicio_id')) for r in resultados if _como_id(r.get('ejercicio_id'))]
+    )
+    
+    ahora = timezone.now()
+    respuestas = {}
+    for resultado in resultados:
+        # Solo procesar resultados válidos
+        ejercicio_id = _como_id(resultado.get('ejercicio_id'))
+        if not ejercicio_id:
+            continue
+        
+        ejercicio = ejercicios_db.get(ejercicio_id)
+        if ejercicio is None:
+            logger.error(f"[Batch:{batch_id}] Ejercicio {ejercicio_id} no encontrado, respuesta no guardada")
+            continue
+        
+        ejercicio_enviado = enviados.get(ejercicio_id, {})
+        language_id = ejercicio_enviado.get('language_id', 71)  # Por defecto Python
+        
+        respuesta_content = {
+            'codigo': ejercicio_enviado.get('codigo', ''),
+            'resultados': resultado.get('output', []),
+            'language_id': language_id
         }
+        
+        # Añadir stderr si existe
+        if resultado.get('stderr'):
+            respuesta_content['stderr'] = resultado.get('stderr')
+        if resultado.get('pruebas') is not None:
+            respuesta_content['pruebas'] = resultado['pruebas']
+        
+        # Si un ejercicio llega repetido gana el último resultado
+        respuestas[ejercicio_id] = RespuestaEjercicio(
+            estudiante_evaluacion=estudiante_evaluacion,
+            ejercicio=ejercicio,
+            respuesta=respuesta_content,
+            es_correcta=resultado.get('es_correcto', False),
+            puntaje_obtenido=resultado.get('puntaje_obtenido', 0),
+            fecha_respuesta=ahora,
+            language_id=language_id
+        )
+    
+    # IMPORTANTE: Siempre sobrescribir la respuesta, no mantener respuestas previas
+    RespuestaEjercicio.objects.bulk_create(
+        list(respuestas.values()),
+        update_conflicts=True,
+        unique_fields=['estudiante_evaluacion', 'ejercicio'],
+        update_fields=['respuesta', 'es_correcta', 'puntaje_obtenido', 'fecha_respuesta', 'language_id']
+    )
+    logger.info(f"[Batch:{batch_id}] {len(respuestas)} respuestas guardadas")
+    return len(respuestas)
+
+
+def guardar_resultados_batch(evaluacion, estudiante_evaluacion, ejercicios, resultados, batch_id='unknown', tiempo_total_ms=None):
+    """
+    Guarda las respuestas de un batch y actualiza la participación del
+    estudiante (progreso, puntaje, finalización e historial)
     
-    return ejecutar_codigo(codigo, entrada)
+    Args:
+        evaluacion (Evaluacion): Evaluación
+        estudiante_evaluacion (EstudianteEvaluacion): Participación del estudiante
+        ejercicios (list): Ejercicios enviados (código y language_id)
+        resultados (list): Resultados por ejercicio
+        batch_id (str, optional): ID para tracking
+        tiempo_total_ms (int, optional): Tiempo total calculado por el frontend
+        
+    Returns:
+        dict: Respuesta de submit_batch
+    """
+    # Calcular puntuación total de los resultados actuales
+    total_puntaje = sum(resultado.get('puntaje_obtenido', 0) for resultado in resultados)
+    puntaje_maximo = sum(resultado.get('puntaje_maximo', 0) for resultado in resultados)
+    
+    # Respuestas y estado del estudiante en una sola transacción (la
+    # calificación ya terminó, aquí no se espera a Judge0): o se guarda todo
+    # o nada
+    with transaction.atomic():
+        _guardar_respuestas_batch(estudiante_evaluacion, ejercicios, resultados, batch_id)
+        
+        # Ejercicios de la evaluación y respondidos por el estudiante en una consulta
+        conteos = EstudianteEvaluacion.objects.filter(pk=estudiante_evaluacion.pk).aggregate(
+            total_ejercicios=Count('evaluacion__ejercicios', distinct=True),
+            ejercicios_respondidos=Count('respuestas', distinct=True)
+        )
+        total_ejercicios = conteos['total_ejercicios']
+        ejercicios_respondidos = conteos['ejercicios_respondidos']
+        
+        estudiante_evaluacion.progreso = (ejercicios_respondidos / total_ejercicios) * 100 if total_ejercicios > 0 else 0
+        estudiante_evaluacion.puntaje = total_puntaje
+        
+        finalizado = ejercicios_respondidos >= total_ejercicios
+        if finalizado:
+            estudiante_evaluacion.estado = 'finalizado'
+            estudiante_evaluacion.fecha_fin = timezone.now()
+            
+            # CRÍTICO: Calcular tiempo ANTES de guardar en historial
+            if not estudiante_evaluacion.tiempo_total_ms:
+                # Intentar obtener del request data
+                if tiempo_total_ms and tiempo_total_ms > 0:
+                    estudiante_evaluacion.tiempo_total_ms = int(tiempo_total_ms)
+                    logger.info(f"[Batch:{batch_id}] Tiempo desde frontend: {tiempo_total_ms}ms")
+                # Si no hay tiempo del frontend, calcular desde fechas
+                elif estudiante_evaluacion.fecha_inicio and estudiante_evaluacion.fecha_fin:
+                    tiempo_ms = int((estudiante_evaluacion.fecha_fin - estudiante_evaluacion.fecha_inicio).total_seconds() * 1000)
+                    estudiante_evaluacion.tiempo_total_ms = tiempo_ms
+                    logger.info(f"[Batch:{batch_id}] Tiempo calculado desde fechas: {tiempo_ms}ms")
+                else:
+                    logger.warning(f"[Batch:{batch_id}] No se pudo calcular tiempo total")
+        
+        # Guardar primero el estudiante con el tiempo
+        estudiante_evaluacion.save(update_fields=['progreso', 'puntaje', 'estado', 'fecha_fin', 'tiempo_total_ms'])
+        monitor.publicar('finalizado' if finalizado else 'progreso', estudiante_evaluacion)
+    
+    logger.info(f"[Batch:{batch_id}] Estado del estudiante actualizado: {estudiante_evaluacion.estado}, Progreso: {estudiante_evaluacion.progreso}%, Puntaje: {estudiante_evaluacion.puntaje}")
+    
+    # IMPORTANTE: Solo guardar en historial si no existe ya. Va fuera de la
+    # transacción: un fallo aquí no debe deshacer la calificación
+    if finalizado:
+        try:
+            historial_existente = HistorialEvaluacion.objects.filter(
+                estudiante_id=estudiante_evaluacion.estudiante_id,
+                evaluacion_id=estudiante_evaluacion.evaluacion_id
+            ).exists()
+            
+            if not historial_existente:
+                # Guardar en historial con todas las respuestas ya procesadas
+                guardar_evaluacion_en_historial(estudiante_evaluacion)
+                logger.info(f"[Batch:{batch_id}] Historial guardado correctamente")
+            else:
+                logger.info(f"[Batch:{batch_id}] Historial ya existe, no se duplica")
+        except Exception as historial_error:
+            logger.error(f"[Batch:{batch_id}] Error al guardar historial: {str(historial_error)}")
+    
+    puntaje_sobre_10 = (total_puntaje / puntaje_maximo) * 10 if puntaje_maximo > 0 else 0
+    logger.info(f"[Batch:{batch_id}] Procesamiento completado: {total_puntaje}/{puntaje_maximo} puntos, {puntaje_sobre_10}/10")
+    
+    return {
+        'success': True,
+        'message': 'Procesamiento en lote completado',
+        'resultados': resultados,
+        'total_puntaje': total_puntaje,
+        'puntaje_maximo': puntaje_maximo,
+        'puntaje_sobre_10': round(puntaje_sobre_10, 2),
+        'progreso': estudiante_evaluacion.progreso,
+        'estado': estudiante_evaluacion.estado
+    }
 
 
 @api_view(['POST'])
@@ -1024,6 +1373,11 @@ def ejecutar_codigo_cached(codigo_hash, entrada_hash):
 def submit_codigo(request):
     """
     Evalúa el código del estudiante contra un ejercicio usando Judge0
+    
+    Con la cola de calificación activa (GRADING_ASYNC) responde 202 con el
+    job y un worker califica y guarda la respuesta. Sin ella, si la
+    evaluación ya tiene todas sus plazas de calificación ocupadas, también se
+    responde 202 y el job espera su turno en el proceso (ver admission.py).
     """
     try:
         codigo = request.data.get('codigo')
@@ -1054,13 +1408,18 @@ def submit_codigo(request):
         if not created and not estudiante_evaluacion.fecha_inicio:
             estudiante_evaluacion.fecha_inicio = timezone.now()
             estudiante_evaluacion.save()
-            logger.info(f"[Batch:{batch_id}] Establecida fecha_inicio para participación existente")
+            logger.info("Establecida fecha_inicio para participación existente")
         
         # Obtener el ejercicio
         ejercicio = get_object_or_404(Ejercicio, pk=ejercicio_id)
         
-        # Verificar disponibilidad de Judge0
-        is_available, message = check_judge0_availability()
+        # Obtener el ID del lenguaje de la solicitud
+        language_id = request.data.get('language_id', 71)  # Por defecto: Python
+        
+        # Verificar disponibilidad del motor de ejecución (con Judge0 va en
+        # cache y falla rápido si el circuito está abierto)
+        from .execution_engines import get_execution_engine
+        is_available, message = get_execution_engine().disponible()
         if not is_available:
             return Response({
                 'ejercicio_id': ejercicio_id,
@@ -1068,149 +1427,29 @@ def submit_codigo(request):
                 'message': 'El servicio Judge0 no está disponible en este momento',
                 'details': message
             }, status=503)  # 503 Service Unavailable
-            
-        # Preparar resultado
-        resultado = {
-            'ejercicio_id': ejercicio_id,
-            'success': True,
-            'casos_correctos': 0,
-            'total_casos': 0,
-            'porcentaje': 0,
-            'puntaje_obtenido': 0,
-            'puntaje_maximo': ejercicio.puntaje or 10,
-            'es_correcto': False
-        }
-        
-        # Determinar el tipo de prueba a ejecutar
-        
-        # 1. Verificar si hay tests avanzados
-        tests_avanzados = ejercicio.tests_avanzados
-        if not tests_avanzados and hasattr(ejercicio, 'contenido') and ejercicio.contenido:
-            contenido = ejercicio.contenido
-            if isinstance(contenido, str):
-                try:
-                    contenido = json.loads(contenido)
-                except:
-                    contenido = {}
-            
-            if isinstance(contenido, dict):
-                tests_avanzados = contenido.get('tests_avanzados')
-                
-        if tests_avanzados:
-            # Ejecutar tests avanzados
-            from .judge_utils import ejecutar_tests_avanzados
-            
-            # Obtener el ID del lenguaje de la solicitud
-            language_id = request.data.get('language_id', 71)  # Por defecto: Python
-    
-            test_result = ejecutar_tests_avanzados(codigo, tests_avanzados, language_id)
-            
-            if test_result['success']:
-                casos_correctos = test_result['pruebas_pasadas']
-                total_casos = test_result['total_pruebas']
-                es_correcto = test_result['es_correcto']
-                
-                # Actualizar resultado
-                resultado['casos_correctos'] = casos_correctos
-                resultado['total_casos'] = total_casos
-                resultado['es_correcto'] = es_correcto
-                resultado['porcentaje'] = (casos_correctos / total_casos) * 100 if total_casos > 0 else 0
-                resultado['puntaje_obtenido'] = (casos_correctos / total_casos) * resultado['puntaje_maximo'] if total_casos > 0 else 0
-                
-                # Añadir salida para diagnóstico
-                resultado['output'] = test_result['output']
-                resultado['stderr'] = test_result['stderr']
-            else:
-                resultado['success'] = False
-                resultado['message'] = 'Error en los tests avanzados'
-                resultado['stderr'] = test_result['stderr']
         
-        # 2. Si hay ejemplos, usarlos como casos de prueba
-        elif 'ejemplos' in contenido and contenido['ejemplos']:
-            # Usar función de judge_utils para verificar ejemplos
-            from .judge_utils import verificar_ejemplos
-            
-            ejemplos = contenido['ejemplos']
-            verification_result = verificar_ejemplos(codigo, ejemplos)
-            
-            if verification_result['success']:
-                casos_correctos = verification_result['casos_correctos']
-                total_casos = verification_result['total_ejemplos']
-                es_correcto = casos_correctos == total_casos
-                
-                # Actualizar resultado
-                resultado['casos_correctos'] = casos_correctos
-                resultado['total_casos'] = total_casos
-                resultado['es_correcto'] = es_correcto
-                resultado['porcentaje'] = verification_result['porcentaje_exito']
-                resultado['puntaje_obtenido'] = (casos_correctos / total_casos) * resultado['puntaje_maximo'] if total_casos > 0 else 0
-                resultado['output'] = verification_result['resultados']
-            else:
-                resultado['success'] = False
-                resultado['message'] = 'Error al verificar ejemplos'
-                resultado['stderr'] = verification_result.get('message', '')
-        
-        # 3. Si no hay tests ni ejemplos, ejecutar código simple
-        else:
-            # Usar función de judge_utils para ejecutar el código
-            from .judge_utils import ejecutar_codigo
-            
-            code_result = ejecutar_codigo(codigo)
-            
-            # Si no hay errores, consideramos que el ejercicio es correcto
-            if code_result['success']:
-                resultado['casos_correctos'] = 1
-                resultado['total_casos'] = 1
-                resultado['es_correcto'] = True
-                resultado['porcentaje'] = 100
-                resultado['puntaje_obtenido'] = resultado['puntaje_maximo']
-            else:
-                resultado['casos_correctos'] = 0
-                resultado['total_casos'] = 1
-                resultado['es_correcto'] = False
-                resultado['porcentaje'] = 0
-                resultado['puntaje_obtenido'] = 0
-            
-            # Añadir salida para diagnóstico
-            resultado['output'] = code_result['stdout']
-            resultado['stderr'] = code_result['stderr']
-        
-        # Guardar respuesta en la base de datos
-        try:
-            # CORREGIDO: Obtener language_id del ejercicio enviado
-            language_id = ej.get('language_id', 71)  # Por defecto Python
-            logger.info(f"[Batch:{batch_id}] Guardando con language_id: {language_id} para ejercicio {ejercicio_id}")
-            
-            # Preparar objeto de respuesta para guardar
-            respuesta_content = {
-                'codigo': codigo,
-                'resultados': resultado.get('output', []),
-                'language_id': language_id  # AGREGAR AL JSON TAMBIÉN
-            }
-            
-            # Si hay stderr, añadirlo
-            if 'stderr' in resultado and resultado['stderr']:
-                respuesta_content['stderr'] = resultado['stderr']
-            
-            respuesta, created = RespuestaEjercicio.objects.update_or_create(
-                estudiante_evaluacion=estudiante_evaluacion,
-                ejercicio=ejercicio,
-                defaults={
-                    'respuesta': respuesta_content,
-                    'es_correcta': resultado['es_correcto'],
-                    'puntaje_obtenido': resultado['puntaje_obtenido'],
-                    'fecha_respuesta': timezone.now(),
-                    'language_id': language_id
-                }
-            )
-            
-            logger.info(f"[Batch:{batch_id}] Respuesta guardada con language_id {language_id} para ejercicio {ejercicio_id}")
-            
-        except Exception as db_error:
-            # Reportar el error pero no fallar la ejecución completa
-            logger.error(f"Error al guardar respuesta en BD: {str(db_error)}")
-            # Añadir información al resultado
-            resultado['db_warning'] = "Respuesta evaluada pero no guardada en base de datos"
+        # Con la cola activa el request no espera a Judge0
+        from .admission import admitir
+        from .grading_jobs import encolar_calificacion, resumen_job
+        ejercicios_job = [{
+            'ejercicio_id': ejercicio.id,
+            'codigo': codigo,
+            'language_id': language_id
+        }]
+        job = encolar_calificacion('codigo', estudiante_evaluacion, ejercicios_job)
+        if job:
+            return Response(resumen_job(job), status=status.HTTP_202_ACCEPTED)
+        
+        with admitir('codigo', estudiante_evaluacion, ejercicios_job,
+                     encolar=getattr(request, 'judge_rate_limited', False)) as job:
+            if job:
+                return Response(resumen_job(job), status=status.HTTP_202_ACCEPTED)
+            
+            with prioridad_judge0('submit', request.user.id):
+                resultado = calificar_codigo(codigo, ejercicio, language_id)
+            
+            # Guardar respuesta en la base de datos
+            guardar_respuesta_codigo(estudiante_evaluacion, ejercicio, codigo, resultado, language_id)
         
         return Response(resultado)
         
@@ -1227,7 +1466,15 @@ def submit_codigo(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_batch(request):
-    """Procesa múltiples ejercicios en paralelo para evaluación final."""
+    """
+    Procesa múltiples ejercicios en paralelo para evaluación final.
+    
+    Si hay que calificar en el servidor y no hay plaza (o el estudiante superó
+    el límite de envíos), responde 202 con un job en vez de rechazar el envío:
+    en la cola de Redis con GRADING_ASYNC o en la del control de admisión.
+    Los resultados ya calificados por el frontend se guardan siempre, aun
+    sobre el límite, porque no llaman a Judge0.
+    """
     try:
         evaluacion_id = request.data.get('evaluacion_id')
         ejercicios = request.data.get('ejercicios', [])
@@ -1244,7 +1491,8 @@ def submit_batch(request):
                 'success': False,
                 'message': 'Datos incompletos'
             }, status=status.HTTP_400_BAD_REQUEST)
-            
+
+
         # Verificar evaluación
         try:
             evaluacion = Evaluacion.objects.get(pk=evaluacion_id)
@@ -1271,237 +1519,31 @@ def submit_batch(request):
             logger.info(f"[Batch:{batch_id}] Usando resultados de Judge0 procesados por el frontend")
             resultados = resultados_judge0
         else:
-            # Fallback al procesamiento local si no hay resultados de Judge0
-            logger.info(f"[Batch:{batch_id}] No hay resultados de Judge0, usando procesamiento local")
-            resultados = []
-
-            # Importar la función auxiliar para añadir funciones de test si no existen
-            from .models import get_codigo_con_funciones_auxiliares
-            
-            # Variables para el resultado total
-            total_puntaje = 0
-            puntaje_maximo = 0
-
-            # Procesamiento local de cada ejercicio
-            for idx, ej in enumerate(ejercicios):
-                try:
-                    ejercicio_id = ej.get('ejercicio_id')
-                    codigo = ej.get('codigo', '')
-                    
-                    logger.info(f"[Batch:{batch_id}] Procesando ejercicio {idx+1}/{len(ejercicios)}: ID={ejercicio_id}")
-                    
-                    if not ejercicio_id:
-                        logger.warning(f"[Batch:{batch_id}] Ejercicio sin ID")
-                        resultados.append({
-                            'ejercicio_id': None,
-                            'success': False,
-                            'message': 'ID de ejercicio no proporcionado'
-                        })
-                        continue
-                        
-                    # Verificar si el ejercicio existe
-                    try:
-                        ejercicio = Ejercicio.objects.get(id=ejercicio_id)
-                        logger.info(f"[Batch:{batch_id}] Ejercicio encontrado: {ejercicio.titulo}")
-                    except Ejercicio.DoesNotExist:
-                        logger.warning(f"[Batch:{batch_id}] Ejercicio {ejercicio_id} no encontrado")
-                        resultados.append({
-                            'ejercicio_id': ejercicio_id,
-                            'success': False,
-                            'message': 'Ejercicio no encontrado'
-                        })
-                        continue
-                    
-                    # MODIFICADO: Manejar ejercicios sin código o con código vacío
-                    if not codigo or codigo.strip() == '':
-                        logger.info(f"[Batch:{batch_id}] Ejercicio {ejercicio_id} sin código, asignando 0 puntos")
-                        resultado = {
-                            'ejercicio_id': ejercicio_id,
-                            'success': True,
-                            'es_correcto': False,
-                            'casos_correctos': 0,
-                            'total_casos': 1,
-                            'porcentaje': 0,
-                            'puntaje_obtenido': 0,
-                            'puntaje_maximo': ejercicio.puntaje or 10
-                        }
-                        resultados.append(resultado)
-                        puntaje_maximo += ejercicio.puntaje or 10
-                        
-                        # Guardar en la base de datos
-                        respuesta_content = {
-                            'codigo': '',
-                            'resultados': []
-                        }
-                        
-                        RespuestaEjercicio.objects.update_or_create(
-                            estudiante_evaluacion=estudiante_evaluacion,
-                            ejercicio=ejercicio,
-                            defaults={
-                                'respuesta': respuesta_content,
-                                'es_correcta': resultado.get('es_correcto', False),
-                                'puntaje_obtenido': resultado.get('puntaje_obtenido', 0),
-                                'fecha_respuesta': timezone.now(),
-                                'language_id': language_id
-                            }
-                        )
-                        print(f"[Batch:{batch_id}] Respuesta guardada: ejercicio {ejercicio_id}, language_id {language_id}, es_correcta {resultado.get('es_correcto', False)}")
-                        continue
-                    
-                    # Aplicar funciones auxiliares si son necesarias y hay código
-                    codigo = get_codigo_con_funciones_auxiliares(ejercicio, codigo)
-                    logger.info(f"[Batch:{batch_id}] Código con funciones auxiliares preparado para ejercicio {ejercicio_id}")
-                    
-                    # Procesar el ejercicio
-                    try:
-                        logger.info(f"[Batch:{batch_id}] Ejecutando procesamiento para ejercicio {ejercicio_id}")
-                        resultado = procesar_ejercicio(codigo, ejercicio_id, evaluacion_id, estudiante_evaluacion.id)
-                        logger.info(f"[Batch:{batch_id}] Resultado: {resultado.get('success')}, Es correcto: {resultado.get('es_correcto', False)}")
-                        
-                        resultados.append(resultado)
-                        
-                        # Sumar puntaje si fue exitoso
-                        if resultado.get('success', False):
-                            total_puntaje += resultado.get('puntaje_obtenido', 0)
-                            puntaje_maximo += resultado.get('puntaje_maximo', 0)
-                    except Exception as e:
-                        logger.error(f"[Batch:{batch_id}] Error al procesar ejercicio {ejercicio_id}: {str(e)}")
-                        resultados.append({
-                            'ejercicio_id': ejercicio_id,
-                            'success': False,
-                            'message': f'Error: {str(e)}'
-                        })
-                except Exception as e:
-                    logger.error(f"[Batch:{batch_id}] Error general en ejercicio {idx+1}: {str(e)}")
-                    resultados.append({
-                        'ejercicio_id': ej.get('ejercicio_id'),
-                        'success': False,
-                        'message': f'Error general: {str(e)}'
-                    })
-        
-        # Para todos los resultados, guardar en la base de datos
-        # MEJORADO: Mejor manejo de errores al guardar respuestas
-        for resultado in resultados:
-            # Solo procesar resultados válidos
-            if not resultado.get('ejercicio_id'):
-                continue
-            
-            ejercicio_id = resultado.get('ejercicio_id')
-            
-            # Guardar en la base de datos
-            try:
-                ejercicio = Ejercicio.objects.get(id=ejercicio_id)
-                
-                # CORREGIDO: Obtener datos del ejercicio enviado incluyendo language_id
-                ejercicio_enviado = next(
-                    (ej for ej in ejercicios if ej.get('ejercicio_id') == ejercicio_id), 
-                    {}
-                )
-                
-                codigo_ejercicio = ejercicio_enviado.get('codigo', '')
-                language_id = ejercicio_enviado.get('language_id', 71)  # Por defecto Python
-                
-                logger.info(f"[Batch:{batch_id}] Guardando Judge0 result con language_id: {language_id} para ejercicio {ejercicio_id}")
+            # Fallback al procesamiento local si no hay resultados de Judge0:
+            # con la cola activa lo hace un worker y se responde 202 con el job
+            from .admission import admitir
+            from .grading_jobs import encolar_calificacion, resumen_job
+            job = encolar_calificacion('batch', estudiante_evaluacion, ejercicios,
+                                       batch_id=batch_id,
+                                       tiempo_total_ms=request.data.get('tiempo_total_ms'))
+            if job:
+                logger.info(f"[Batch:{batch_id}] Calificación encolada en el job {job['id']}")
+                return Response(resumen_job(job), status=status.HTTP_202_ACCEPTED)
+            
+            with admitir('batch', estudiante_evaluacion, ejercicios,
+                         encolar=getattr(request, 'judge_rate_limited', False),
+                         batch_id=batch_id, tiempo_total_ms=request.data.get('tiempo_total_ms')) as job:
+                if job:
+                    return Response(resumen_job(job), status=status.HTTP_202_ACCEPTED)
                 
-                respuesta_content = {
-                    'codigo': codigo_ejercicio,
-                    'resultados': resultado.get('output', []),
-                    'language_id': language_id  # AGREGAR AL JSON
-                }
-                
-                # Añadir stderr si existe
-                if resultado.get('stderr'):
-                    respuesta_content['stderr'] = resultado.get('stderr')
-                
-                # IMPORTANTE: Siempre sobrescribir la respuesta, no mantener respuestas previas
-                RespuestaEjercicio.objects.update_or_create(
-                    estudiante_evaluacion=estudiante_evaluacion,
-                    ejercicio=ejercicio,
-                    defaults={
-                        'respuesta': respuesta_content,
-                        'es_correcta': resultado.get('es_correcto', False),
-                        'puntaje_obtenido': resultado.get('puntaje_obtenido', 0),
-                        'fecha_respuesta': timezone.now(),
-                        'language_id': language_id  # DESCOMENTAR Y CORREGIR
-                    }
-                )
-                
-                logger.info(f"[Batch:{batch_id}] Judge0 result guardado con language_id {language_id} para ejercicio {ejercicio_id}")
-            
-            
-            except Exception as db_error:
-                logger.error(f"[Batch:{batch_id}] Error al guardar respuesta en DB para ejercicio {ejercicio_id}: {str(db_error)}")
-                
-        print(f"[Batch:{batch_id}] Total respuestas guardadas: {len(resultados)}")
-        
-        # Actualizar estado estudiante
-        try:
-            total_ejercicios = evaluacion.ejercicios.count()
-            ejercicios_respondidos = RespuestaEjercicio.objects.filter(
-                estudiante_evaluacion=estudiante_evaluacion
-            ).count()
-            
-            # Calcular puntuación total de los resultados actuales
-            total_puntaje = sum(resultado.get('puntaje_obtenido', 0) for resultado in resultados)
-            puntaje_maximo = sum(resultado.get('puntaje_maximo', 0) for resultado in resultados)
-            
-            estudiante_evaluacion.progreso = (ejercicios_respondidos / total_ejercicios) * 100 if total_ejercicios > 0 else 0
-            estudiante_evaluacion.puntaje = total_puntaje
-            
-            if ejercicios_respondidos >= total_ejercicios:
-                estudiante_evaluacion.estado = 'finalizado'
-                estudiante_evaluacion.fecha_fin = timezone.now()
-                
-                # CRÍTICO: Calcular tiempo ANTES de guardar en historial
-                if not estudiante_evaluacion.tiempo_total_ms:
-                    # Intentar obtener del request data
-                    tiempo_desde_frontend = request.data.get('tiempo_total_ms')
-                    if tiempo_desde_frontend and tiempo_desde_frontend > 0:
-                        estudiante_evaluacion.tiempo_total_ms = int(tiempo_desde_frontend)
-                        logger.info(f"[Batch:{batch_id}] Tiempo desde frontend: {tiempo_desde_frontend}ms")
-                    # Si no hay tiempo del frontend, calcular desde fechas
-                    elif estudiante_evaluacion.fecha_inicio and estudiante_evaluacion.fecha_fin:
-                        tiempo_ms = int((estudiante_evaluacion.fecha_fin - estudiante_evaluacion.fecha_inicio).total_seconds() * 1000)
-                        estudiante_evaluacion.tiempo_total_ms = tiempo_ms
-                        logger.info(f"[Batch:{batch_id}] Tiempo calculado desde fechas: {tiempo_ms}ms")
-                    else:
-                        logger.warning(f"[Batch:{batch_id}] No se pudo calcular tiempo total")
-                
-                # Guardar primero el estudiante con el tiempo
-                estudiante_evaluacion.save()
-                
-                # IMPORTANTE: Solo guardar en historial si no existe ya
-                historial_existente = HistorialEvaluacion.objects.filter(
-                    estudiante_id=estudiante_evaluacion.estudiante.id,
-                    evaluacion_id=estudiante_evaluacion.evaluacion.id
-                ).first()
-                
-                if not historial_existente:
-                    # Guardar en historial con todas las respuestas ya procesadas
-                    guardar_evaluacion_en_historial(estudiante_evaluacion)
-                    logger.info(f"[Batch:{batch_id}] Historial guardado correctamente")
-                else:
-                    logger.info(f"[Batch:{batch_id}] Historial ya existe, no se duplica")
-            else:
-                estudiante_evaluacion.save()
-            
-            logger.info(f"[Batch:{batch_id}] Estado del estudiante actualizado: {estudiante_evaluacion.estado}, Progreso: {estudiante_evaluacion.progreso}%, Puntaje: {estudiante_evaluacion.puntaje}")
-        except Exception as update_error:
-            logger.error(f"[Batch:{batch_id}] Error al actualizar estado estudiante: {str(update_error)}")
-        
-        puntaje_sobre_10 = (total_puntaje / puntaje_maximo) * 10 if puntaje_maximo > 0 else 0
-        logger.info(f"[Batch:{batch_id}] Procesamiento completado: {total_puntaje}/{puntaje_maximo} puntos, {puntaje_sobre_10}/10")
-        
-        return Response({
-            'success': True,
-            'message': 'Procesamiento en lote completado',
-            'resultados': resultados,
-            'total_puntaje': total_puntaje,
-            'puntaje_maximo': puntaje_maximo,
-            'puntaje_sobre_10': round(puntaje_sobre_10, 2),
-            'progreso': estudiante_evaluacion.progreso,
-            'estado': estudiante_evaluacion.estado
-        })
+                logger.info(f"[Batch:{batch_id}] No hay resultados de Judge0, usando procesamiento local")
+                with prioridad_judge0('final', request.user.id):
+                    resultados = calificar_batch_local(ejercicios, evaluacion_id, estudiante_evaluacion, batch_id)
+        
+        return Response(guardar_resultados_batch(
+            evaluacion, estudiante_evaluacion, ejercicios, resultados, batch_id,
+            tiempo_total_ms=request.data.get('tiempo_total_ms')
+        ))
     except Exception as e:
         logger.error(f"Error en submit_batch: {str(e)}")
         return Response({
@@ -1510,6 +1552,153 @@ def submit_batch(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def judge0_scheduler_status(request):
+    """
+    Profundidad de las colas y esperas del planificador de Judge0 de este
+    proceso, ejecuciones ahorradas por single-flight y plazas del control
+    de admisión
+    """
+    from .admission import get_control_admision
+    from .single_flight import get_single_flight
+    return Response({
+        **get_judge0_scheduler().estadisticas(),
+        'single_flight': get_single_flight().estadisticas(),
+        'admision': get_control_admision().estado(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cola_calificacion_evaluacion(request, pk):
+    """
+    Calificaciones en cola y en curso de una evaluación y espera estimada,
+    para que el docente vea el atasco al cierre del examen
+    """
+    from .admission import estado_evaluacion
+    
+    evaluacion = get_object_or_404(Evaluacion, pk=pk)
+    user = request.user
+    is_docente = hasattr(user, 'profile') and getattr(user.profile, 'rol', '') in ('docente', 'admin')
+    if not (evaluacion.creador == user or user.is_staff or user.is_superuser or is_docente):
+        return Response({
+            'success': False,
+            'message': 'No tiene permisos para ver la cola de calificación'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response({
+        'success': True,
+        'evaluacion_id': evaluacion.id,
+        **estado_evaluacion(evaluacion.id),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def resumen_resultados_evaluacion(request, pk):
+    """
+    Agregados de resultados de una evaluación (finalizados, promedio, tasa
+    de aprobación y aciertos por ejercicio) leídos del resumen materializado
+    """
+    from .resumenes import obtener_resumen_evaluacion
+    
+    evaluacion = get_object_or_404(Evaluacion, pk=pk)
+    user = request.user
+    is_docente = hasattr(user, 'profile') and getattr(user.profile, 'rol', '') in ('docente', 'admin')
+    if not (evaluacion.creador == user or user.is_staff or user.is_superuser or is_docente):
+        return Response({
+            'success': False,
+            'message': 'No tiene permisos para ver los resultados de la evaluación'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    resumen = obtener_resumen_evaluacion(evaluacion.id)
+    return Response({
+        'success': True,
+        'evaluacion_id': evaluacion.id,
+        'puntaje_maximo': resumen.puntaje_maximo,
+        'total_ejercicios': resumen.total_ejercicios,
+        'participantes': resumen.participantes,
+        'finalizados': resumen.finalizados,
+        'aprobados': resumen.aprobados,
+        'promedio': round(resumen.promedio, 2),
+        'tasa_aprobacion': round(resumen.tasa_aprobacion, 2),
+        'por_ejercicio': {
+            ejercicio_id: {
+                **conteos,
+                'porcentaje_correctas': round(conteos['correctas'] / conteos['respondidas'] * 100, 2),
+            }
+            for ejercicio_id, conteos in resumen.por_ejercicio.items()
+        },
+        'actualizado': resumen.actualizado.isoformat(),
+    })
+
+
+@api_view(['GET'])
+@renderer_classes([monitor.EventStreamRenderer, JSONRenderer])
+@permission_classes([IsAuthenticated])
+def monitor_participantes(request, pk):
+    """
+    Stream SSE con los participantes de una evaluación y sus cambios
+    (ingreso, progreso, puntaje, finalizado, expulsado), para que el
+    monitor del docente use una conexión en vez de consultar /participantes/
+    """
+    evaluacion = get_object_or_404(Evaluacion, pk=pk)
+    user = request.user
+    is_docente = hasattr(user, 'profile') and getattr(user.profile, 'rol', '') in ('docente', 'admin')
+    if not (evaluacion.creador == user or user.is_staff or user.is_superuser or is_docente):
+        return Response({
+            'success': False,
+            'message': 'No tiene permisos para ver los participantes'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    # Suscribirse antes de leer el snapshot para no perder cambios intermedios
+    suscripcion = monitor.suscribir(evaluacion.id)
+    try:
+        participantes = monitor.participantes_evaluacion(evaluacion.id)
+    except Exception:
+        suscripcion.cerrar()
+        raise
+    
+    response = StreamingHttpResponse(
+        monitor.eventos_sse(suscripcion, participantes, duracion=monitor.MONITOR_SSE_DURACION,
+                            ping=monitor.MONITOR_SSE_PING),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Que nginx no acumule el stream en su buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def grading_job_status(request, job_id):
+    """
+    Estado de un job de calificación asíncrona con el progreso por ejercicio;
+    al completarse incluye la misma respuesta que daría submit_codigo/submit_batch
+    """
+    from .grading_jobs import obtener_job, resumen_job
+    
+    job = obtener_job(job_id)
+    if not job:
+        return Response({
+            'success': False,
+            'message': 'Job no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    user = request.user
+    is_admin = user.is_superuser or (hasattr(user, 'profile') and user.profile.rol == 'admin')
+    is_docente = hasattr(user, 'profile') and user.profile.rol == 'docente'
+    if job['usuario_id'] != user.id and not (is_admin or is_docente):
+        return Response({
+            'success': False,
+            'message': 'No tienes permiso para ver este job'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(resumen_job(job))
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def test_codigo(request):
@@ -1545,16 +1734,9 @@ def test_codigo(request):
                 'message': 'Evaluación o ejercicio no encontrado'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Obtener el contenido del ejercicio
-        contenido = ejercicio.contenido
-        if isinstance(contenido, str):
-            try:
-                contenido = json.loads(contenido)
-            except:
-                contenido = {}
-        
-        # Obtener caso de prueba (primer ejemplo)
-        ejemplos = contenido.get('ejemplos', [])
+        # Obtener caso de prueba (primer ejemplo) del plan de calificación
+        from .grading_plan import obtener_plan
+        ejemplos = obtener_plan(ejercicio)['ejemplos']
         if not ejemplos:
             return Response({
                 'success': False,
@@ -1571,7 +1753,15 @@ def test_codigo(request):
                 from .judge_utils import ejecutar_codigo
                 
                 # Ejecutar código con Judge0
-                result = ejecutar_codigo(codigo, ejemplo.get('entrada', ''))
+                with prioridad_judge0('test', request.user.id):
+                    result = ejecutar_codigo(codigo, ejemplo.get('entrada', ''))
+                
+                if result.get('unavailable'):
+                    return Response({
+                        'success': False,
+                        'message': 'El servicio Judge0 no está disponible en este momento',
+                        'details': result.get('message') or result.get('error', '')
+                    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
                 
                 if result['stderr']:
                     return Response({
@@ -1638,6 +1828,28 @@ def test_codigo(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
     
+@api_view(['PUT'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def judge0_callback(request):
+    """
+    Recibe el resultado de una submission que Judge0 envía a callback_url.
+    Judge0 no se autentica con JWT: se valida el secreto de la URL, y sin
+    JUDGE0_CALLBACK_SECRET se rechaza todo
+    """
+    from .judge_utils import judge0_results, verificar_secreto_callback
+    
+    if not verificar_secreto_callback(request.query_params.get('secret')):
+        return Response({'success': False, 'message': 'Secreto inválido'},
+                        status=status.HTTP_403_FORBIDDEN)
+    
+    token = judge0_results.registrar_callback(request.data)
+    if not token:
+        return Response({'success': False, 'message': 'Falta el token de la submission'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'success': True, 'token': token})
+
         
 @api_view(['GET'])
 def admin_check_evaluacion(request, pk):
@@ -1707,6 +1919,7 @@ def finalizar_evaluacion(request, pk):
             print("❌ No se pudo determinar el tiempo total de la evaluación")
         
         participacion.save()
+        monitor.publicar('finalizado', participacion)
         
         # Guardar en historial DESPUÉS de guardar el tiempo
         guardar_evaluacion_en_historial(participacion)
@@ -1747,14 +1960,13 @@ def resultados_evaluacion(request, pk):
             evaluacion=evaluacion
         )
         
-        # Obtener todas las respuestas
-        respuestas = RespuestaEjercicio.objects.filter(
-            estudiante_evaluacion=participacion
-        ).select_related('ejercicio')
+        # Puntaje máximo y respuestas del resumen materializado (ver resumenes.py)
+        from .resumenes import obtener_resumen_participacion
+        resumen = obtener_resumen_participacion(participacion)
         
         # Calcular estadísticas
         puntaje_total = participacion.puntaje or 0
-        puntaje_maximo = sum(e.puntaje for e in evaluacion.ejercicios.all())
+        puntaje_maximo = resumen.puntaje_maximo
         
         # Calcular puntaje sobre 10
         puntaje_sobre_10 = 0
@@ -1763,14 +1975,14 @@ def resultados_evaluacion(request, pk):
         
         # Preparar detalles de respuestas
         respuestas_detalle = []
-        for r in respuestas:
+        for ejercicio_id, r in resumen.respuestas.items():
             respuestas_detalle.append({
-                'ejercicio_id': r.ejercicio.id,
-                'ejercicio_titulo': r.ejercicio.titulo,
-                'puntaje_obtenido': r.puntaje_obtenido,
-                'puntaje_maximo': r.ejercicio.puntaje,
-                'es_correcta': r.es_correcta,
-                'fecha_respuesta': r.fecha_respuesta.isoformat()
+                'ejercicio_id': int(ejercicio_id),
+                'ejercicio_titulo': r['titulo'],
+                'puntaje_obtenido': r['puntaje_obtenido'],
+                'puntaje_maximo': r['puntaje_maximo'],
+                'es_correcta': r['es_correcta'],
+                'fecha_respuesta': r['fecha_respuesta']
             })
         
         return Response({
@@ -1819,58 +2031,8 @@ def get_participantes_evaluacion(request, pk):
                 'message': 'No tiene permisos para ver los participantes'
             }, status=403)
         
-        # Obtener participantes
-        participaciones = EstudianteEvaluacion.objects.filter(
-            evaluacion=evaluacion
-        ).select_related('estudiante')
-        
-        # Añadir log para debuggear
-        print(f"\n=== Debug Participaciones Evaluación {pk} ===")
-        print(f"Total participaciones encontradas: {participaciones.count()}")
-        for p in participaciones:
-            print(f"""
-Estudiante: {p.estudiante.username}
-Estado: {p.estado}
-Ingreso: {p.fecha_inicio}
-Progreso: {p.progreso}%
-Puntaje: {p.puntaje}
----""")
-        
-        # Formatear datos
-        participantes = []
-        for participacion in participaciones:
-            try:
-                estudiante = participacion.estudiante
-                estudiante_nombre = estudiante.username
-                
-                # Intentar obtener el nombre completo del perfil si existe
-                try:
-                    if hasattr(estudiante, 'profile'):
-                        perfil = estudiante.profile
-                        if hasattr(perfil, 'nombres') and hasattr(perfil, 'apellidos'):
-                            estudiante_nombre = f"{perfil.nombres} {perfil.apellidos}"
-                except:
-                    pass
-                
-                # Log detallado de cada participante procesado
-                print(f"Procesando participante: {estudiante_nombre}")
-                print(f"Estado actual: {participacion.estado}")
-                
-                participantes.append({
-                    'id': participacion.id,
-                    'estudiante_id': estudiante.id,
-                    'estudiante_nombre': estudiante_nombre,
-                    'email': estudiante.email,
-                    'estado': participacion.estado,
-                    'progreso': participacion.progreso,
-                    'puntaje': participacion.puntaje,
-                    'fecha_inicio': participacion.fecha_inicio.isoformat() if participacion.fecha_inicio else None,
-                    'fecha_fin': participacion.fecha_fin.isoformat() if participacion.fecha_fin else None
-                })
-            except Exception as e:
-                print(f"Error al procesar participante: {e}")
-        
-        print(f"=== Fin Debug Participaciones ===\n")
+        # Participantes con su resumen de resultados (ver resumenes.py)
+        participantes = monitor.participantes_evaluacion(evaluacion.id)
         return Response(participantes)
         
     except Exception as e:
@@ -1935,6 +2097,7 @@ def ajustar_puntaje(request, pk):
                 puntaje_nuevo=nuevo_puntaje,
                 motivo=motivo
             )
+            monitor.publicar('puntaje', participacion)
             
             return Response({
                 'success': True,
@@ -1999,6 +2162,7 @@ def expulsar_estudiante(request, pk):
             participacion.estado = 'expulsado'
             participacion.fecha_fin = timezone.now()
             participacion.save()
+            monitor.publicar('expulsado', participacion)
             
             return Response({
                 'success': True,
@@ -2028,74 +2192,68 @@ def expulsar_estudiante(request, pk):
 @permission_classes([IsAuthenticated])
 def obtener_historial_evaluaciones(request):
     """
-    Obtiene el historial de evaluaciones de un estudiante
+    Obtiene el historial de evaluaciones de un estudiante, paginado por
+    cursor (?cursor=...&limite=...). Las respuestas van resumidas: el código
+    y los resultados se obtienen con obtener_evaluacion_historial.
     """
     try:
         estudiante_id = request.query_params.get('estudiante_id')
         if not estudiante_id:
             estudiante_id = request.user.id
             
-        # Obtener historial desde la tabla de historial
-        historiales = HistorialEvaluacion.objects.filter(
-            estudiante_id=estudiante_id
-        ).order_by('-fecha_fin')
+        from .historial_store import HISTORIAL_PAGINA, pagina_historial
+        
+        try:
+            historiales, siguiente_cursor = pagina_historial(
+                estudiante_id,
+                cursor=request.query_params.get('cursor'),
+                limite=int(request.query_params.get('limite', HISTORIAL_PAGINA)),
+            )
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': f'Parámetros de paginación inválidos: {str(e)}'
+            }, status=400)
         
         # Preparar respuesta
         resultados = []
         
         for historial in historiales:
-            # Preparar datos de respuestas con manejo defensivo
-            respuestas_data = []
-            
-            # Obtener respuestas del historial de manera segura
-            detalles = historial.detalles or {}
-            respuestas_historial = detalles.get('respuestas', [])
-            
-            for respuesta in respuestas_historial:
-                try:
-                    # Manejar diferentes formatos de datos de manera defensiva
-                    respuestas_data.append({
-                        'ejercicio_id': respuesta.get('ejercicio_id'),
-                        'ejercicio_titulo': respuesta.get('ejercicio_titulo', f"Ejercicio {respuesta.get('ejercicio_id', 'N/A')}"),
-                        'puntaje_obtenido': respuesta.get('puntaje_obtenido', 0),
-                        'puntaje_maximo': respuesta.get('puntaje_maximo', respuesta.get('ejercicio_puntaje', 30)),  # Fallback a nombres anteriores
-                        'es_correcta': respuesta.get('es_correcta', False),
-                        'codigo': respuesta.get('codigo', ''),
-                        'resultados': respuesta.get('resultados', []),
-                        'fecha_respuesta': respuesta.get('fecha_respuesta', '')
-                    })
-                except Exception as e:
-                    print(f"Error procesando respuesta individual: {str(e)}")
-                    # Continuar con la siguiente respuesta en caso de error
-                    continue
-            
             # Calcular puntaje sobre 10 de manera segura
             puntaje_sobre_10 = 0
-            if historial.evaluacion_puntaje_total and historial.evaluacion_puntaje_total > 0:
-                puntaje_sobre_10 = (historial.puntaje_total / historial.evaluacion_puntaje_total) * 10
+            if historial['evaluacion_puntaje_total'] and historial['evaluacion_puntaje_total'] > 0:
+                puntaje_sobre_10 = (historial['puntaje_total'] / historial['evaluacion_puntaje_total']) * 10
+            
+            respuestas_data = [{
+                **respuesta,
+                'ejercicio_titulo': respuesta['ejercicio_titulo'] or f"Ejercicio {respuesta['ejercicio_id']}",
+                'fecha_respuesta': respuesta['fecha_respuesta'].isoformat() if respuesta['fecha_respuesta'] else '',
+            } for respuesta in historial['respuestas']]
             
             # Crear objeto para la evaluación
             eval_data = {
-                'id': historial.id,  # ID del historial
-                'evaluacion_id': historial.evaluacion_id,  # ID de la evaluación original
-                'titulo': historial.evaluacion_titulo or f"Evaluación {historial.evaluacion_id}",
-                'fecha_inicio': historial.fecha_inicio.isoformat() if historial.fecha_inicio else None,
-                'fecha_fin': historial.fecha_fin.isoformat() if historial.fecha_fin else None,
-                'puntaje': historial.puntaje_total or 0,
+                'id': historial['id'],  # ID del historial
+                'evaluacion_id': historial['evaluacion_id'],  # ID de la evaluación original
+                'titulo': historial['evaluacion_titulo'] or f"Evaluación {historial['evaluacion_id']}",
+                'fecha_inicio': historial['fecha_inicio'].isoformat() if historial['fecha_inicio'] else None,
+                'fecha_fin': historial['fecha_fin'].isoformat() if historial['fecha_fin'] else None,
+                'puntaje': historial['puntaje_total'] or 0,
                 'puntaje_sobre_10': round(puntaje_sobre_10, 2),
                 'color_clase': get_color_clase(puntaje_sobre_10),
                 'respuestas': respuestas_data,
-                'tiempo_total': str(historial.tiempo_total) if historial.tiempo_total else None,               
-                'tiempo_total_ms': historial.tiempo_total_ms or 0,
-                'detalles_adicionales': historial.detalles or {},
-                'evaluacion_activa': getattr(historial, 'evaluacion_activa', True)
+                'tiempo_total': str(historial['tiempo_total']) if historial['tiempo_total'] else None,
+                'tiempo_total_ms': historial['tiempo_total_ms'] or 0,
+                'detalles_adicionales': historial['detalles'] or {},
+                'evaluacion_activa': historial['evaluacion_activa']
             }
             
             resultados.append(eval_data)
         
         return Response({
             'success': True,
-            'historial': resultados
+            'historial': resultados,
+            'siguiente_cursor': siguiente_cursor,
+            'hay_mas': siguiente_cursor is not None
         })
     
     except Exception as e:
@@ -2118,10 +2276,13 @@ def obtener_evaluacion_historial(request, historial_id):
     Obtiene una evaluación específica del historial para visualización
     """
     try:
-        historial = HistorialEvaluacion.objects.get(
+        from .historial_store import con_respuestas, detalles_completos
+        
+        historial = con_respuestas(HistorialEvaluacion.objects).get(
             id=historial_id,
             estudiante_id=request.user.id
         )
+        detalles = detalles_completos(historial)
         
         # CORREGIDO: Construir datos de evaluación con ejercicios completos
         evaluacion_data = {
@@ -2138,17 +2299,17 @@ def obtener_evaluacion_historial(request, historial_id):
         # CORREGIDO: Extraer ejercicios desde detalles con prioridad
         ejercicios_desde_detalles = []
         
-        if historial.detalles and isinstance(historial.detalles, dict):
+        if detalles and isinstance(detalles, dict):
             # 1. PRIORIDAD: Ejercicios completos desde detalles.ejercicios
-            if 'ejercicios' in historial.detalles and historial.detalles['ejercicios']:
-                ejercicios_desde_detalles = historial.detalles['ejercicios']
+            if 'ejercicios' in detalles and detalles['ejercicios']:
+                ejercicios_desde_detalles = detalles['ejercicios']
                 print(f"DEBUG: Encontrados {len(ejercicios_desde_detalles)} ejercicios en detalles.ejercicios")
             
             # 2. FALLBACK: Construir desde detalles.respuestas
-            elif 'respuestas' in historial.detalles and historial.detalles['respuestas']:
-                print(f"DEBUG: Construyendo ejercicios desde {len(historial.detalles['respuestas'])} respuestas")
+            elif 'respuestas' in detalles and detalles['respuestas']:
+                print(f"DEBUG: Construyendo ejercicios desde {len(detalles['respuestas'])} respuestas")
                 
-                for respuesta in historial.detalles['respuestas']:
+                for respuesta in detalles['respuestas']:
                     ejercicio = {
                         'id': respuesta.get('ejercicio_id'),
                         'titulo': respuesta.get('ejercicio_titulo', f"Ejercicio {respuesta.get('ejercicio_id')}"),
@@ -2302,9 +2463,9 @@ def guardar_evaluacion_en_historial(estudiante_evaluacion):
         
         print(f"DEBUG: Procesando {respuestas.count()} respuestas")
         
-        # Convertir respuestas a formato JSON con language_id
-        respuestas_json = []
-        ejercicios_json = []
+        from .historial_store import datos_snapshot, guardar_respuestas
+        
+        entradas = []
         
         for respuesta in respuestas:
             ejercicio = respuesta.ejercicio
@@ -2340,23 +2501,6 @@ def guardar_evaluacion_en_historial(estudiante_evaluacion):
             
             print(f"DEBUG: Respuesta para ejercicio {ejercicio.id}: language_id={language_id}, código={len(codigo)} chars")
             
-            # Respuesta para el historial
-            respuesta_json = {
-                'ejercicio_id': ejercicio.id,
-                'ejercicio_titulo': ejercicio.titulo,
-                'ejercicio_descripcion': ejercicio.descripcion,
-                'es_correcta': respuesta.es_correcta,
-                'puntaje_obtenido': float(respuesta.puntaje_obtenido),
-                'puntaje_maximo': float(ejercicio.puntaje),
-                'codigo': codigo,
-                'resultados': resultados,
-                'stderr': stderr,
-                'language_id': language_id,  # IMPORTANTE: Guardar language_id
-                'fecha_respuesta': respuesta.fecha_respuesta.isoformat() if respuesta.fecha_respuesta else None
-            }
-            respuestas_json.append(respuesta_json)
-            
-            # CORREGIDO: Ejercicio completo para modo historial
             contenido_ejercicio = ejercicio.contenido or {}
             if isinstance(contenido_ejercicio, str):
                 try:
@@ -2364,39 +2508,25 @@ def guardar_evaluacion_en_historial(estudiante_evaluacion):
                 except json.JSONDecodeError:
                     contenido_ejercicio = {}
             
-            ejercicio_json = {
-                'id': ejercicio.id,
-                'titulo': ejercicio.titulo,
-                'descripcion': ejercicio.descripcion,
-                'puntaje': float(ejercicio.puntaje),
-                'dificultad': ejercicio.dificultad,
-                'codigo': codigo,  # El código que escribió el estudiante
-                'template': codigo,  # Para compatibilidad
-                'language_id': language_id,  # IMPORTANTE: Para el modo historial
-                'es_correcta': respuesta.es_correcta,
+            # Respuesta normalizada: el ejercicio y el código se guardan una
+            # vez por contenido (ver historial_store.py)
+            entradas.append({
+                'snapshot': datos_snapshot(ejercicio, contenido_ejercicio),
+                'codigo': codigo or '',
+                'language_id': language_id or 71,
+                'es_correcta': bool(respuesta.es_correcta),
                 'puntaje_obtenido': float(respuesta.puntaje_obtenido),
                 'puntaje_maximo': float(ejercicio.puntaje),
-                'resultados': resultados,
-                'stderr': stderr,
-                
-                # Contenido original del ejercicio
-                'contenido': contenido_ejercicio,
-                'restricciones': contenido_ejercicio.get('restricciones', ''),
-                'formato_salida': contenido_ejercicio.get('formato_salida', ''),
-                'ejemplos': contenido_ejercicio.get('ejemplos', []),
-                'pista': contenido_ejercicio.get('pista', ''),
-                'etiquetas': contenido_ejercicio.get('etiquetas', []),
-                'credito': contenido_ejercicio.get('credito', ''),
-                'tests_avanzados': contenido_ejercicio.get('tests_avanzados'),
-                'templates_por_lenguaje': contenido_ejercicio.get('templates_por_lenguaje', {}),
-            }
-            ejercicios_json.append(ejercicio_json)
+                'resultados': [] if resultados is None else resultados,
+                'stderr': stderr or '',
+                'fecha_respuesta': respuesta.fecha_respuesta,
+            })
         
         # CORREGIDO: Calcular estadísticas correctas
-        total_ejercicios = len(ejercicios_json)
-        ejercicios_correctos = len([r for r in respuestas_json if r['es_correcta']])
-        puntaje_total = sum([r['puntaje_obtenido'] for r in respuestas_json])
-        puntaje_maximo = sum([r['puntaje_maximo'] for r in respuestas_json])
+        total_ejercicios = len(entradas)
+        ejercicios_correctos = len([e for e in entradas if e['es_correcta']])
+        puntaje_total = sum([e['puntaje_obtenido'] for e in entradas])
+        puntaje_maximo = sum([e['puntaje_maximo'] for e in entradas])
         porcentaje = (puntaje_total / puntaje_maximo * 100) if puntaje_maximo > 0 else 0
         puntaje_sobre_10 = (puntaje_total / puntaje_maximo * 10) if puntaje_maximo > 0 else 0
         
@@ -2419,55 +2549,55 @@ def guardar_evaluacion_en_historial(estudiante_evaluacion):
         estudiante_nombre = get_full_name(estudiante)
         docente_nombre = get_full_name(evaluacion.creador)
         
-        # Crear el registro de historial
-        historial = HistorialEvaluacion.objects.create(
-            estudiante_id=estudiante.id,
-            estudiante_nombre=estudiante_nombre,
-            estudiante_email=estudiante.email,
-            
-            evaluacion_id=evaluacion.id,
-            evaluacion_titulo=evaluacion.titulo,
-            evaluacion_descripcion=evaluacion.descripcion,
-            evaluacion_puntaje_total=evaluacion.ejercicios.aggregate(models.Sum('puntaje'))['puntaje__sum'] or 0,
-            evaluacion_codigo_acceso=evaluacion.codigo_acceso,
-            
-            docente_id=evaluacion.creador.id,
-            docente_nombre=docente_nombre,
-            
-            fecha_inicio=estudiante_evaluacion.fecha_inicio,
-            fecha_fin=estudiante_evaluacion.fecha_fin,
-            
-            puntaje_total=puntaje_total,
-            porcentaje_aprobacion=porcentaje,
-            tiempo_total=tiempo_total,
-            tiempo_total_ms=tiempo_total_ms,
-            
-            # CORREGIDO: Detalles completos con ejercicios
-            detalles={
-                'respuestas': respuestas_json,
-                'ejercicios': ejercicios_json,  # IMPORTANTE: Incluir ejercicios completos
-                'estadisticas': {
-                    'total_ejercicios': total_ejercicios,
-                    'ejercicios_correctos': ejercicios_correctos,
-                    'puntaje_total': puntaje_total,
-                    'puntaje_maximo': puntaje_maximo,
-                    'puntaje_sobre_10': round(puntaje_sobre_10, 2),
-                    'porcentaje': round(porcentaje, 2),
-                    'color_clase': get_color_clase(puntaje_sobre_10)
-                },
-                'evaluacion': {
-                    'titulo': evaluacion.titulo,
-                    'descripcion': evaluacion.descripcion,
-                    'fecha_creacion': evaluacion.fecha_creacion.isoformat() if evaluacion.fecha_creacion else None,
-                    'duracion_minutos': evaluacion.duracion_minutos,
-                    'permitir_revision': evaluacion.permitir_revision,
-                    'mostrar_resultado': evaluacion.mostrar_resultado,
+        # Crear el registro de historial con sus respuestas
+        with transaction.atomic():
+            historial = HistorialEvaluacion.objects.create(
+                estudiante_id=estudiante.id,
+                estudiante_nombre=estudiante_nombre,
+                estudiante_email=estudiante.email,
+            
+                evaluacion_id=evaluacion.id,
+                evaluacion_titulo=evaluacion.titulo,
+                evaluacion_descripcion=evaluacion.descripcion,
+                evaluacion_puntaje_total=evaluacion.ejercicios.aggregate(models.Sum('puntaje'))['puntaje__sum'] or 0,
+                evaluacion_codigo_acceso=evaluacion.codigo_acceso,
+            
+                docente_id=evaluacion.creador.id,
+                docente_nombre=docente_nombre,
+            
+                fecha_inicio=estudiante_evaluacion.fecha_inicio,
+                fecha_fin=estudiante_evaluacion.fecha_fin,
+            
+                puntaje_total=puntaje_total,
+                porcentaje_aprobacion=porcentaje,
+                tiempo_total=tiempo_total,
+                tiempo_total_ms=tiempo_total_ms,
+            
+                # Las respuestas y ejercicios van en HistorialRespuesta
+                detalles={
+                    'estadisticas': {
+                        'total_ejercicios': total_ejercicios,
+                        'ejercicios_correctos': ejercicios_correctos,
+                        'puntaje_total': puntaje_total,
+                        'puntaje_maximo': puntaje_maximo,
+                        'puntaje_sobre_10': round(puntaje_sobre_10, 2),
+                        'porcentaje': round(porcentaje, 2),
+                        'color_clase': get_color_clase(puntaje_sobre_10)
+                    },
+                    'evaluacion': {
+                        'titulo': evaluacion.titulo,
+                        'descripcion': evaluacion.descripcion,
+                        'fecha_creacion': evaluacion.fecha_creacion.isoformat() if evaluacion.fecha_creacion else None,
+                        'duracion_minutos': evaluacion.duracion_minutos,
+                        'permitir_revision': evaluacion.permitir_revision,
+                        'mostrar_resultado': evaluacion.mostrar_resultado,
+                    }
                 }
-            }
-        )
+            )
+            guardar_respuestas([(historial.id, entradas)])
         
         print(f"DEBUG: Historial guardado exitosamente. ID: {historial.id}")
-        print(f"DEBUG: Guardados {len(ejercicios_json)} ejercicios en el historial")
+        print(f"DEBUG: Guardados {len(entradas)} ejercicios en el historial")
         
         return historial
         
@@ -2580,14 +2710,16 @@ def get_evaluacion_resultados_completos(request, pk):
             print("DEBUG: No hay respuestas en BD, buscando en historial")
             try:
                 # Intentar obtener del historial
-                historial = HistorialEvaluacion.objects.filter(
+                from .historial_store import con_respuestas, detalles_completos
+                
+                historial = con_respuestas(HistorialEvaluacion.objects.filter(
                     estudiante_id=estudiante_id,
                     evaluacion_id=evaluacion.id
-                ).first()
+                )).first()
                 
-                if historial and historial.detalles and 'respuestas' in historial.detalles:
-                    print(f"DEBUG: Encontradas {len(historial.detalles['respuestas'])} respuestas en historial")
-                    respuestas_detalle = historial.detalles['respuestas']
+                if historial:
+                    respuestas_detalle = detalles_completos(historial, incluir_ejercicios=False)['respuestas']
+                    print(f"DEBUG: Encontradas {len(respuestas_detalle)} respuestas en historial")
             except Exception as e:
                 print(f"DEBUG: Error al buscar en historial: {str(e)}")
                 
@@ -2612,9 +2744,11 @@ def get_evaluacion_resultados_completos(request, pk):
                     'fecha_respuesta': timezone.now().isoformat()
                 })
         
-        # Calcular estadísticas
+        # Calcular estadísticas (máximo y número de ejercicios del resumen, ver resumenes.py)
+        from .resumenes import obtener_resumen_evaluacion
+        resumen_evaluacion = obtener_resumen_evaluacion(evaluacion.id)
         puntaje_total = participacion.puntaje or 0
-        puntaje_maximo = sum(e.puntaje for e in evaluacion.ejercicios.all())
+        puntaje_maximo = resumen_evaluacion.puntaje_maximo
         
         # Calcular puntaje sobre 10
         puntaje_sobre_10 = 0
@@ -2657,7 +2791,7 @@ def get_evaluacion_resultados_completos(request, pk):
                 'estado': participacion.estado,
                 'tiempo_total': str(participacion.fecha_fin - participacion.fecha_inicio) if participacion.fecha_fin and participacion.fecha_inicio else None,
                 'respuestas': respuestas_detalle,
-                'ejercicios_count': evaluacion.ejercicios.count(),
+                'ejercicios_count': resumen_evaluacion.total_ejercicios,
                 'completados_count': len([r for r in respuestas_detalle if r['es_correcta']])
             }
         })
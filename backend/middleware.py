@@ -4,12 +4,18 @@ import json
 import traceback
 from django.utils.deprecation import MiddlewareMixin
 from rest_framework.exceptions import PermissionDenied, NotAuthenticated
-from django.core.cache import cache
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
 from django.http import HttpResponse
+from django.conf import settings
+import math
 import time
 
 logger = logging.getLogger('django')
 
+# Alias 'ratelimit' de CACHES (en Redis se comparte entre workers)
+cache_rate_limit = ConnectionProxy(caches, 'ratelimit')
+
 class PermissionLoggingMiddleware(MiddlewareMixin):
     """
     Middleware para registrar información detallada sobre errores de permisos.
@@ -80,66 +86,168 @@ class PermissionLoggingMiddleware(MiddlewareMixin):
         return response
 
 
+class VentanaDeslizante:
+    """
+    Límite de solicitudes por ventana deslizante (aproximada con los contadores
+    de la ventana actual y la anterior) sobre la caché 'ratelimit'.
+
+    Cada solicitud reserva su hueco con add+incr, que son atómicos en
+    LocMemCache y en Redis: bajo concurrencia, y entre workers con Redis,
+    solo pasan las que obtienen un valor dentro del límite. Las rechazadas
+    deshacen su incremento para no alargar el bloqueo.
+    """
+    def __init__(self, cache=cache_rate_limit, prefijo='judge_rate_limit'):
+        self.cache = cache
+        self.prefijo = prefijo
+
+    def _contar(self, clave, ventana):
+        self.cache.add(clave, 0, timeout=2 * ventana)
+        try:
+            return self.cache.incr(clave)
+        except ValueError:
+            # Caducó entre add e incr
+            self.cache.add(clave, 0, timeout=2 * ventana)
+            return self.cache.incr(clave)
+
+    def consumir(self, clave, limite, ventana, ahora=None):
+        """
+        Registra una solicitud para `clave` si cabe en `limite` por `ventana`
+        segundos. Devuelve (permitida, segundos hasta poder reintentar).
+        """
+        ahora = time.time() if ahora is None else ahora
+        if limite <= 0:
+            # Ruta cerrada para ese rol: no se cuenta nada y se espera la ventana entera
+            return False, max(1, math.ceil(ventana))
+        indice, transcurrido = divmod(ahora, ventana)
+        indice = int(indice)
+        actual = f"{self.prefijo}:{clave}:{ventana}:{indice}"
+        anteriores = self.cache.get(f"{self.prefijo}:{clave}:{ventana}:{indice - 1}", 0)
+
+        cuenta = self._contar(actual, ventana)
+        if anteriores * (1 - transcurrido / ventana) + cuenta <= limite:
+            return True, 0
+
+        self.cache.decr(actual)
+        return False, self._espera(anteriores, cuenta - 1, limite, ventana, transcurrido)
+
+    def _espera(self, anteriores, actuales, limite, ventana, transcurrido):
+        """Segundos hasta que una solicitud más quepa en la ventana"""
+        if actuales + 1 <= limite:
+            # Solo sobra el peso de la ventana anterior, que decrece con el tiempo
+            espera = ventana * (1 - (limite - actuales - 1) / anteriores) - transcurrido
+        else:
+            # Hay que pasar a la siguiente ventana y esperar a que la actual pese menos
+            espera = ventana - transcurrido + ventana * (1 - (limite - 1) / actuales)
+        return max(1, math.ceil(espera))
+
+
+def respuesta_limite_superado(reintentar):
+    """429 con Retry-After de un envío sobre el límite de JUDGE_RATE_LIMITS"""
+    response = HttpResponse(
+        "Demasiadas solicitudes. Por favor, espere un momento antes de enviar más código.",
+        status=429
+    )
+    response['Retry-After'] = str(reintentar)
+    return response
+
+
 class JudgeRateLimitMiddleware:
     """
-    Middleware para limitar las solicitudes a Judge0.
-    CORREGIDO: Compatible con LocMemCache y AuthenticationMiddleware.
+    Limita los envíos a Judge0 por usuario según settings.JUDGE_RATE_LIMITS
+    (ruta -> rol -> (solicitudes, ventana en segundos)). Responde 429 con
+    Retry-After al superar el límite, salvo en las rutas de
+    JUDGE_RATE_LIMIT_QUEUE cuando hay una cola donde dejarlo (la de Redis con
+    GRADING_ASYNC o la del control de admisión): ahí el envío sigue con
+    `request.judge_rate_limited` (los segundos del Retry-After) y la vista lo
+    encola (202) en vez de perderlo.
+
+    La autenticación JWT de DRF se hace en la vista, así que aquí el usuario
+    se identifica con el token Bearer y su rol se guarda en la caché
+    'ratelimit' durante DURACION_ROL segundos (un cambio de rol tarda eso en
+    aplicarse al límite); sin usuario se limita por IP.
     """
+    DURACION_ROL = 300
+
     def __init__(self, get_response):
         self.get_response = get_response
-        self.rate_limit_cache = {}  # Cache local como respaldo
-    
+        self.reglas = getattr(settings, 'JUDGE_RATE_LIMITS', {})
+        self.rutas_en_cola = (
+            tuple(getattr(settings, 'JUDGE_RATE_LIMIT_QUEUE', ()))
+            if getattr(settings, 'ADMISSION_CONTROL_ENABLED', True) or getattr(settings, 'GRADING_ASYNC', False)
+            else ()
+        )
+        self.limitador = VentanaDeslizante()
+
     def __call__(self, request):
-        if request.path.startswith('/api/submit-codigo/') or request.path.startswith('/api/submit-batch/'):
-            # CORREGIDO: Verificar que request.user existe
-            if hasattr(request, 'user') and request.user.is_authenticated:
-                user_id = request.user.id
-            else:
-                user_id = 'anonymous'
-            
-            key = f"judge_rate_limit_{user_id}"
-            current_time = int(time.time())
-            
-            # CORREGIDO: Usar solo métodos compatibles con LocMemCache
+        ruta = next((r for r in self.reglas if request.path.startswith(r)), None)
+        if ruta is None:
+            return self.get_response(request)
+
+        identidad, rol = self._identificar(request)
+        reglas = self.reglas[ruta]
+        limite = reglas.get(rol, reglas.get('default'))
+        if limite is None:
+            return self.get_response(request)
+
+        solicitudes, ventana = limite
+        try:
+            permitida, reintentar = self.limitador.consumir(f"{ruta}:{identidad}", solicitudes, ventana)
+        except Exception as e:
+            # Sin caché no se bloquea a nadie: Judge0 tiene su propio circuit breaker
+            logger.warning(f"Error en cache de rate limiting: {e}")
+            return self.get_response(request)
+
+        if not permitida and ruta in self.rutas_en_cola:
+            request.judge_rate_limited = reintentar
+        elif not permitida:
+            return respuesta_limite_superado(reintentar)
+
+        return self.get_response(request)
+
+    def _identificar(self, request):
+        """(identidad, rol) del usuario de la solicitud"""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            profile = getattr(user, 'profile', None)
+            return f"u{user.id}", getattr(profile, 'rol', None)
+
+        user_id = self._usuario_jwt(request)
+        if user_id is not None:
+            return f"u{user_id}", self._rol(user_id)
+
+        return f"ip{request.META.get('REMOTE_ADDR', '')}", None
+
+    def _rol(self, user_id):
+        """Rol del usuario, de la caché 'ratelimit' o de su perfil ('' si no tiene)"""
+        clave = f"judge_rate_limit:rol:{user_id}"
+        try:
+            rol = cache_rate_limit.get(clave)
+        except Exception as e:
+            logger.warning(f"Error en cache de rate limiting: {e}")
+            rol = None
+        if rol is None:
+            from users.models import UserProfile
+
+            rol = UserProfile.objects.filter(user_id=user_id).values_list('rol', flat=True).first() or ''
             try:
-                # Intentar usar cache de Django
-                cache_data = cache.get(key, {'count': 0, 'window_start': current_time})
-                
-                # Verificar si necesitamos resetear la ventana (2 minutos = 120 segundos)
-                if current_time - cache_data.get('window_start', 0) > 120:
-                    cache_data = {'count': 0, 'window_start': current_time}
-                
-                # Verificar límite (5 solicitudes por 2 minutos)
-                if cache_data['count'] >= 5:
-                    return HttpResponse(
-                        "Demasiadas solicitudes. Por favor, espere un momento antes de enviar más código.", 
-                        status=429
-                    )
-                
-                # Incrementar contador
-                cache_data['count'] += 1
-                
-                # CORREGIDO: Guardar en cache con timeout de 120 segundos
-                cache.set(key, cache_data, 120)
-                
+                cache_rate_limit.set(clave, rol, timeout=self.DURACION_ROL)
             except Exception as e:
-                # Fallback a cache local si Django cache falla
                 logger.warning(f"Error en cache de rate limiting: {e}")
-                
-                # Limpiar entradas antiguas del cache local
-                if key in self.rate_limit_cache:
-                    if current_time - self.rate_limit_cache[key]['window_start'] > 120:
-                        del self.rate_limit_cache[key]
-                
-                # Verificar limite en cache local
-                if key in self.rate_limit_cache:
-                    if self.rate_limit_cache[key]['count'] >= 5:
-                        return HttpResponse(
-                            "Demasiadas solicitudes. Por favor, espere un momento antes de enviar más código.", 
-                            status=429
-                        )
-                    self.rate_limit_cache[key]['count'] += 1
-                else:
-                    self.rate_limit_cache[key] = {'count': 1, 'window_start': current_time}
-        
-        return self.get_response(request)
\ No newline at end of file
+        return rol or None
+
+    def _usuario_jwt(self, request):
+        """Id del usuario del token Bearer (sin consultar la base de datos)"""
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+        from rest_framework_simplejwt.settings import api_settings
+
+        autenticacion = JWTAuthentication()
+        header = autenticacion.get_header(request)
+        raw_token = autenticacion.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            token = autenticacion.get_validated_token(raw_token)
+        except (InvalidToken, TokenError):
+            return None
+        return token.get(api_settings.USER_ID_CLAIM)
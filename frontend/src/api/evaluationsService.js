@@ -6,6 +6,9 @@ import { v4 as uuidv4 } from "uuid"; // Para generar IDs únicos de tracking
 const JUDGE0_API_URL = import.meta.env.VITE_JUDGE0_API_URL;
 const JUDGE0_TIMEOUT = parseInt(import.meta.env.VITE_JUDGE0_TIMEOUT || "60000");
 
+// Tiempo máximo de espera de un job de calificación asíncrona (respuesta 202)
+const GRADING_JOB_TIMEOUT = parseInt(import.meta.env.VITE_GRADING_JOB_TIMEOUT || "300000");
+
 
 
 // Función para obtener el lenguaje guardado para un ejercicio específico
@@ -59,8 +62,13 @@ const evaluationsService = {
     }
   },
 
-  getHistorialEvaluaciones(studentId = null) {
+  // El backend pagina por cursor: devuelve una página con `siguiente_cursor`
+  // y `hay_mas`; la vista pide la siguiente pasando ese cursor ("Cargar más")
+  getHistorialEvaluaciones(studentId = null, cursor = null) {
     const params = studentId ? { estudiante_id: studentId } : {};
+    if (cursor) {
+      params.cursor = cursor;
+    }
     console.log("📊 Solicitando historial con parámetros:", params);
 
     return apiClient
@@ -417,6 +425,42 @@ const evaluationsService = {
     );
   },
 
+  /**
+   * Si el backend encoló la calificación (202 con job_id), espera a que el
+   * worker termine consultando /grading-jobs/<id>/
+   * @param {Object} response - Respuesta de submit-codigo o submit-batch
+   * @returns {Promise<Object>} - La respuesta con data = resultado del job
+   */
+  async resolveGradingJob(response) {
+    if (response?.status !== 202 || !response.data?.job_id) {
+      return response;
+    }
+
+    const jobId = response.data.job_id;
+    const startTime = Date.now();
+    let delay = 250;
+    console.log(`⏳ Calificación encolada en el job ${jobId}`);
+
+    while (Date.now() - startTime < GRADING_JOB_TIMEOUT) {
+      await new Promise((resolve) => setTimeout(resolve, delay));
+      delay = Math.min(delay * 2, 2000);
+
+      const { data: job } = await apiClient.get(`/grading-jobs/${jobId}/`);
+      console.log(`🔄 Job ${jobId}: ${job.estado} (${job.completados}/${job.total})`);
+
+      if (job.estado === "completado") {
+        return { ...response, status: 200, data: job.resultado };
+      }
+      if (job.estado === "error") {
+        throw new Error(job.error || "Error en la calificación");
+      }
+    }
+
+    throw new Error(
+      `Timeout esperando la calificación después de ${GRADING_JOB_TIMEOUT / 1000} segundos`
+    );
+  },
+
   /**
    * Envía un lote de ejercicios para evaluación usando Judge0
    * @param {Object} data - Datos del lote a enviar
@@ -764,7 +808,7 @@ const evaluationsService = {
           judge0_error: true,
         });
 
-        return fallbackResponse;
+        return await this.resolveGradingJob(fallbackResponse);
       } catch (backendError) {
         console.error(`[Batch:${batchId}] Error al comunicar fallo a backend:`, backendError);
 
@@ -844,14 +888,16 @@ const evaluationsService = {
       const result = await this.waitForJudge0Result(token);
 
       // 4. Enviar resultado también a nuestro backend
-      const backendResponse = await apiClient.post("/submit-codigo/", {
-        evaluacion_id: evaluationId,
-        ejercicio_id: exerciseId,
-        codigo: code,
-        timestamp: new Date().toISOString(),
-        submission_id: submissionId,
-        judge0_result: result, // Pasar el resultado de Judge0
-      });
+      const backendResponse = await this.resolveGradingJob(
+        await apiClient.post("/submit-codigo/", {
+          evaluacion_id: evaluationId,
+          ejercicio_id: exerciseId,
+          codigo: code,
+          timestamp: new Date().toISOString(),
+          submission_id: submissionId,
+          judge0_result: result, // Pasar el resultado de Judge0
+        })
+      );
 
       // 5. Combinar resultados
       return {